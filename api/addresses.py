@@ -0,0 +1,56 @@
+import re
+
+STREET_SUFFIXES = {
+    'ALLEY': 'ALY', 'AVENUE': 'AVE', 'AV': 'AVE', 'BOULEVARD': 'BLVD', 'CIRCLE': 'CIR',
+    'COURT': 'CT', 'COVE': 'CV', 'CROSSING': 'XING', 'DRIVE': 'DR', 'EXPRESSWAY': 'EXPY',
+    'HIGHWAY': 'HWY', 'LANE': 'LN', 'LOOP': 'LOOP', 'PARKWAY': 'PKWY', 'PIKE': 'PIKE',
+    'PLACE': 'PL', 'PLAZA': 'PLZ', 'POINT': 'PT', 'ROAD': 'RD', 'RIDGE': 'RDG',
+    'SQUARE': 'SQ', 'STREET': 'ST', 'STR': 'ST', 'TERRACE': 'TER', 'TRAIL': 'TRL',
+    'TURNPIKE': 'TPKE', 'WAY': 'WAY'
+}
+
+DIRECTIONALS = {
+    'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+    'NORTHEAST': 'NE', 'NORTHWEST': 'NW', 'SOUTHEAST': 'SE', 'SOUTHWEST': 'SW'
+}
+
+UNIT_DESIGNATORS = {'APT', 'APARTMENT', 'UNIT', 'STE', 'SUITE', 'BLDG', 'BUILDING', 'FL', 'FLOOR', 'RM', 'ROOM', '#'}
+
+COUNTRY_SUFFIXES = ('UNITED STATES OF AMERICA', 'UNITED STATES', 'USA', 'US')
+
+_ZIP_PLUS_FOUR = re.compile(r'\b(\d{5})-\d{4}\b')
+_UNIT_HASH = re.compile(r'#\s*')
+_PUNCTUATION = re.compile(r"[^A-Z0-9# ]+")
+
+
+def normalize_address(address):
+    # "123 Main Street, Apt #4b, Atlanta, GA 30344-1234, USA" -> "123 MAIN ST UNIT 4B ATLANTA GA 30344"
+    if not address:
+        return ''
+    text = str(address).upper().strip()
+    for suffix in COUNTRY_SUFFIXES:
+        if text.endswith(', ' + suffix) or text.endswith(' ' + suffix):
+            text = text[:-len(suffix)].rstrip(' ,')
+            break
+    text = _ZIP_PLUS_FOUR.sub(r'\1', text)
+    text = _UNIT_HASH.sub('# ', text)
+    text = _PUNCTUATION.sub(' ', text.replace('.', ''))
+
+    tokens = []
+    words = text.split()
+    i = 0
+    while i < len(words):
+        word = words[i]
+        if word in UNIT_DESIGNATORS:
+            tokens.append('UNIT')
+            # "Apt # 4" and "Unit #4" both collapse to "UNIT 4"
+            if i + 1 < len(words) and words[i + 1] in UNIT_DESIGNATORS:
+                i += 1
+        elif word in STREET_SUFFIXES:
+            tokens.append(STREET_SUFFIXES[word])
+        elif word in DIRECTIONALS:
+            tokens.append(DIRECTIONALS[word])
+        else:
+            tokens.append(word)
+        i += 1
+    return ' '.join(tokens)
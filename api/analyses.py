@@ -0,0 +1,83 @@
+import hashlib
+import json
+import os
+import re
+
+from cache import PersistentCache
+
+# Finished analyses keyed by a hash of their content. An id always names the
+# same analysis, so it doubles as the ETag and clients can hand it to the
+# report routes instead of uploading the analysis again. The store is local
+# to each instance; the report function fetches analyses it has not seen from
+# the analysis function's /api/analyses/<id>.
+analysis_store = PersistentCache(
+    'analyses',
+    ttl=int(os.getenv('ANALYSIS_STORE_TTL', 30 * 24 * 3600)),
+    max_entries=int(os.getenv('ANALYSIS_STORE_MAX_ENTRIES', 50000)),
+    memory_entries=int(os.getenv('ANALYSIS_STORE_LRU_SIZE', 128))
+)
+
+ANALYSIS_ID_LENGTH = 32
+ANALYSIS_ID_PATTERN = re.compile(f'[0-9a-f]{{{ANALYSIS_ID_LENGTH}}}')
+ANALYSIS_FETCH_TIMEOUT = float(os.getenv('ANALYSIS_FETCH_TIMEOUT', 10))
+
+# Comp block fields that differ between otherwise identical analyses (a cache
+# hit a minute later) and so are left out of the id
+VOLATILE_COMP_FIELDS = ('cache_age_seconds',)
+
+
+def analysis_id(analysis):
+    body = {k: v for k, v in analysis.items() if k != 'analysis_id'}
+    if isinstance(body.get('comps'), dict):
+        body['comps'] = {k: v for k, v in body['comps'].items() if k not in VOLATILE_COMP_FIELDS}
+    encoded = json.dumps(body, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()[:ANALYSIS_ID_LENGTH]
+
+
+def save_analysis(analysis):
+    # Stamps the analysis with its id and stores it; returns the analysis
+    analysis['analysis_id'] = analysis_id(analysis)
+    analysis_store.set(analysis['analysis_id'], analysis)
+    return analysis
+
+
+def fetch_service_json(service_url, path):
+    # GET a JSON document from the analysis function; None when it is missing
+    # or unreachable
+    import urllib.error
+    import urllib.request
+    req = urllib.request.Request(service_url + path, headers={'Accept': 'application/json', 'Accept-Encoding': 'identity'})
+    try:
+        with urllib.request.urlopen(req, timeout=ANALYSIS_FETCH_TIMEOUT) as response:
+            return json.loads(response.read())
+    except (urllib.error.URLError, OSError, ValueError):
+        return None
+
+
+def load_analysis(key, service_url=None):
+    # service_url: base URL of the analysis function to ask on a local miss
+    if not isinstance(key, str) or not ANALYSIS_ID_PATTERN.fullmatch(key):
+        return None
+    cached = analysis_store.get(key)
+    if cached is not None:
+        return cached[0]
+    if not service_url:
+        return None
+    analysis = fetch_service_json(service_url, f'/api/analyses/{key}')
+    # Ids are content hashes, so a fetched analysis is checked before it is kept
+    if not isinstance(analysis, dict) or analysis_id(analysis) != key:
+        return None
+    analysis['analysis_id'] = key
+    analysis_store.set(key, analysis)
+    return analysis
+
+
+def resolve_analysis_ref(item, service_url=None):
+    # {"analysis_id": ...} on its own stands for the stored analysis (or a
+    # batch-style error row when it is gone); anything else passes through
+    if isinstance(item, dict) and set(item) == {'analysis_id'}:
+        analysis = load_analysis(item['analysis_id'], service_url)
+        if analysis is None:
+            return {'status': 'error', 'error': f"Analysis {item['analysis_id']} not found"}
+        return analysis
+    return item
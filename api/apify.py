@@ -0,0 +1,318 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+
+# Overridable so the client can be pointed at a local stand-in server
+APIFY_BASE_URL = os.getenv('APIFY_BASE_URL', 'https://api.apify.com/v2').rstrip('/')
+
+PROPERTY_ACTOR = 'aknahin~zillow-property-info-scraper'
+COMPS_ACTOR = 'igolaizola~zillow-scraper-ppe'
+
+TERMINAL_RUN_STATUSES = ('SUCCEEDED', 'FAILED', 'TIMED-OUT', 'ABORTED')
+
+# Dataset items are read this many at a time; memory held by a reader is
+# bounded by one page no matter how large the dataset is
+DATASET_PAGE_SIZE = 100
+
+# Apify caps a single waitForFinish long-poll at 60 seconds
+WAIT_FOR_FINISH_SECONDS = 60
+
+APIFY_POOL_SIZE = int(os.getenv('APIFY_POOL_SIZE', 16))
+APIFY_MAX_RETRIES = int(os.getenv('APIFY_MAX_RETRIES', 3))
+APIFY_BACKOFF_BASE = float(os.getenv('APIFY_BACKOFF_BASE', 0.5))
+APIFY_BACKOFF_MAX = float(os.getenv('APIFY_BACKOFF_MAX', 8.0))
+APIFY_BREAKER_THRESHOLD = int(os.getenv('APIFY_BREAKER_THRESHOLD', 5))
+APIFY_BREAKER_RESET = float(os.getenv('APIFY_BREAKER_RESET', 30.0))
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Run and dataset ids are alphanumeric; anything else is refused before it
+# is put into a URL path
+APIFY_ID_PATTERN = re.compile(r'[A-Za-z0-9]{1,64}')
+
+
+class ApifyError(Exception):
+    pass
+
+
+class ApifyUnavailable(ApifyError):
+    # Raised without touching the network while the circuit is open
+    pass
+
+
+class CircuitBreaker:
+    # Opens after `threshold` consecutive failed calls. While open every call
+    # fails fast; after `reset_timeout` one probe call is let through and its
+    # outcome closes or re-opens the circuit.
+
+    def __init__(self, threshold, reset_timeout):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+        self.opened_count = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return 'closed'
+            if self._probing or time.time() - self._opened_at >= self.reset_timeout:
+                return 'half_open'
+            return 'open'
+
+    def before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._probing or time.time() - self._opened_at < self.reset_timeout:
+                raise ApifyUnavailable('Apify circuit open after repeated failures')
+            self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.threshold:
+                if self._opened_at is None or self._probing:
+                    self.opened_count += 1
+                self._opened_at = time.time()
+                self._probing = False
+
+    def stats(self):
+        state = self.state
+        with self._lock:
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'times_opened': self.opened_count,
+                'open_for_seconds': round(time.time() - self._opened_at, 1) if self._opened_at else 0
+            }
+
+
+breaker = CircuitBreaker(APIFY_BREAKER_THRESHOLD, APIFY_BREAKER_RESET)
+
+_session_lock = threading.Lock()
+_session = None
+
+_metrics_lock = threading.Lock()
+_metrics = {}
+
+
+def get_session():
+    # One keep-alive connection pool shared by every thread. requests is
+    # imported here so routes that never reach Apify don't pay for it.
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=APIFY_POOL_SIZE)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+        return _session
+
+
+def _record(operation, seconds, retries, error=None):
+    with _metrics_lock:
+        m = _metrics.setdefault(operation, {
+            'calls': 0, 'errors': 0, 'retries': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'last_error': None
+        })
+        m['calls'] += 1
+        m['retries'] += retries
+        m['total_ms'] += seconds * 1000
+        m['max_ms'] = max(m['max_ms'], seconds * 1000)
+        if error is not None:
+            m['errors'] += 1
+            m['last_error'] = str(error)
+
+
+def _backoff(attempt, response):
+    # Full jitter, but never sooner than a Retry-After the server asked for
+    delay = random.uniform(0, min(APIFY_BACKOFF_MAX, APIFY_BACKOFF_BASE * 2 ** attempt))
+    retry_after = response.headers.get('Retry-After') if response is not None else None
+    if retry_after:
+        try:
+            delay = max(delay, min(float(retry_after), APIFY_BACKOFF_MAX))
+        except ValueError:
+            pass
+    return delay
+
+
+def apify_request(operation, method, path, **kwargs):
+    # Sends one logical call through the shared pool. Connection errors and
+    # 429/5xx responses are retried with jittered exponential backoff; when
+    # retries run out the failure counts against the circuit breaker.
+    start = time.perf_counter()
+    try:
+        breaker.before_call()
+    except ApifyUnavailable as e:
+        _record(operation, time.perf_counter() - start, 0, e)
+        raise
+
+    import requests
+    attempt = 0
+    while True:
+        response = None
+        try:
+            response = get_session().request(method, APIFY_BASE_URL + path, **kwargs)
+        except requests.ConnectionError as e:
+            error = e
+        except requests.RequestException as e:
+            # Read timeouts and the like: retrying a long actor run would only
+            # multiply the wait
+            breaker.record_failure()
+            _record(operation, time.perf_counter() - start, attempt, e)
+            raise ApifyError(f'Apify request failed: {e}') from e
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                breaker.record_success()
+                _record(operation, time.perf_counter() - start, attempt)
+                return response
+            error = ApifyError(f'Apify returned {response.status_code}')
+
+        if attempt >= APIFY_MAX_RETRIES:
+            if response is not None:
+                response.close()
+            breaker.record_failure()
+            _record(operation, time.perf_counter() - start, attempt, error)
+            if isinstance(error, ApifyError):
+                raise error
+            raise ApifyError(f'Apify request failed: {error}') from error
+
+        delay = _backoff(attempt, response)
+        if response is not None:
+            response.close()
+        attempt += 1
+        time.sleep(delay)
+
+
+def apify_available():
+    return breaker.state != 'open'
+
+
+def apify_stats():
+    with _metrics_lock:
+        calls = {
+            operation: {
+                'calls': m['calls'],
+                'errors': m['errors'],
+                'retries': m['retries'],
+                'avg_ms': round(m['total_ms'] / m['calls'], 1) if m['calls'] else 0,
+                'max_ms': round(m['max_ms'], 1),
+                'last_error': m['last_error']
+            }
+            for operation, m in _metrics.items()
+        }
+    return {'base_url': APIFY_BASE_URL, 'circuit': breaker.stats(), 'calls': calls}
+
+
+def _check(response):
+    if response.status_code != 200 and response.status_code != 201:
+        raise ApifyError(f'Apify returned {response.status_code}')
+    return response.json()
+
+
+def _path_id(value):
+    if not isinstance(value, str) or not APIFY_ID_PATTERN.fullmatch(value):
+        raise ApifyError(f'Invalid Apify id {value!r}')
+    return value
+
+
+def run_actor_sync(actor, actor_input, token, timeout=300):
+    response = apify_request(
+        'run_sync', 'POST', f'/acts/{actor}/run-sync-get-dataset-items?token={token}',
+        json=actor_input,
+        timeout=timeout
+    )
+    return _check(response)
+
+
+def start_actor_run(actor, actor_input, token, timeout=30, wait_for_finish=0):
+    # Returns the run id and its default dataset id, immediately unless
+    # wait_for_finish asks Apify to hold the request while the run works
+    response = apify_request(
+        'start_run', 'POST', f'/acts/{actor}/runs?token={token}&waitForFinish={wait_for_finish}',
+        json=actor_input,
+        timeout=timeout + wait_for_finish
+    )
+    run = _check(response).get('data', {})
+    return {
+        'run_id': run.get('id'),
+        'dataset_id': run.get('defaultDatasetId'),
+        'status': run.get('status', 'READY')
+    }
+
+
+def get_actor_run(run_id, token, timeout=30, wait_for_finish=0):
+    response = apify_request(
+        'get_run', 'GET', f'/actor-runs/{_path_id(run_id)}?token={token}&waitForFinish={wait_for_finish}',
+        timeout=timeout + wait_for_finish
+    )
+    run = _check(response).get('data', {})
+    return {
+        'run_id': run.get('id', run_id),
+        'dataset_id': run.get('defaultDatasetId'),
+        'status': run.get('status', 'READY')
+    }
+
+
+def get_dataset_items(dataset_id, token, timeout=60):
+    response = apify_request(
+        'dataset_items', 'GET', f'/datasets/{_path_id(dataset_id)}/items?token={token}&clean=true',
+        timeout=timeout
+    )
+    return _check(response)
+
+
+def iter_dataset_items(dataset_id, token, page_size=DATASET_PAGE_SIZE, limit=None, timeout=60):
+    # Pages through the dataset with offset/limit, parsing each JSONL page
+    # line by line. Stops fetching as soon as the caller stops iterating.
+    offset = 0
+    while limit is None or offset < limit:
+        count = page_size if limit is None else min(page_size, limit - offset)
+        response = apify_request(
+            'dataset_items', 'GET', f'/datasets/{_path_id(dataset_id)}/items?token={token}&clean=true'
+            f'&format=jsonl&offset={offset}&limit={count}',
+            timeout=timeout,
+            stream=True
+        )
+        with response:
+            if response.status_code != 200:
+                raise ApifyError(f'Apify returned {response.status_code}')
+            received = 0
+            for line in response.iter_lines():
+                if line.strip():
+                    received += 1
+                    yield json.loads(line)
+        if received < count:
+            return
+        offset += received
+
+
+def run_actor_items(actor, actor_input, token, timeout=300, page_size=DATASET_PAGE_SIZE):
+    # Like run_actor_sync, but waits for the run and then streams its
+    # dataset page by page instead of buffering the whole payload
+    deadline = time.time() + timeout
+    wait = min(WAIT_FOR_FINISH_SECONDS, timeout)
+    run = start_actor_run(actor, actor_input, token, wait_for_finish=wait)
+    while run['status'] not in TERMINAL_RUN_STATUSES:
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise ApifyError(f"Actor run {run['run_id']} did not finish in {timeout}s")
+        run = get_actor_run(run['run_id'], token, wait_for_finish=int(min(WAIT_FOR_FINISH_SECONDS, max(1, remaining))))
+    if run['status'] != 'SUCCEEDED':
+        raise ApifyError(f"Actor run {run['run_id']} {run['status'].lower()}")
+    yield from iter_dataset_items(run['dataset_id'], token, page_size=page_size, limit=actor_input.get('maxItems'))
@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+import os
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+BATCH_MAX_WORKERS = int(os.getenv('BATCH_MAX_WORKERS', 4))
+BATCH_MAX_PROPERTIES = int(os.getenv('BATCH_MAX_PROPERTIES', 5000))
+
+CSV_NUMERIC_FIELDS = ('purchasePrice', 'currentSqft', 'beds', 'baths', 'lotSize', 'yearBuilt', 'latitude', 'longitude', 'zestimate')
+
+
+class BatchInputError(Exception):
+    pass
+
+
+def _clean_csv_row(row):
+    cleaned = {}
+    for key, value in row.items():
+        if key is None:
+            continue
+        key = key.strip()
+        value = (value or '').strip()
+        if value == '':
+            continue
+        if key in CSV_NUMERIC_FIELDS:
+            try:
+                value = float(value.replace(',', '').replace('$', ''))
+            except ValueError:
+                pass
+        cleaned[key] = value
+    return cleaned
+
+
+def parse_batch_request(req):
+    # Accepts a CSV upload (multipart "file"), a raw text/csv body, a JSON
+    # list, or a JSON object with a "properties" list
+    upload = req.files.get('file')
+    if upload is not None:
+        text = upload.read().decode('utf-8-sig')
+        rows = [_clean_csv_row(r) for r in csv.DictReader(io.StringIO(text))]
+    elif 'csv' in (req.content_type or ''):
+        text = req.get_data(as_text=True)
+        rows = [_clean_csv_row(r) for r in csv.DictReader(io.StringIO(text))]
+    else:
+        try:
+            data = json.loads(req.get_data(as_text=True) or 'null')
+        except ValueError:
+            raise BatchInputError('Body must be JSON or CSV')
+        rows = data.get('properties') if isinstance(data, dict) else data
+        if not isinstance(rows, list):
+            raise BatchInputError('Expected a list of properties')
+
+    if not rows:
+        raise BatchInputError('No properties supplied')
+    if len(rows) > BATCH_MAX_PROPERTIES:
+        raise BatchInputError(f'Batch limited to {BATCH_MAX_PROPERTIES} properties')
+    return rows
+
+
+def group_by_key(items, key_fn):
+    # items: iterable of (index, item); returns OrderedDict key -> [(index, item)]
+    groups = OrderedDict()
+    for index, item in items:
+        groups.setdefault(key_fn(item), []).append((index, item))
+    return groups
+
+
+def group_error_rows(members, error):
+    return [{'index': index, 'status': 'error', 'error': error} for index, _ in members]
+
+
+def iter_group_results(groups, worker, max_workers=None):
+    # Runs worker(key, members) for every group on a bounded thread pool and
+    # yields each group's result as soon as it finishes. Only a small window
+    # of groups is in flight, so memory stays flat for large batches. A group
+    # whose worker raises yields an error row per member instead of ending
+    # the stream.
+    max_workers = max_workers or BATCH_MAX_WORKERS
+    pending = iter(groups.items())
+    in_flight = {}
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_next():
+            try:
+                key, members = next(pending)
+            except StopIteration:
+                return False
+            in_flight[executor.submit(worker, key, members)] = members
+            return True
+
+        for _ in range(max_workers * 2):
+            if not submit_next():
+                break
+
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                members = in_flight.pop(future)
+                submit_next()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = group_error_rows(members, str(e))
+                yield result
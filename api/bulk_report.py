@@ -0,0 +1,223 @@
+import base64
+import json
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from analyses import fetch_service_json, resolve_analysis_ref
+from jobs import get_job, looks_like_job_id
+from pdf_report import payload_hash, pdf_cache, render_pdf, report_payload
+
+# Renders many PDF reports on a process pool and streams them into one ZIP
+# as each finishes. Cached reports are copied straight from the PDF cache;
+# only misses are sent to the pool, and at most BULK_REPORT_IN_FLIGHT renders
+# are queued at once so memory stays bounded for long deal lists.
+BULK_REPORT_WORKERS = int(os.getenv('BULK_REPORT_WORKERS', min(4, os.cpu_count() or 1)))
+BULK_REPORT_IN_FLIGHT = int(os.getenv('BULK_REPORT_IN_FLIGHT', BULK_REPORT_WORKERS * 2))
+BULK_REPORT_MAX = int(os.getenv('BULK_REPORT_MAX', 500))
+
+_pool = None
+_pool_unavailable = False
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    # One pool per process, started on first use. Returns None where worker
+    # processes cannot be created (e.g. no /dev/shm on serverless), in which
+    # case reports render one at a time in this process.
+    global _pool, _pool_unavailable
+    if _pool is not None or _pool_unavailable or BULK_REPORT_WORKERS < 2:
+        return _pool
+    with _pool_lock:
+        if _pool is None and not _pool_unavailable:
+            try:
+                import multiprocessing
+                # spawn: workers must not inherit the parent's SQLite connections or threads
+                _pool = ProcessPoolExecutor(max_workers=BULK_REPORT_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+            except (ImportError, NotImplementedError, OSError):
+                _pool_unavailable = True
+    return _pool
+
+
+def reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# What a report can't be printed without; anything lacking these is listed as
+# an error instead of rendering a blank PDF
+REQUIRED_ANALYSIS_FIELDS = {'address': str, 'propertyData': dict, 'flip_scenarios': list, 'rental_scenarios': list}
+
+
+def missing_analysis_fields(analysis):
+    return [k for k, kind in REQUIRED_ANALYSIS_FIELDS.items() if not analysis.get(k) or not isinstance(analysis[k], kind)]
+
+
+def resolve_bulk_item(item, service_url=None):
+    # An analysis, a batch row ({"status", "analysis"}), {"analysis_id": ...},
+    # a job id or {"job_id": ...}. Returns (analysis, error).
+    item = resolve_analysis_ref(item, service_url)
+    if isinstance(item, dict) and 'job_id' in item:
+        item = item['job_id']
+    if isinstance(item, str):
+        # Checked before the id goes into a lookup path
+        if not looks_like_job_id(item):
+            return None, 'Expected an analysis or a job id'
+        job = get_job(item)
+        if job is None:
+            return None, f'Job {item} not found'
+        if job['kind'] != 'analyze':
+            return None, f'Job {item} is not an analysis'
+        if job['status'] != 'succeeded' and service_url:
+            # Only the analysis function can finish a job; its summary has
+            # the same status and result fields
+            job = fetch_service_json(service_url, f'/api/jobs/{item}') or job
+        if job['status'] != 'succeeded':
+            return None, f"Job {item} is {job['status']}"
+        return checked_analysis(job['result'])
+    if not isinstance(item, dict):
+        return None, 'Expected an analysis or a job id'
+    if item.get('status') == 'error':
+        return None, item.get('error', 'Analysis failed')
+    return checked_analysis(item.get('analysis', item))
+
+
+def checked_analysis(analysis):
+    if not isinstance(analysis, dict):
+        return None, 'Expected an analysis or a job id'
+    missing = missing_analysis_fields(analysis)
+    if missing:
+        return None, f"Not an analysis: missing {', '.join(missing)}"
+    return analysis, None
+
+
+def report_filename(index, address):
+    slug = re.sub(r'[^a-z0-9]+', '-', str(address).lower()).strip('-')[:60] or 'property'
+    return f'{index + 1:04d}-{slug}.pdf'
+
+
+class _ZipStream:
+    # Write-only file object for ZipFile; having no seek() makes zipfile use
+    # data descriptors, so entries can be sent as soon as they are written
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        # Whatever has been written since the last drain, if anything
+        if self._chunks:
+            data = b''.join(self._chunks)
+            self._chunks = []
+            yield data
+
+
+def stream_report_zip(items, service_url=None):
+    # Yields ZIP bytes for an iterable of bulk items; manifest.json is written
+    # last with one entry per item, failures included. service_url is where
+    # analyses and jobs this instance has not stored are looked up.
+    stream = _ZipStream()
+    archive = zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED)
+    manifest = []
+    pending = {}
+    pool = get_pool()
+
+    def fail(entry, error):
+        entry.pop('file', None)
+        entry.update(status='error', error=error)
+
+    def add_pdf(entry, pdf, cache):
+        archive.writestr(entry['file'], pdf)
+        entry.update(status='ok', cache=cache, bytes=len(pdf))
+
+    def render_inline(entry, payload):
+        try:
+            pdf = render_pdf(payload)
+        except Exception as e:
+            fail(entry, str(e))
+            return
+        pdf_cache.set(entry['content_hash'], base64.b64encode(pdf).decode('ascii'))
+        add_pdf(entry, pdf, 'miss')
+
+    def collect(done):
+        for future in done:
+            entry, payload = pending.pop(future)
+            try:
+                pdf = future.result()
+            except BrokenProcessPool:
+                # A worker died; later requests get a fresh pool
+                reset_pool()
+                render_inline(entry, payload)
+                continue
+            except Exception as e:
+                fail(entry, str(e))
+                continue
+            pdf_cache.set(entry['content_hash'], base64.b64encode(pdf).decode('ascii'))
+            add_pdf(entry, pdf, 'miss')
+
+    try:
+        for index, item in enumerate(items):
+            if index >= BULK_REPORT_MAX:
+                manifest.append({'index': index, 'status': 'error', 'error': f'Bulk reports are limited to {BULK_REPORT_MAX} items'})
+                break
+            analysis, error = resolve_bulk_item(item, service_url)
+            entry = {'index': index}
+            manifest.append(entry)
+            if error:
+                fail(entry, error)
+                continue
+            try:
+                payload = report_payload(analysis)
+            except Exception as e:
+                fail(entry, f'Invalid analysis: {e}')
+                continue
+            entry.update(address=payload['address'], file=report_filename(index, payload['address']), content_hash=payload_hash(payload))
+
+            cached = pdf_cache.get(entry['content_hash'])
+            if cached is not None:
+                add_pdf(entry, base64.b64decode(cached[0]), 'hit')
+            elif pool is None:
+                render_inline(entry, payload)
+            else:
+                try:
+                    pending[pool.submit(render_pdf, payload)] = (entry, payload)
+                except (BrokenProcessPool, RuntimeError):
+                    reset_pool()
+                    pool = None
+                    render_inline(entry, payload)
+                while len(pending) >= BULK_REPORT_IN_FLIGHT:
+                    collect(wait(pending, return_when=FIRST_COMPLETED)[0])
+            yield from stream.drain()
+
+        while pending:
+            collect(wait(pending, return_when=FIRST_COMPLETED)[0])
+            yield from stream.drain()
+    finally:
+        # Client went away mid-archive: drop queued renders
+        for future in pending:
+            future.cancel()
+
+    failed = sum(1 for entry in manifest if entry.get('status') != 'ok')
+    archive.writestr('manifest.json', json.dumps({
+        'reports': len(manifest) - failed,
+        'failed': failed,
+        'items': manifest
+    }, indent=2))
+    archive.close()
+    yield from stream.drain()
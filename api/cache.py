@@ -0,0 +1,222 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+CACHE_DIR = os.getenv('CACHE_DIR', os.path.join(tempfile.gettempdir(), 'realestatetool'))
+
+
+def _encode_key(key):
+    if isinstance(key, str):
+        return key
+    return json.dumps(list(key), separators=(',', ':'))
+
+
+class PersistentCache:
+    # Two-level TTL cache: an in-process LRU of serialized entries in front of
+    # a SQLite table on local disk, so entries survive restarts and are shared
+    # by every worker process on the host.
+
+    def __init__(self, name, ttl, max_entries=5000, memory_entries=256, path=None):
+        self.name = name
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.path = path or os.path.join(CACHE_DIR, 'cache.sqlite3')
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._memory = OrderedDict()
+        self._disk_ok = True
+        self._counters = {
+            'hits': 0,
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'expired': 0,
+            'sets': 0,
+            'evictions': 0,
+            'hit_age_total': 0.0,
+            'hit_age_max': 0.0
+        }
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None or not self._disk_ok:
+            return conn
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'namespace TEXT NOT NULL, key TEXT NOT NULL, stored_at REAL NOT NULL, '
+                'expires_at REAL NOT NULL, last_access REAL NOT NULL, value TEXT NOT NULL, '
+                'PRIMARY KEY (namespace, key))'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_cache_entries_access '
+                'ON cache_entries (namespace, last_access)'
+            )
+            conn.commit()
+        except sqlite3.Error:
+            # Read-only or missing disk: keep working as a memory-only cache
+            self._disk_ok = False
+            return None
+        self._local.conn = conn
+        return conn
+
+    def _remember(self, key, stored_at, expires_at, payload):
+        self._memory[key] = (stored_at, expires_at, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _record_hit(self, age, layer):
+        self._counters['hits'] += 1
+        self._counters[layer] += 1
+        self._counters['hit_age_total'] += age
+        self._counters['hit_age_max'] = max(self._counters['hit_age_max'], age)
+
+    def get(self, key):
+        # Returns (value, age_seconds) or None on a miss
+        k = _encode_key(key)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(k)
+            if entry is not None:
+                stored_at, expires_at, payload = entry
+                if expires_at > now:
+                    self._memory.move_to_end(k)
+                    self._record_hit(now - stored_at, 'memory_hits')
+                    return json.loads(payload), now - stored_at
+                del self._memory[k]
+
+        conn = self._connection()
+        row = None
+        if conn is not None:
+            try:
+                row = conn.execute(
+                    'SELECT stored_at, expires_at, value FROM cache_entries WHERE namespace = ? AND key = ?',
+                    (self.name, k)
+                ).fetchone()
+                if row and row[1] > now:
+                    conn.execute(
+                        'UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?',
+                        (now, self.name, k)
+                    )
+                    conn.commit()
+            except sqlite3.Error:
+                row = None
+
+        with self._lock:
+            if row is None:
+                self._counters['misses'] += 1
+                return None
+            stored_at, expires_at, payload = row
+            if expires_at <= now:
+                self._counters['expired'] += 1
+                self._counters['misses'] += 1
+                return None
+            self._remember(k, stored_at, expires_at, payload)
+            self._record_hit(now - stored_at, 'disk_hits')
+        return json.loads(payload), now - stored_at
+
+    def set(self, key, value, ttl=None):
+        k = _encode_key(key)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        payload = json.dumps(value, separators=(',', ':'))
+
+        with self._lock:
+            self._remember(k, now, expires_at, payload)
+            self._counters['sets'] += 1
+
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache_entries (namespace, key, stored_at, expires_at, last_access, value) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (self.name, k, now, expires_at, now, payload)
+            )
+            self._evict(conn, now)
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def _evict(self, conn, now):
+        conn.execute('DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?', (self.name, now))
+        count = conn.execute('SELECT COUNT(*) FROM cache_entries WHERE namespace = ?', (self.name,)).fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            conn.execute(
+                'DELETE FROM cache_entries WHERE namespace = ? AND key IN ('
+                'SELECT key FROM cache_entries WHERE namespace = ? ORDER BY last_access LIMIT ?)',
+                (self.name, self.name, overflow)
+            )
+            with self._lock:
+                self._counters['evictions'] += overflow
+
+    def delete(self, key):
+        k = _encode_key(key)
+        with self._lock:
+            self._memory.pop(k, None)
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            conn.execute('DELETE FROM cache_entries WHERE namespace = ? AND key = ?', (self.name, k))
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        conn = self._connection()
+        if conn is None:
+            return
+        try:
+            conn.execute('DELETE FROM cache_entries WHERE namespace = ?', (self.name,))
+            conn.commit()
+        except sqlite3.Error:
+            pass
+
+    def stats(self):
+        entries = None
+        conn = self._connection()
+        if conn is not None:
+            try:
+                entries = conn.execute(
+                    'SELECT COUNT(*) FROM cache_entries WHERE namespace = ?', (self.name,)
+                ).fetchone()[0]
+            except sqlite3.Error:
+                pass
+
+        with self._lock:
+            c = dict(self._counters)
+            memory_entries = len(self._memory)
+
+        lookups = c['hits'] + c['misses']
+        return {
+            'ttl_seconds': self.ttl,
+            'max_entries': self.max_entries,
+            'entries': entries if entries is not None else memory_entries,
+            'memory_entries': memory_entries,
+            'persistent': self._disk_ok,
+            'hits': c['hits'],
+            'memory_hits': c['memory_hits'],
+            'disk_hits': c['disk_hits'],
+            'misses': c['misses'],
+            'expired': c['expired'],
+            'sets': c['sets'],
+            'evictions': c['evictions'],
+            'hit_rate': round(c['hits'] / lookups, 3) if lookups else 0,
+            'avg_hit_age_seconds': round(c['hit_age_total'] / c['hits'], 1) if c['hits'] else 0,
+            'max_hit_age_seconds': round(c['hit_age_max'], 1)
+        }
@@ -0,0 +1,261 @@
+import json
+import os
+import tempfile
+
+# Portfolio Excel export on openpyxl's write-only workbook: rows go straight
+# to per-sheet temp files as they are appended and the finished archive is
+# streamed back from disk, so memory does not grow with the property count.
+
+STREAM_CHUNK_BYTES = 1 << 16
+
+MONEY_FORMAT = '"$"#,##0'
+PERCENT_FORMAT = '0.0%'
+RATIO_FORMAT = '0.00'
+
+# (header, path into the record, kind). Percent fields hold percentages
+# (12.3) and are written as fractions with a percent format so they sort.
+SUMMARY_COLUMNS = [
+    ('Address', 'address', 'text'),
+    ('Zip', 'propertyData.zipcode', 'text'),
+    ('Purchase Price', 'propertyData.purchasePrice', 'money'),
+    ('SqFt', 'propertyData.currentSqft', 'number'),
+    ('Beds', 'propertyData.beds', 'number'),
+    ('Baths', 'propertyData.baths', 'number'),
+    ('Comps Found', 'comps.total_found', 'number'),
+    ('Comp Source', 'comps.source', 'text'),
+    ('Avg $/SqFt', 'comps.average_price_per_sqft', 'money'),
+    ('Estimated ARV', 'comps.estimated_value', 'money'),
+    ('Best Strategy', 'best_scenario.name', 'text'),
+    ('Best ROI', 'best_scenario.roi', 'percent'),
+    ('Best Flip', 'best_flip.name', 'text'),
+    ('Best Flip Net Profit', 'best_flip.profit', 'money'),
+    ('Best Rental', 'best_rental.name', 'text'),
+    ('Best Rental Cash Flow / Mo', 'best_rental.monthly_cash_flow', 'money'),
+    ('Status', 'status', 'text')
+]
+
+COMP_COLUMNS = [
+    ('Property', 'property', 'text'),
+    ('Comp Address', 'address.streetAddress', 'text'),
+    ('City', 'address.city', 'text'),
+    ('Zip', 'address.zipcode', 'text'),
+    ('Sale Price', 'price.value', 'money'),
+    ('Beds', 'bedrooms', 'number'),
+    ('Baths', 'bathrooms', 'number'),
+    ('SqFt', 'livingArea', 'number'),
+    ('$/SqFt', 'price_per_sqft', 'money'),
+    ('Distance (mi)', 'distance_miles', 'ratio'),
+    ('Year Built', 'yearBuilt', 'number'),
+    ('Zpid', 'zpid', 'text')
+]
+
+FLIP_COLUMNS = [
+    ('Property', 'property', 'text'),
+    ('Scenario', 'name', 'text'),
+    ('Purchase Price', 'purchase_price', 'money'),
+    ('Rehab', 'rehab_cost', 'money'),
+    ('ARV', 'arv', 'money'),
+    ('Max Purchase (70%)', 'max_purchase_70_rule', 'money'),
+    ('Meets 70% Rule', 'meets_70_rule', 'bool'),
+    ('Down Payment', 'financing.down_payment', 'money'),
+    ('Loan Amount', 'financing.loan_amount', 'money'),
+    ('Points', 'costs.points', 'money'),
+    ('Interest', 'costs.interest', 'money'),
+    ('Closing (Buy)', 'costs.closing_buy', 'money'),
+    ('Closing (Sell)', 'costs.closing_sell', 'money'),
+    ('Holding', 'costs.holding', 'money'),
+    ('Total Costs', 'total_investment', 'money'),
+    ('Cash Needed', 'cash_needed', 'money'),
+    ('Gross Profit', 'gross_profit', 'money'),
+    ('Gross Profit %', 'gross_profit_pct', 'percent'),
+    ('Net Profit', 'profit', 'money'),
+    ('Net Profit %', 'net_profit_pct', 'percent'),
+    ('ROI', 'roi', 'percent'),
+    ('Months', 'financing.holding_months', 'number'),
+    ('Days', 'timeline_days', 'number')
+]
+
+RENTAL_COLUMNS = [
+    ('Property', 'property', 'text'),
+    ('Scenario', 'name', 'text'),
+    ('Monthly Rent', 'monthly_rent', 'money'),
+    ('FMR', 'fmr', 'money'),
+    ('Vacancy Rate', 'vacancy_rate', 'percent'),
+    ('Vacancy', 'vacancy', 'money'),
+    ('EGI', 'effective_gross_income', 'money'),
+    ('Management', 'expenses.management', 'money'),
+    ('Repairs', 'expenses.repairs', 'money'),
+    ('CapEx', 'expenses.capex', 'money'),
+    ('Taxes', 'expenses.taxes', 'money'),
+    ('Insurance', 'expenses.insurance', 'money'),
+    ('Utilities', 'expenses.utilities', 'money'),
+    ('Total Expenses', 'expenses.total', 'money'),
+    ('NOI', 'noi', 'money'),
+    ('Down Payment', 'financing.down_payment', 'money'),
+    ('Loan Amount', 'financing.loan_amount', 'money'),
+    ('Mortgage', 'monthly_mortgage', 'money'),
+    ('Cash Flow / Mo', 'monthly_cash_flow', 'money'),
+    ('Annual Cash Flow', 'annual_cash_flow', 'money'),
+    ('Cash Invested', 'cash_invested', 'money'),
+    ('Cash-on-Cash', 'cash_on_cash', 'percent'),
+    ('Cap Rate', 'cap_rate', 'percent'),
+    ('DSCR', 'dscr', 'ratio'),
+    ('1% Rule', 'one_pct_rule', 'percent')
+]
+
+
+def _lookup(record, path):
+    value = record
+    for part in path.split('.'):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+class SheetWriter:
+    def __init__(self, workbook, title, columns):
+        from openpyxl.cell import WriteOnlyCell
+        from openpyxl.styles import Font, PatternFill
+
+        self._cell = WriteOnlyCell
+        self.sheet = workbook.create_sheet(title)
+        self.columns = columns
+        self.sheet.freeze_panes = 'A2'
+        bold = Font(bold=True, color='FFFFFF')
+        fill = PatternFill(start_color='3B82F6', end_color='3B82F6', fill_type='solid')
+        header = []
+        for name, _, _ in columns:
+            cell = WriteOnlyCell(self.sheet, value=name)
+            cell.font = bold
+            cell.fill = fill
+            header.append(cell)
+        self.sheet.append(header)
+        self.rows = 0
+
+    def append(self, record, **extra):
+        row = []
+        for _, path, kind in self.columns:
+            value = extra[path] if path in extra else _lookup(record, path)
+            row.append(self._typed(value, kind))
+        self.sheet.append(row)
+        self.rows += 1
+
+    def discard(self):
+        self.sheet.close()
+        self.sheet._writer.cleanup()
+
+    def _typed(self, value, kind):
+        if value is None or value == '':
+            return None
+        if kind == 'text':
+            return str(value)
+        if kind == 'bool':
+            return 'Yes' if value else 'No'
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            try:
+                value = float(str(value).replace('$', '').replace(',', '').rstrip('%'))
+            except ValueError:
+                return str(value)
+        if kind == 'number':
+            return value
+        cell = self._cell(self.sheet, value=value / 100 if kind == 'percent' else value)
+        cell.number_format = {'money': MONEY_FORMAT, 'percent': PERCENT_FORMAT, 'ratio': RATIO_FORMAT}[kind]
+        return cell
+
+
+def analysis_records(payload):
+    # A posted analysis, a list of them, or {"analyses": [...]}; list items
+    # may also be batch rows ({"status", "analysis"})
+    if isinstance(payload, dict) and 'analyses' in payload:
+        payload = payload['analyses']
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list):
+        raise ValueError('Expected an analysis or a list of analyses')
+    for row in payload:
+        yield row
+
+
+def ndjson_records(stream, strict=True):
+    # strict=False turns unparseable lines into error rows instead of raising
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            if strict:
+                raise
+            yield {'status': 'error', 'error': 'Invalid JSON line'}
+
+
+def write_workbook(records, fp):
+    # records: iterable of analyses or batch rows. Returns property count.
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    summary = SheetWriter(workbook, 'Summary', SUMMARY_COLUMNS)
+    comps = SheetWriter(workbook, 'Comps', COMP_COLUMNS)
+    flips = SheetWriter(workbook, 'Flip', FLIP_COLUMNS)
+    rentals = SheetWriter(workbook, 'Rental', RENTAL_COLUMNS)
+
+    try:
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            if record.get('status') == 'error':
+                summary.append({'address': record.get('address', f"Row {record['index']}" if 'index' in record else None), 'status': record.get('error', 'error')})
+                continue
+            analysis = record.get('analysis', record)
+            address = analysis.get('address', '')
+            summary.append(analysis, status='ok')
+            for comp in (analysis.get('comps') or {}).get('properties') or []:
+                # Compact comps carry price and address fields flat
+                if not isinstance(comp.get('price'), dict):
+                    comp = dict(comp, price={'value': comp.get('price')})
+                if not (comp.get('address') or {}).get('streetAddress'):
+                    address_fields = dict(comp.get('address') or {})
+                    for field in ('streetAddress', 'city', 'zipcode'):
+                        if address_fields.get(field) is None:
+                            address_fields[field] = comp.get(field)
+                    comp = dict(comp, address=address_fields)
+                comps.append(comp, property=address)
+            for scenario in analysis.get('flip_scenarios') or []:
+                flips.append(scenario, property=address)
+            for scenario in analysis.get('rental_scenarios') or []:
+                rentals.append(scenario, property=address)
+    except Exception:
+        # Finish the half-written sheets so their temp files are released
+        for writer in (summary, comps, flips, rentals):
+            writer.discard()
+        raise
+
+    workbook.save(fp)
+    return summary.rows
+
+
+def build_workbook_file(records):
+    # Writes the workbook to a temp file and returns its path; the caller
+    # streams and removes it
+    handle, path = tempfile.mkstemp(suffix='.xlsx')
+    try:
+        with os.fdopen(handle, 'wb') as fp:
+            write_workbook(records, fp)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
+
+
+def stream_file(path):
+    try:
+        with open(path, 'rb') as fp:
+            while True:
+                chunk = fp.read(STREAM_CHUNK_BYTES)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
@@ -0,0 +1,204 @@
+import argparse
+import csv
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+
+# HUD Small Area Fair Market Rents, stored as one flat binary table:
+#
+#   header   b'FMRT', version, year count, row count      (<4sHHI)
+#   years    uint16[years]                                 oldest first
+#   index    uint32[100000]   ZIP -> row, 0 = not in the table
+#   rents    uint16[rows][years][5]   0-4 bedroom rent, 0 = unknown
+#
+# The file is memory-mapped on first lookup, so nothing is parsed at import
+# and a lookup is three array reads whatever the table size.
+
+FMR_TABLE_PATH = os.getenv('FMR_TABLE_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'fmr.bin'))
+FMR_YEAR = int(os.getenv('FMR_YEAR', 0)) or None
+
+# Used for ZIPs the table does not cover (and when no table is installed):
+# the Atlanta metro SAFMR the app was originally written around
+DEFAULT_FMR = (1089, 1199, 1409, 1829, 2169)
+
+MAGIC = b'FMRT'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+ZIP_SLOTS = 100000
+BEDROOMS = 5
+
+
+class FMRTable:
+    def __init__(self, path):
+        with open(path, 'rb') as fp:
+            self._mmap = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, year_count, row_count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not an FMR table')
+        view = memoryview(self._mmap)
+        offset = HEADER.size
+        self.years = list(view[offset:offset + 2 * year_count].cast('H'))
+        offset += 2 * year_count
+        self._index = view[offset:offset + 4 * ZIP_SLOTS].cast('I')
+        offset += 4 * ZIP_SLOTS
+        self._rents = view[offset:offset + 2 * row_count * year_count * BEDROOMS].cast('H')
+        self.zip_count = row_count - 1
+
+    def rent(self, zipcode, bedrooms, year=None):
+        # Returns None when the ZIP, year or bedroom count is not covered
+        try:
+            slot = int(str(zipcode).strip()[:5])
+        except ValueError:
+            return None
+        if not 0 <= slot < ZIP_SLOTS:
+            return None
+        row = self._index[slot]
+        if not row:
+            return None
+        year_index = len(self.years) - 1 if year is None else self._year_index(year)
+        if year_index is None:
+            return None
+        value = self._rents[(row * len(self.years) + year_index) * BEDROOMS + bedrooms]
+        return value or None
+
+    def _year_index(self, year):
+        # Latest table year not after the one asked for
+        candidates = [i for i, y in enumerate(self.years) if y <= int(year)]
+        return candidates[-1] if candidates else None
+
+
+_table = None
+_table_loaded = False
+_table_lock = threading.Lock()
+
+
+def fmr_table():
+    global _table, _table_loaded
+    if not _table_loaded:
+        with _table_lock:
+            if not _table_loaded:
+                try:
+                    _table = FMRTable(FMR_TABLE_PATH)
+                except (OSError, ValueError):
+                    _table = None
+                _table_loaded = True
+    return _table
+
+
+def get_fmr(zipcode, beds, year=None):
+    bedrooms = min(beds, 4) if beds > 0 else 0
+    table = fmr_table()
+    rent = table.rent(zipcode, bedrooms, year or FMR_YEAR) if table is not None else None
+    return rent if rent is not None else DEFAULT_FMR[bedrooms]
+
+
+def _header_key(name):
+    return re.sub(r'[^a-z0-9]', '', str(name or '').lower())
+
+
+def read_safmr_rows(path):
+    # Yields (zip, [0br..4br]) from a HUD SAFMR export (.xlsx or .csv)
+    if path.lower().endswith(('.xlsx', '.xlsm')):
+        from openpyxl import load_workbook
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        yield from _safmr_rows(workbook.worksheets[0].iter_rows(values_only=True))
+        workbook.close()
+    else:
+        with open(path, newline='', encoding='utf-8-sig') as fp:
+            yield from _safmr_rows(csv.reader(fp))
+
+
+def _safmr_rows(rows):
+    header = [_header_key(h) for h in next(rows)]
+    zip_column = next(i for i, h in enumerate(header) if h.startswith('zip'))
+    # HUD labels the base rents "SAFMR 0BR" and the payment standards
+    # "SAFMR 0BR - 90% Payment Standard"; plain "0br"/"fmr_0" also work
+    rent_columns = []
+    for n in range(BEDROOMS):
+        names = (f'safmr{n}br', f'{n}br', f'fmr{n}', f'fmr{n}br')
+        rent_columns.append(next(i for i, h in enumerate(header) if h in names))
+
+    for row in rows:
+        if row[zip_column] in (None, ''):
+            continue
+        zipcode = int(str(row[zip_column]).strip()[:5])
+        rents = []
+        for column in rent_columns:
+            value = re.sub(r'[^\d.]', '', str(row[column] or ''))
+            rents.append(int(round(float(value))) if value else 0)
+        yield zipcode, rents
+
+
+def build_table(sources, out_path):
+    # sources: [(year, path)]. A ZIP listed under several HUD areas keeps
+    # its first row, as HUD lists the primary area first.
+    sources = sorted(sources)
+    years = [year for year, _ in sources]
+    rows = {}
+    for year_index, (_, path) in enumerate(sources):
+        for zipcode, rents in read_safmr_rows(path):
+            per_year = rows.setdefault(zipcode, [None] * len(years))
+            if per_year[year_index] is None:
+                per_year[year_index] = rents
+
+    index = array('I', bytes(4 * ZIP_SLOTS))
+    rents = array('H', [0] * (len(years) * BEDROOMS))
+    for row, zipcode in enumerate(sorted(rows), start=1):
+        index[zipcode] = row
+        for per_year in rows[zipcode]:
+            rents.extend(min(v, 65535) for v in (per_year or [0] * BEDROOMS))
+    if sys.byteorder != 'little':
+        index.byteswap()
+        rents.byteswap()
+
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    tmp_path = out_path + '.tmp'
+    with open(tmp_path, 'wb') as fp:
+        fp.write(HEADER.pack(MAGIC, VERSION, len(years), len(rows) + 1))
+        fp.write(struct.pack(f'<{len(years)}H', *years))
+        fp.write(index.tobytes())
+        fp.write(rents.tobytes())
+    os.replace(tmp_path, out_path)
+    return {'years': years, 'zipcodes': len(rows), 'bytes': os.path.getsize(out_path)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build or inspect the compact HUD Small Area FMR table')
+    parser.add_argument('--path', default=FMR_TABLE_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='build from HUD SAFMR exports, one file per fiscal year')
+    build.add_argument('files', nargs='+', help='FY2025_SAFMRS.xlsx, or YEAR=FILE when the name has no year')
+    commands.add_parser('info')
+    lookup = commands.add_parser('lookup')
+    lookup.add_argument('zipcode')
+    lookup.add_argument('--year', type=int)
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        sources = []
+        for spec in args.files:
+            year, _, path = spec.partition('=') if '=' in spec else ('', '', spec)
+            if not year:
+                match = re.search(r'(?:fy)?_?(20\d\d)', os.path.basename(path).lower())
+                if not match:
+                    parser.error(f'cannot tell the fiscal year of {path}; pass YEAR={path}')
+                year = match.group(1)
+            sources.append((int(year), path))
+        built = build_table(sources, args.path)
+        print(f"{args.path}: {built['zipcodes']} ZIPs x {len(built['years'])} years {built['years']}, {built['bytes']:,} bytes")
+        return 0
+
+    table = FMRTable(args.path)
+    if args.command == 'info':
+        print(f'{args.path}: {table.zip_count} ZIPs, years {table.years}')
+    else:
+        print({f'{n}br': table.rent(args.zipcode, n, args.year) for n in range(BEDROOMS)})
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
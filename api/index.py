@@ -1,19 +1,70 @@
-from flask import Flask, request, jsonify, send_file, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory, stream_with_context
 from flask_cors import CORS
-import requests
 import os
-import json
+import queue
+import sys
+import threading
 import time
-from datetime import datetime
-from io import BytesIO
+from itertools import islice
+from math import radians, sin, cos, sqrt, atan2
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from addresses import normalize_address
+from analyses import analysis_store, load_analysis, save_analysis
+from batch import BATCH_MAX_PROPERTIES, BatchInputError, group_by_key, iter_group_results, parse_batch_request
+from apify import COMPS_ACTOR, PROPERTY_ACTOR, ApifyError, apify_available, apify_stats, iter_dataset_items, run_actor_items, run_actor_sync, start_actor_run
+from cache import PersistentCache
+from fmr import get_fmr
+from jobs import create_job, finish_job, get_job, job_summary, jobs_enabled, refresh_runs
+from metrics import add_collector, inc, instrument_app, render_prometheus, stage
+from profiling import enable_profiling
+from responses import compact_comp, compressed_stream, dumps, json_response, project, requested_fields, shape_analysis, variant_tag, wants_compact
+from singleflight import SingleFlight
+from warehouse import CompWarehouse
 
 app = Flask(__name__, static_folder='../public')
 CORS(app)
+instrument_app(app)
+enable_profiling(app)
 
 APIFY_TOKEN = os.getenv('APIFY_API_TOKEN', 'apify_api_CHtm8I3iS00QsiRaNozGNMQppjZuGJ2sp0cp')
 
+COMP_SOLD_WINDOW = '6m'
+# Comps kept per search, and sold listings the actor may return per search
+COMP_LIMIT = 10
+COMP_MAX_ITEMS = int(os.getenv('COMP_MAX_ITEMS', 20))
+
+comp_cache = PersistentCache(
+    'comps',
+    ttl=int(os.getenv('COMP_CACHE_TTL', 6 * 3600)),
+    max_entries=int(os.getenv('COMP_CACHE_MAX_ENTRIES', 5000)),
+    memory_entries=int(os.getenv('COMP_CACHE_LRU_SIZE', 256))
+)
+
+lookup_cache = PersistentCache(
+    'lookups',
+    ttl=int(os.getenv('LOOKUP_CACHE_TTL', 24 * 3600)),
+    max_entries=int(os.getenv('LOOKUP_CACHE_MAX_ENTRIES', 20000)),
+    memory_entries=int(os.getenv('LOOKUP_CACHE_LRU_SIZE', 1024))
+)
+LOOKUP_NEGATIVE_TTL = int(os.getenv('LOOKUP_NEGATIVE_TTL', 300))
+
+comp_warehouse = CompWarehouse(os.getenv('WAREHOUSE_PATH'))
+# A warehouse search is only trusted with enough matches refreshed recently
+WAREHOUSE_MIN_COMPS = int(os.getenv('WAREHOUSE_MIN_COMPS', 5))
+WAREHOUSE_MAX_AGE = int(os.getenv('WAREHOUSE_MAX_AGE', 7 * 24 * 3600))
+
+class PropertyLookupError(Exception):
+    pass
+
+# Concurrent requests for the same search or address share one actor run
+comp_flight = SingleFlight('comps')
+lookup_flight = SingleFlight('lookups')
+
+COMP_RADIUS_MILES = float(os.getenv('COMP_RADIUS_MILES', 2.0))
+
 def haversine_distance(lat1, lon1, lat2, lon2):
-    from math import radians, sin, cos, sqrt, atan2
     R = 3959
     lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
     dlat = lat2 - lat1
@@ -22,136 +73,269 @@ def haversine_distance(lat1, lon1, lat2, lon2):
     c = 2 * atan2(sqrt(a), sqrt(1-a))
     return R * c
 
-def fetch_subject_property(address):
-    if not APIFY_TOKEN:
-        return None
-    
-    actor_input = {"addresses": address}
-    
+def fetch_subject_property_from_apify(address):
+    # Returns the property, None when the actor found nothing, or raises
+    # PropertyLookupError when the lookup itself failed
     try:
         # Use synchronous call
-        response = requests.post(
-            'https://api.apify.com/v2/acts/aknahin~zillow-property-info-scraper/run-sync-get-dataset-items?token=' + APIFY_TOKEN,
-            json=actor_input,
-            timeout=300
-        )
-        
-        if response.status_code != 200 and response.status_code != 201:
-            return None
-        
-        properties = response.json()
-        
+        with stage('apify_lookup'):
+            properties = run_actor_sync(PROPERTY_ACTOR, {"addresses": address}, APIFY_TOKEN)
+    except Exception as e:
+        raise PropertyLookupError(str(e))
+    return parse_subject_property_items(properties, address)
+
+def parse_subject_property_items(properties, address):
+    try:
         if properties and len(properties) > 0:
             prop = properties[0]
             if prop.get('error'):
                 return None
-            
-            full_address = prop.get('address', address)
-            address_parts = full_address.split(',')
-            city = address_parts[1].strip() if len(address_parts) > 1 else ''
-            state_zip = address_parts[2].strip() if len(address_parts) > 2 else ''
-            state = state_zip.split()[0] if state_zip else ''
-            zipcode = state_zip.split()[1] if len(state_zip.split()) > 1 else ''
-            
-            return {
-                'address': full_address,
-                'city': city,
-                'state': state,
-                'zipcode': zipcode,
-                'beds': prop.get('beds', 3),
-                'baths': prop.get('baths', 2),
-                'sqft': prop.get('area', 1800),
-                'year_built': prop.get('yearBuilt', 2000),
-                'lot_size': prop.get('lotSize', 0.25),
-                'latitude': prop.get('latLong', {}).get('latitude'),
-                'longitude': prop.get('latLong', {}).get('longitude'),
-                'zestimate': prop.get('zestimate', 0),
-                'zpid': prop.get('zpid', ''),
-                'status': prop.get('statusText', 'Unknown'),
-                'image_url': prop.get('imgSrc', '')
-            }
+            return parse_subject_property(prop, address)
         return None
     except Exception as e:
-        return None
+        raise PropertyLookupError(str(e))
 
-def scrape_zillow_comps(zipcode, beds, baths, sqft, year_built):
+def parse_subject_property(prop, address):
+    full_address = prop.get('address', address)
+    address_parts = full_address.split(',')
+    city = address_parts[1].strip() if len(address_parts) > 1 else ''
+    state_zip = address_parts[2].strip() if len(address_parts) > 2 else ''
+    state = state_zip.split()[0] if state_zip else ''
+    zipcode = state_zip.split()[1] if len(state_zip.split()) > 1 else ''
+    
+    return {
+        'address': full_address,
+        'city': city,
+        'state': state,
+        'zipcode': zipcode,
+        'beds': prop.get('beds', 3),
+        'baths': prop.get('baths', 2),
+        'sqft': prop.get('area', 1800),
+        'year_built': prop.get('yearBuilt', 2000),
+        'lot_size': prop.get('lotSize', 0.25),
+        'latitude': (prop.get('latLong') or {}).get('latitude'),
+        'longitude': (prop.get('latLong') or {}).get('longitude'),
+        'zestimate': prop.get('zestimate', 0),
+        'zpid': prop.get('zpid', ''),
+        'status': prop.get('statusText', 'Unknown'),
+        'image_url': prop.get('imgSrc', '')
+    }
+
+def lookup_cache_keys(address=None, zpid=None):
+    keys = []
+    if zpid:
+        keys.append('zpid:' + str(zpid))
+    normalized = normalize_address(address)
+    if normalized:
+        keys.append('addr:' + normalized)
+    return keys
+
+def get_cached_subject_property(address=None, zpid=None):
+    # Returns (property_or_None, age) on a hit, None on a miss
+    for key in lookup_cache_keys(address, zpid):
+        cached = lookup_cache.get(key)
+        if cached is not None:
+            return cached
+    return None
+
+def cache_subject_property(address, prop):
+    if prop is None:
+        for key in lookup_cache_keys(address):
+            lookup_cache.set(key, None, ttl=LOOKUP_NEGATIVE_TTL)
+        return
+    # Index under the query, the canonical Zillow address and the zpid so
+    # later lookups by any of them resolve locally
+    keys = set(lookup_cache_keys(address, prop.get('zpid')))
+    keys.update(lookup_cache_keys(prop.get('address')))
+    for key in keys:
+        lookup_cache.set(key, prop)
+
+def fetch_subject_property(address, zpid=None):
     if not APIFY_TOKEN:
-        return get_demo_comps(zipcode, sqft)
+        return None
+    
+    cached = get_cached_subject_property(address, zpid)
+    if cached is not None:
+        inc('lookup_source_total', source='cache')
+        return cached[0]
+    if not address:
+        return None
     
-    min_year = max(1900, year_built - 10) if year_built else 1900
-    max_year = (year_built + 10) if year_built else 2025
-    min_sqft_range = str(int(sqft * 0.8))
-    max_sqft_range = str(int(sqft * 1.2))
+    def fetch():
+        try:
+            prop = fetch_subject_property_from_apify(address)
+        except PropertyLookupError:
+            inc('lookup_source_total', source='error')
+            return None, 0
+        inc('lookup_source_total', source='apify' if prop else 'not_found')
+        cache_subject_property(address, prop)
+        return prop, 0
     
-    actor_input = {
+    check = lambda: get_cached_subject_property(address)
+    return lookup_flight.do(normalize_address(address) or address, fetch, check)[0]
+
+def comp_search_key(zipcode, beds, baths, sqft, year_built):
+    # Nearby subjects (same zip, sqft within ~50, year within ~2) share one search
+    sqft_band = int(round(float(sqft) / 100.0)) * 100 if sqft else 0
+    year_band = int(round(int(year_built) / 5.0)) * 5 if year_built else 0
+    min_baths = round(max(1, float(baths) - 1) * 2) / 2
+    return (
+        str(zipcode).strip()[:5],
+        max(1, int(beds) - 1),
+        int(beds) + 1,
+        min_baths,
+        sqft_band,
+        year_band,
+        COMP_SOLD_WINDOW
+    )
+
+def comp_actor_input(search_key):
+    zipcode, min_beds, max_beds, min_baths, sqft_band, year_band, sold_window = search_key
+    min_year = max(1900, year_band - 10) if year_band else 1900
+    max_year = (year_band + 10) if year_band else 2025
+    
+    return {
         "location": zipcode,
         "operation": "sold",
         "sortBy": "newest",
-        "minBeds": max(1, beds - 1),
-        "maxBeds": beds + 1,
-        "minBaths": max(1, baths - 1),
+        "minBeds": min_beds,
+        "maxBeds": max_beds,
+        "minBaths": min_baths,
         "homeTypes": ["houses"],
         "minYearBuilt": min_year,
         "maxYearBuilt": max_year,
-        "minSize": min_sqft_range,
-        "maxSize": max_sqft_range,
-        "maxSoldDate": "6m",
-        "maxItems": 20
+        "minSize": str(int(sqft_band * 0.8)),
+        "maxSize": str(int(sqft_band * 1.2)),
+        "maxSoldDate": sold_window,
+        "maxItems": COMP_MAX_ITEMS
     }
+
+def normalize_comp(comp, zipcode):
+    # Fills in the fields the analysis reads; None when the comp is unusable
+    if not (comp.get('bedrooms') and comp.get('bathrooms') and 
+            comp.get('livingArea') and comp.get('price')):
+        return None
     
+    if not comp.get('address'):
+        comp['address'] = {
+            'streetAddress': comp.get('streetAddress', 'Unknown'),
+            'city': comp.get('city', ''),
+            'state': comp.get('state', 'GA'),
+            'zipcode': comp.get('zipcode', zipcode)
+        }
+    if not isinstance(comp.get('price'), dict):
+        comp['price'] = {'value': comp.get('price', 0)}
+    
+    comp['price_per_sqft'] = round(comp['price']['value'] / comp['livingArea'], 2)
+    comp['distance_miles'] = 0.0
+    comp['latitude'] = comp.get('latitude', comp.get('latLong', {}).get('latitude'))
+    comp['longitude'] = comp.get('longitude', comp.get('latLong', {}).get('longitude'))
+    return comp
+
+def iter_comps(items, zipcode):
+    for item in items:
+        comp = normalize_comp(item, zipcode)
+        if comp is not None:
+            yield comp
+
+def process_comps(comps, zipcode, on_comp=None):
+    # on_comp(comp) is called as each usable comp is parsed
+    parsed = []
+    for comp in islice(iter_comps(comps, zipcode), COMP_LIMIT):
+        if on_comp is not None:
+            on_comp(comp)
+        parsed.append(comp)
+    return parsed
+
+def collect_comps(items, zipcode, on_comp=None):
+    # Streams raw actor items through the warehouse and stops reading once
+    # COMP_LIMIT usable comps have been seen
+    items = comp_warehouse.recording(items, zipcode)
     try:
-        # Use synchronous call with waitForFinish
-        response = requests.post(
-            'https://api.apify.com/v2/acts/igolaizola~zillow-scraper-ppe/run-sync-get-dataset-items?token=' + APIFY_TOKEN,
-            json=actor_input,
-            timeout=300
-        )
-        
-        if response.status_code != 200 and response.status_code != 201:
-            return get_demo_comps(zipcode, sqft)
-        
-        comps = response.json()
-        processed_comps = []
-        
-        for comp in comps:
-            if (comp.get('bedrooms') and comp.get('bathrooms') and 
-                comp.get('livingArea') and comp.get('price')):
-                
-                if not comp.get('address'):
-                    comp['address'] = {
-                        'streetAddress': comp.get('streetAddress', 'Unknown'),
-                        'city': comp.get('city', ''),
-                        'state': comp.get('state', 'GA'),
-                        'zipcode': comp.get('zipcode', zipcode)
-                    }
-                if not isinstance(comp.get('price'), dict):
-                    comp['price'] = {'value': comp.get('price', 0)}
-                
-                comp['price_per_sqft'] = round(comp['price']['value'] / comp['livingArea'], 2)
-                comp['distance_miles'] = 0.0
-                comp['latitude'] = comp.get('latitude', comp.get('latLong', {}).get('latitude'))
-                comp['longitude'] = comp.get('longitude', comp.get('latLong', {}).get('longitude'))
-                processed_comps.append(comp)
-        
-        if processed_comps:
-            return processed_comps[:10]
-        return get_demo_comps(zipcode, sqft)
+        return process_comps(items, zipcode, on_comp)
+    finally:
+        items.close()
+
+def fetch_comps_from_apify(actor_input, zipcode, on_comp=None):
+    # None when the search found nothing usable; ApifyError when Apify failed
+    try:
+        with stage('apify_comps'):
+            return collect_comps(run_actor_items(COMPS_ACTOR, actor_input, APIFY_TOKEN), zipcode, on_comp) or None
+    except ApifyError:
+        raise
     except Exception as e:
-        return get_demo_comps(zipcode, sqft)
+        return None
 
-def calculate_distances(comps, subject_lat, subject_lon):
+def fetch_comps_from_warehouse(search_key, zipcode, near=None):
+    # near: (lat, lon) of the subject, to take the nearest comps within
+    # COMP_RADIUS_MILES instead of the newest sales in its ZIP
+    if near:
+        items, age = comp_warehouse.nearby(comp_actor_input(search_key), near[0], near[1], COMP_RADIUS_MILES, COMP_LIMIT, max_age=WAREHOUSE_MAX_AGE)
+    else:
+        items, age = comp_warehouse.search(comp_actor_input(search_key), max_age=WAREHOUSE_MAX_AGE)
+    if len(items) < WAREHOUSE_MIN_COMPS:
+        return None
+    comps = process_comps(items, zipcode)
+    if len(comps) < WAREHOUSE_MIN_COMPS:
+        return None
+    return comps, {'source': 'warehouse', 'cache_age_seconds': round(age, 1)}
+
+def local_comps(search_key, zipcode, near=None):
+    # Comps that can be served without calling Apify: (comps, source) or None
+    cached = comp_cache.get(search_key)
+    if cached is not None:
+        comps, age = cached
+        return comps, {'source': 'cache', 'cache_age_seconds': round(age, 1)}
+    return fetch_comps_from_warehouse(search_key, zipcode, near)
+
+def counted_comps(result):
+    comps, comp_source = result
+    inc('comp_source_total', source=comp_source['source'], degraded=str(comp_source.get('degraded', False)).lower())
+    return result
+
+def fetch_comps(zipcode, beds, baths, sqft, year_built, on_comp=None, near=None):
+    # Returns (comps, source) where source says where the comps came from.
+    # on_comp only sees comps parsed from this call's own Apify run; near is
+    # the subject's (lat, lon) for warehouse radius searches.
+    if not APIFY_TOKEN:
+        return counted_comps((get_demo_comps(zipcode, sqft), {'source': 'demo'}))
+    
+    search_key = comp_search_key(zipcode, beds, baths, sqft, year_built)
+    local = local_comps(search_key, zipcode, near)
+    if local is not None:
+        return counted_comps(local)
+    
+    def fetch():
+        try:
+            comps = fetch_comps_from_apify(comp_actor_input(search_key), zipcode, on_comp)
+        except ApifyError:
+            # Apify is failing or its circuit is open: answer now, flagged
+            return get_demo_comps(zipcode, sqft), {'source': 'demo', 'degraded': True}
+        if comps:
+            comp_cache.set(search_key, comps)
+            return comps, {'source': 'apify', 'cache_age_seconds': 0}
+        return get_demo_comps(zipcode, sqft), {'source': 'demo'}
+    
+    return counted_comps(comp_flight.do(search_key, fetch, lambda: local_comps(search_key, zipcode, near)))
+
+def scrape_zillow_comps(zipcode, beds, baths, sqft, year_built):
+    return fetch_comps(zipcode, beds, baths, sqft, year_built)[0]
+
+def calculate_distances(comps, subject_lat, subject_lon, radius_miles=None):
     if not subject_lat or not subject_lon:
         return comps
+    radius_miles = COMP_RADIUS_MILES if radius_miles is None else radius_miles
     
+    from spatial import distances_from
+    located = [c for c in comps if c.get('latitude') and c.get('longitude')]
+    miles = distances_from(subject_lat, subject_lon, [c['latitude'] for c in located], [c['longitude'] for c in located])
     for comp in comps:
-        if comp.get('latitude') and comp.get('longitude'):
-            distance = haversine_distance(subject_lat, subject_lon, comp['latitude'], comp['longitude'])
-            comp['distance_miles'] = round(distance, 2)
-        else:
-            comp['distance_miles'] = 999
+        comp['distance_miles'] = 999
+    for comp, distance in zip(located, miles.round(2).tolist()):
+        comp['distance_miles'] = distance
     
     comps.sort(key=lambda x: x['distance_miles'])
-    filtered = [c for c in comps if c['distance_miles'] <= 2.0]
+    filtered = [c for c in comps if c['distance_miles'] <= radius_miles]
     return filtered if filtered else comps[:5]
 
 def get_demo_comps(zipcode, sqft):
@@ -174,145 +358,6 @@ def get_demo_comps(zipcode, sqft):
         })
     return comps
 
-# Atlanta Metro FMR 2024
-FMR_RATES = {
-    '30002': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30004': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30005': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30008': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30012': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30013': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30014': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30016': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30017': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30019': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30021': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30024': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30030': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30032': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30033': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30034': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30035': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30038': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30039': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30040': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30041': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30043': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30044': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30045': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30046': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30047': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30052': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30058': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30060': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30062': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30064': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30066': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30067': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30068': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30071': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30072': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30075': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30076': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30078': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30079': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30080': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30082': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30083': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30084': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30087': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30088': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30092': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30093': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30094': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30096': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30097': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30101': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30102': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30106': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30107': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30114': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30115': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30126': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30127': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30134': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30135': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30137': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30141': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30144': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30152': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30157': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30168': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30180': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30188': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30189': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30213': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30214': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30215': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30228': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30236': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30238': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30248': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30252': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30253': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30260': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30269': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30273': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30274': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30281': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30288': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30291': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30294': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30296': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30297': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30301': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30303': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30305': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30306': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30307': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30308': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30309': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30310': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30311': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30312': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30313': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30314': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30315': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30316': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30317': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30318': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30319': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30322': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30324': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30326': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30327': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30328': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30329': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30331': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30332': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30334': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30336': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30337': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30338': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30339': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30340': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30341': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30342': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30344': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30345': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30349': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30350': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30354': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30360': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    '30363': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169},
-    'default': {'0br': 1089, '1br': 1199, '2br': 1409, '3br': 1829, '4br': 2169}
-}
-
-def get_fmr(zipcode, beds):
-    fmr_data = FMR_RATES.get(zipcode, FMR_RATES['default'])
-    bed_key = f'{min(beds, 4)}br' if beds > 0 else '0br'
-    return fmr_data.get(bed_key, fmr_data['2br'])
-
 def calculate_rental_scenarios(property_data, estimated_arv):
     purchase = property_data['purchasePrice']
     sqft = property_data['currentSqft']
@@ -688,19 +733,191 @@ def calculate_flip_scenarios(property_data, estimated_arv):
     
     return scenarios
 
+def parse_property_input(data):
+    return {
+        'address': data['address'],
+        'purchasePrice': float(data['purchasePrice']),
+        'currentSqft': float(data['currentSqft']),
+        'beds': int(data.get('beds', 3)),
+        'baths': float(data.get('baths', 2)),
+        'lotSize': float(data.get('lotSize', 0.25)),
+        'zipcode': data.get('zipcode', data['address'].split()[-1] if data['address'] else '30344'),
+        'yearBuilt': int(data.get('yearBuilt', 2000)),
+        'latitude': data.get('latitude'),
+        'longitude': data.get('longitude'),
+        'zestimate': data.get('zestimate', 0)
+    }
+
+def subject_location(property_data):
+    lat, lon = property_data.get('latitude'), property_data.get('longitude')
+    return (lat, lon) if lat and lon else None
+
+def property_search_key(property_data):
+    return comp_search_key(
+        property_data['zipcode'],
+        property_data['beds'],
+        property_data['baths'],
+        property_data['currentSqft'],
+        property_data['yearBuilt']
+    )
+
+def summarize_comps(property_data, comps, comp_source, radius_miles=None):
+    # Returns (comps block of the response, comp-based ARV)
+    if property_data.get('latitude') and property_data.get('longitude'):
+        with stage('distances'):
+            comps = calculate_distances(comps, property_data['latitude'], property_data['longitude'], radius_miles)
+    
+    avg_price = sum(c['price']['value'] for c in comps) / len(comps) if comps else 0
+    avg_price_per_sqft = sum(c['price_per_sqft'] for c in comps) / len(comps) if comps else 150
+    estimated_arv = avg_price_per_sqft * property_data['currentSqft']
+    
+    comps_block = {
+        'total_found': len(comps),
+        'average_price': round(avg_price),
+        'average_price_per_sqft': round(avg_price_per_sqft, 2),
+        'estimated_value': round(estimated_arv),
+        'properties': comps[:5],
+        'source': comp_source['source'],
+        'cache_age_seconds': comp_source.get('cache_age_seconds'),
+        'degraded': comp_source.get('degraded', False)
+    }
+    return comps_block, estimated_arv
+
+def assemble_analysis(property_data, comps_block, flip_scenarios, rental_scenarios):
+    all_scenarios = flip_scenarios + rental_scenarios
+    all_scenarios.sort(key=lambda x: x['roi'], reverse=True)
+    
+    return {
+        'address': property_data['address'],
+        'zestimate': property_data['zestimate'],
+        'propertyData': property_data,
+        'comps': comps_block,
+        'scenarios': all_scenarios,
+        'flip_scenarios': flip_scenarios,
+        'rental_scenarios': rental_scenarios,
+        'best_scenario': all_scenarios[0] if all_scenarios else None,
+        'best_flip': flip_scenarios[0] if flip_scenarios else None,
+        'best_rental': max(rental_scenarios, key=lambda x: x['roi']) if rental_scenarios else None
+    }
+
+def build_analysis(property_data, comps, comp_source, radius_miles=None):
+    comps_block, estimated_arv = summarize_comps(property_data, comps, comp_source, radius_miles)
+    
+    # Get all scenarios
+    with stage('scenarios'):
+        flip_scenarios = calculate_flip_scenarios(property_data, estimated_arv)
+        rental_scenarios = calculate_rental_scenarios(property_data, estimated_arv)
+    
+    return assemble_analysis(property_data, comps_block, flip_scenarios, rental_scenarios)
+
+def wants_async(data):
+    # Without a signing key there are no async jobs; the request runs inline
+    flag = request.args.get('async', data.get('async', False))
+    return jobs_enabled() and str(flag).lower() in ('1', 'true', 'yes')
+
+def job_response(job):
+    status_code = 200 if job['status'] != 'running' else 202
+    body = job_summary(job)
+    body['poll_url'] = f"/api/jobs/{job['id']}"
+    return jsonify(body), status_code
+
+def start_lookup_job(address, zpid):
+    # Job ids only carry the request and run ids. A cache hit finishes the
+    # job at once; an instance answering a later poll redoes the lookup.
+    cached = get_cached_subject_property(address, zpid)
+    if cached is not None or not address:
+        return complete_job(create_job('lookup', {'address': address, 'zpid': zpid}))
+    
+    run = start_actor_run(PROPERTY_ACTOR, {"addresses": address}, APIFY_TOKEN)
+    return create_job('lookup', {'address': address, 'zpid': zpid}, runs={'property': run})
+
+def start_analysis_job(property_data):
+    search_key = property_search_key(property_data)
+    payload = {'property_data': property_data, 'search_key': list(search_key)}
+    local = local_comps(search_key, property_data['zipcode'], subject_location(property_data)) if APIFY_TOKEN else None
+    if local is not None or not APIFY_TOKEN:
+        return complete_job(create_job('analyze', payload))
+    
+    try:
+        run = start_actor_run(COMPS_ACTOR, comp_actor_input(search_key), APIFY_TOKEN)
+    except ApifyError:
+        return complete_job(create_job('analyze', dict(payload, degraded=True)))
+    return create_job('analyze', payload, runs={'comps': run})
+
+def complete_job(job):
+    # Called once every actor run of the job has reached a terminal status,
+    # or straight away for a job started without runs. Those redo their
+    # lookup here, from the cache or warehouse when this instance has it.
+    payload = job['payload']
+    if not job['runs']:
+        if job['kind'] == 'lookup':
+            prop = fetch_subject_property(payload['address'], payload['zpid'])
+            return finish_job(job, result=prop, error=None if prop else 'Property not found')
+        property_data = payload['property_data']
+        if payload.get('degraded'):
+            comps = get_demo_comps(property_data['zipcode'], property_data['currentSqft'])
+            comp_source = {'source': 'demo', 'degraded': True}
+        else:
+            comps, comp_source = fetch_comps(
+                property_data['zipcode'], property_data['beds'], property_data['baths'],
+                property_data['currentSqft'], property_data['yearBuilt'], near=subject_location(property_data)
+            )
+        return finish_job(job, result=save_analysis(build_analysis(property_data, comps, comp_source)))
+    
+    run = next(iter(job['runs'].values()))
+    succeeded = run['status'] == 'SUCCEEDED' and run.get('dataset_id')
+    
+    if job['kind'] == 'lookup':
+        address = payload['address']
+        try:
+            items = list(iter_dataset_items(run['dataset_id'], APIFY_TOKEN, limit=1)) if succeeded else None
+        except Exception:
+            items = None
+        if items is None:
+            return finish_job(job, error=f"Property lookup {run['status'].lower()}")
+        try:
+            prop = parse_subject_property_items(items, address)
+        except PropertyLookupError as e:
+            return finish_job(job, error=str(e))
+        cache_subject_property(address, prop)
+        return finish_job(job, result=prop, error=None if prop else 'Property not found')
+    
+    property_data = payload['property_data']
+    comps = []
+    if succeeded:
+        try:
+            items = iter_dataset_items(run['dataset_id'], APIFY_TOKEN, limit=COMP_MAX_ITEMS)
+            comps = collect_comps(items, property_data['zipcode'])
+        except Exception:
+            comps = []
+    if comps:
+        comp_cache.set(tuple(payload['search_key']), comps)
+        comp_source = {'source': 'apify', 'cache_age_seconds': 0}
+    else:
+        comps = get_demo_comps(property_data['zipcode'], property_data['currentSqft'])
+        comp_source = {'source': 'demo'}
+    return finish_job(job, result=save_analysis(build_analysis(property_data, comps, comp_source)))
+
 @app.route('/api/lookup-property', methods=['POST'])
 def lookup_property():
     try:
         data = request.json
         address = data.get('address', '')
+        zpid = data.get('zpid')
         
-        if not address:
+        if not address and not zpid:
             return jsonify({'error': 'Address required'}), 400
         
-        property_details = fetch_subject_property(address)
+        if wants_async(data) and APIFY_TOKEN:
+            return job_response(start_lookup_job(address, zpid))
+        
+        with stage('lookup'):
+            property_details = fetch_subject_property(address, zpid)
         
         if property_details:
             return jsonify(property_details)
+        elif not apify_available():
+            return jsonify({'error': 'Property lookup is temporarily unavailable', 'degraded': True}), 503
         else:
             return jsonify({'error': 'Property not found'}), 404
     except Exception as e:
@@ -710,316 +927,555 @@ def lookup_property():
 def analyze_property():
     try:
         data = request.json
+        property_data = parse_property_input(data)
         
-        property_data = {
-            'address': data['address'],
-            'purchasePrice': float(data['purchasePrice']),
-            'currentSqft': float(data['currentSqft']),
-            'beds': int(data.get('beds', 3)),
-            'baths': float(data.get('baths', 2)),
-            'lotSize': float(data.get('lotSize', 0.25)),
-            'zipcode': data.get('zipcode', data['address'].split()[-1] if data['address'] else '30344'),
-            'yearBuilt': int(data.get('yearBuilt', 2000)),
-            'latitude': data.get('latitude'),
-            'longitude': data.get('longitude'),
-            'zestimate': data.get('zestimate', 0)
-        }
+        if wants_async(data):
+            return job_response(start_analysis_job(property_data))
         
-        comps = scrape_zillow_comps(
-            property_data['zipcode'],
-            property_data['beds'],
-            property_data['baths'],
-            property_data['currentSqft'],
-            property_data['yearBuilt']
-        )
-        
-        if property_data.get('latitude') and property_data.get('longitude'):
-            comps = calculate_distances(comps, property_data['latitude'], property_data['longitude'])
-        
-        avg_price = sum(c['price']['value'] for c in comps) / len(comps) if comps else 0
-        avg_price_per_sqft = sum(c['price_per_sqft'] for c in comps) / len(comps) if comps else 150
-        estimated_arv = avg_price_per_sqft * property_data['currentSqft']
-        
-        # Get all scenarios
-        flip_scenarios = calculate_flip_scenarios(property_data, estimated_arv)
-        rental_scenarios = calculate_rental_scenarios(property_data, estimated_arv)
-        
-        all_scenarios = flip_scenarios + rental_scenarios
-        all_scenarios.sort(key=lambda x: x['roi'], reverse=True)
+        with stage('comps'):
+            comps, comp_source = fetch_comps(
+                property_data['zipcode'],
+                property_data['beds'],
+                property_data['baths'],
+                property_data['currentSqft'],
+                property_data['yearBuilt'],
+                near=subject_location(property_data)
+            )
         
-        result = {
+        radius_miles = float(data['radius_miles']) if data.get('radius_miles') else None
+        analysis = build_analysis(property_data, comps, comp_source, radius_miles)
+        with stage('store'):
+            save_analysis(analysis)
+        compact, fields = wants_compact(data), requested_fields(data)
+        with stage('serialize'):
+            response = json_response(shape_analysis(analysis, compact, fields))
+        response.set_etag(analysis['analysis_id'] + variant_tag(compact, fields))
+        return response
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+SSE_KEEPALIVE_SECONDS = 15
+
+def sse_event(event, data):
+    return b'event: ' + event.encode() + b'\ndata: ' + dumps(data) + b'\n\n'
+
+def streamed_comp(comp, subject_lat, subject_lon):
+    # The displayed fields of one comp, with its distance worked out now
+    # rather than after every comp has arrived
+    streamed = compact_comp(comp)
+    if subject_lat and subject_lon and comp.get('latitude') and comp.get('longitude'):
+        streamed['distance_miles'] = round(haversine_distance(subject_lat, subject_lon, comp['latitude'], comp['longitude']), 2)
+    return streamed
+
+def analysis_events(property_data, radius_miles, compact, fields):
+    # property and rental scenarios need no comps and go out at once; comps
+    # follow one by one as the Apify dataset is parsed, then the comp summary
+    # with the ARV, the flip scenarios and finally the stored analysis
+    try:
+        yield sse_event('property', {
             'address': property_data['address'],
             'zestimate': property_data['zestimate'],
-            'propertyData': property_data,
-            'comps': {
-                'total_found': len(comps),
-                'average_price': round(avg_price),
-                'average_price_per_sqft': round(avg_price_per_sqft, 2),
-                'estimated_value': round(estimated_arv),
-                'properties': comps[:5]
-            },
-            'scenarios': all_scenarios,
-            'flip_scenarios': flip_scenarios,
+            'propertyData': property_data
+        })
+        with stage('scenarios'):
+            rental_scenarios = calculate_rental_scenarios(property_data, None)
+        yield sse_event('rental', {
             'rental_scenarios': rental_scenarios,
-            'best_scenario': all_scenarios[0] if all_scenarios else None,
-            'best_flip': flip_scenarios[0] if flip_scenarios else None,
             'best_rental': max(rental_scenarios, key=lambda x: x['roi']) if rental_scenarios else None
-        }
+        })
+        
+        lat, lon = property_data.get('latitude'), property_data.get('longitude')
+        events = queue.Queue()
         
-        return jsonify(result)
+        def fetch():
+            try:
+                events.put(('done', fetch_comps(
+                    property_data['zipcode'],
+                    property_data['beds'],
+                    property_data['baths'],
+                    property_data['currentSqft'],
+                    property_data['yearBuilt'],
+                    on_comp=lambda comp: events.put(('comp', streamed_comp(comp, lat, lon))),
+                    near=subject_location(property_data)
+                )))
+            except Exception as e:
+                events.put(('error', e))
+        
+        # The fetch finishes and fills the caches even if the client leaves
+        threading.Thread(target=fetch, name='stream-comps', daemon=True).start()
+        streamed = 0
+        with stage('comps'):
+            while True:
+                try:
+                    kind, payload = events.get(timeout=SSE_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield b': keep-alive\n\n'
+                    continue
+                if kind == 'error':
+                    raise payload
+                if kind == 'done':
+                    comps, comp_source = payload
+                    break
+                streamed += 1
+                yield sse_event('comp', payload)
+        if not streamed:
+            # Cache, warehouse, demo and coalesced comps arrive all at once
+            for comp in comps:
+                yield sse_event('comp', streamed_comp(comp, lat, lon))
+        
+        comps_block, estimated_arv = summarize_comps(property_data, comps, comp_source, radius_miles)
+        yield sse_event('comps', comps_block)
+        with stage('scenarios'):
+            flip_scenarios = calculate_flip_scenarios(property_data, estimated_arv)
+        analysis = assemble_analysis(property_data, comps_block, flip_scenarios, rental_scenarios)
+        yield sse_event('flip', {
+            'flip_scenarios': flip_scenarios,
+            'best_flip': analysis['best_flip'],
+            'best_scenario': analysis['best_scenario']
+        })
+        with stage('store'):
+            save_analysis(analysis)
+        yield sse_event('analysis', shape_analysis(analysis, compact, fields))
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+        yield sse_event('error', {'error': str(e)})
+
+@app.route('/api/analyze/stream', methods=['GET', 'POST'])
+def analyze_stream():
+    # The /api/analyze body (or the same fields as query parameters, for
+    # EventSource) answered as Server-Sent Events
+    data = request.get_json(force=True, silent=True) if request.method == 'POST' else request.args.to_dict()
+    try:
+        if request.method == 'GET':
+            for key in ('latitude', 'longitude', 'zestimate'):
+                if data.get(key):
+                    data[key] = float(data[key])
+        property_data = parse_property_input(data)
+        radius_miles = float(data['radius_miles']) if data.get('radius_miles') else None
+    except Exception as e:
+        return jsonify({'error': f'Invalid property: {e}'}), 400
+    
+    body = analysis_events(property_data, radius_miles, wants_compact(data), requested_fields(data))
+    return Response(stream_with_context(body), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+def batch_summary_row(index, property_data, comps_block, summaries):
+    # Mirrors assemble_analysis' ranking: stable sort by ROI, best_flip is the
+    # first flip scenario, best_rental the highest-ROI rental
+    comps = dict(comps_block)
+    comps.pop('properties', None)
+    ranked = sorted(summaries, key=lambda x: x['roi'], reverse=True)
+    rentals = [s for s in summaries if s['type'] == 'rental']
+    return {
+        'index': index,
+        'status': 'ok',
+        'address': property_data['address'],
+        'purchase_price': property_data['purchasePrice'],
+        'comps': comps,
+        'best_scenario': ranked[0],
+        'best_flip': summaries[0],
+        'best_rental': max(rentals, key=lambda x: x['roi']),
+        'roi_by_scenario': {s['name']: s['roi'] for s in summaries}
+    }
+
+def analyze_batch_group(search_key, members, detail):
+    from scenario_engine import compute_scenarios, scenario_dicts, scenario_summaries
+    
+    first = members[0][1]
+    comps, comp_source = fetch_comps(
+        first['zipcode'], first['beds'], first['baths'], first['currentSqft'], first['yearBuilt']
+    )
+    
+    rows = []
+    analyzed = []
+    for index, property_data in members:
+        try:
+            # calculate_distances sorts and annotates in place, so each
+            # property gets its own shallow copies of the shared comps
+            comps_block, estimated_arv = summarize_comps(property_data, [dict(c) for c in comps], comp_source)
+            analyzed.append((index, property_data, comps_block, estimated_arv))
+        except Exception as e:
+            rows.append({'index': index, 'status': 'error', 'error': str(e)})
+    if not analyzed:
+        return rows
+    
+    # One vectorized pass over every property in the group
+    results = compute_scenarios(
+        [a[1]['purchasePrice'] for a in analyzed],
+        [a[1]['currentSqft'] for a in analyzed],
+        [a[1]['beds'] for a in analyzed],
+        [get_fmr(a[1]['zipcode'], a[1]['beds']) for a in analyzed],
+        [a[3] for a in analyzed]
+    )
+    for i, (index, property_data, comps_block, _) in enumerate(analyzed):
+        if detail == 'full':
+            flip_scenarios, rental_scenarios = scenario_dicts(results, i)
+            analysis = assemble_analysis(property_data, comps_block, flip_scenarios, rental_scenarios)
+            rows.append({'index': index, 'status': 'ok', 'analysis': analysis})
+        else:
+            rows.append(batch_summary_row(index, property_data, comps_block, scenario_summaries(results, i)))
+    return rows
+
+@app.route('/api/analyze/batch', methods=['POST'])
+def analyze_batch():
+    try:
+        rows = parse_batch_request(request)
+    except BatchInputError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    detail = request.args.get('detail', 'summary')
+    compact, fields = wants_compact(), requested_fields()
+    parsed = []
+    invalid = []
+    for index, row in enumerate(rows):
+        try:
+            parsed.append((index, parse_property_input(row)))
+        except Exception as e:
+            invalid.append({'index': index, 'status': 'error', 'error': f'Invalid property: {e}'})
+    groups = group_by_key(parsed, property_search_key)
+    
+    def encode(row):
+        if compact and 'analysis' in row:
+            row['analysis'] = shape_analysis(row['analysis'], compact=True)
+        return dumps(project(row, fields) if fields else row) + b'\n'
+    
+    def generate():
+        for row in invalid:
+            yield encode(row)
+        for group_rows in iter_group_results(groups, lambda key, members: analyze_batch_group(key, members, detail)):
+            # One chunk per group keeps compression flushes coarse
+            yield b''.join(encode(row) for row in group_rows)
+    
+    body, encoding = compressed_stream(generate())
+    headers = {'X-Batch-Size': str(len(rows)), 'X-Comp-Searches': str(len(groups)), 'Vary': 'Accept-Encoding'}
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(stream_with_context(body), mimetype='application/x-ndjson', headers=headers)
+
+SENSITIVITY_MAX_CELLS = int(os.getenv('SENSITIVITY_MAX_CELLS', 250000))
+
+def parse_grid_axis(spec, scale=1.0):
+    # An axis is a list of values or {"min": .., "max": .., "steps": ..}
+    import numpy as np
+    if spec is None:
+        return None
+    if isinstance(spec, dict):
+        values = np.linspace(float(spec['min']), float(spec['max']), int(spec.get('steps', 10)))
+    elif isinstance(spec, (list, tuple)):
+        values = np.asarray([float(v) for v in spec])
+    else:
+        values = np.asarray([float(spec)])
+    if values.size == 0:
+        raise ValueError('Grid axes cannot be empty')
+    return values * scale
 
-@app.route('/api/report/pdf', methods=['POST'])
-def create_pdf_report():
+@app.route('/api/sensitivity', methods=['POST'])
+def sensitivity_analysis():
     try:
-        from reportlab.lib.pagesizes import letter
-        from reportlab.lib import colors
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.lib.units import inch
-        from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-        from reportlab.lib.enums import TA_CENTER
+        from scenario_engine import RENTALS, FLIP_LEVELS, sensitivity_grid
         
         data = request.json
-        buffer = BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch)
-        story = []
-        styles = getSampleStyleSheet()
+        property_data = parse_property_input(data)
+        grid = data.get('grid', {})
         
-        title_style = ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=18, textColor=colors.HexColor('#1E293B'), spaceAfter=15, alignment=TA_CENTER)
-        heading_style = ParagraphStyle('Heading', parent=styles['Heading2'], fontSize=14, textColor=colors.HexColor('#1E293B'), spaceAfter=10, spaceBefore=15)
+        rental = data.get('rental_scenario', 'Open Market Rental')
+        flip_level = data.get('flip_level', 'medium')
+        if rental not in [spec[0] for spec in RENTALS]:
+            return jsonify({'error': f'Unknown rental scenario: {rental}'}), 400
+        if flip_level not in [level[0] for level in FLIP_LEVELS]:
+            return jsonify({'error': f'Unknown flip level: {flip_level}'}), 400
         
-        # Title
-        story.append(Paragraph("Real Estate Investment Analysis", title_style))
-        story.append(Paragraph(f"<b>Address:</b> {data.get('address', 'N/A')}", styles['Normal']))
-        story.append(Paragraph(f"<b>Date:</b> {datetime.now().strftime('%B %d, %Y')}", styles['Normal']))
+        ask = property_data['purchasePrice']
+        if 'purchase_discount_pct' in grid:
+            purchase_prices = ask * (1 - parse_grid_axis(grid['purchase_discount_pct']) / 100)
+        else:
+            purchase_prices = parse_grid_axis(grid.get('purchase_price', [ask]))
+        interest_rates = parse_grid_axis(grid.get('interest_rate', [7.0]), scale=0.01)
+        down_payment_pcts = parse_grid_axis(grid.get('down_payment_pct', [20.0]), scale=0.01)
+        rents = parse_grid_axis(grid.get('rent'))
+        rehab_per_sqft = parse_grid_axis(grid.get('rehab_per_sqft'))
         
-        prop = data.get('propertyData', {})
-        story.append(Paragraph(f"<b>Purchase Price:</b> ${prop.get('purchasePrice', 0):,.0f} | <b>SqFt:</b> {prop.get('currentSqft', 0):,.0f} | <b>Beds/Baths:</b> {prop.get('beds', 0)}/{prop.get('baths', 0)}", styles['Normal']))
-        story.append(Spacer(1, 15))
+        cells = 1
+        for axis in (purchase_prices, interest_rates, down_payment_pcts, rents, rehab_per_sqft):
+            cells *= len(axis) if axis is not None else 1
+        if cells > SENSITIVITY_MAX_CELLS:
+            return jsonify({'error': f'Grid has {cells} cells; limit is {SENSITIVITY_MAX_CELLS}'}), 400
         
-        # Comps Section
-        if data.get('comps') and data['comps'].get('properties'):
-            story.append(Paragraph("Comparable Sales", heading_style))
-            
-            # Summary
-            comps = data['comps']
-            summary_data = [
-                ['Comps Found', 'Avg Price', 'Avg $/SqFt', 'Estimated ARV'],
-                [str(comps.get('total_found', 0)), f"${comps.get('average_price', 0):,.0f}", f"${comps.get('average_price_per_sqft', 0):.2f}", f"${comps.get('estimated_value', 0):,.0f}"]
-            ]
-            t = Table(summary_data, colWidths=[1.5*inch, 1.5*inch, 1.5*inch, 1.5*inch])
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3B82F6')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 9),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E2E8F0'))
-            ]))
-            story.append(t)
-            story.append(Spacer(1, 10))
-            
-            # Individual comps
-            comp_data = [['Address', 'Price', 'Beds/Bath', 'SqFt', '$/SqFt', 'Dist']]
-            for comp in comps.get('properties', [])[:5]:
-                addr = comp.get('address', {})
-                street = addr.get('streetAddress', comp.get('streetAddress', 'N/A'))
-                price = comp.get('price', {})
-                price_val = price.get('value', price) if isinstance(price, dict) else price
-                comp_data.append([
-                    street[:25],
-                    f"${price_val:,.0f}",
-                    f"{comp.get('bedrooms', 0)}/{comp.get('bathrooms', 0)}",
-                    f"{comp.get('livingArea', 0):,}",
-                    f"${comp.get('price_per_sqft', 0):.0f}",
-                    f"{comp.get('distance_miles', 0):.1f}mi"
-                ])
-            
-            t = Table(comp_data, colWidths=[1.8*inch, 0.9*inch, 0.7*inch, 0.7*inch, 0.6*inch, 0.6*inch])
-            t.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#64748B')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 8),
-                ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E2E8F0'))
-            ]))
-            story.append(t)
+        arv = data.get('arv')
+        comps_source = None
+        if arv:
+            arv = float(arv)
+        else:
+            comps, comp_source = fetch_comps(
+                property_data['zipcode'], property_data['beds'], property_data['baths'],
+                property_data['currentSqft'], property_data['yearBuilt'], near=subject_location(property_data)
+            )
+            _, arv = summarize_comps(property_data, comps, comp_source)
+            comps_source = comp_source['source']
         
-        story.append(Spacer(1, 15))
+        result = sensitivity_grid(
+            property_data['currentSqft'],
+            property_data['beds'],
+            get_fmr(property_data['zipcode'], property_data['beds']),
+            arv,
+            purchase_prices,
+            interest_rates=interest_rates,
+            down_payment_pcts=down_payment_pcts,
+            rents=rents,
+            rehab_per_sqft=rehab_per_sqft,
+            rental=rental,
+            flip_level=flip_level
+        )
         
-        # Flip Scenarios
-        if data.get('flip_scenarios'):
-            story.append(Paragraph("Fix & Flip Analysis (10% Down, 3 Points, 10% Interest)", heading_style))
-            
-            for s in data['flip_scenarios']:
-                scenario_title = f"<b>{s['name']}</b>"
-                if s.get('meets_70_rule') == True:
-                    scenario_title += " <font color='green'>[MEETS 70% RULE]</font>"
-                elif s.get('meets_70_rule') == False:
-                    scenario_title += " <font color='red'>[FAILS 70% RULE]</font>"
-                story.append(Paragraph(scenario_title, styles['Normal']))
-                
-                if s.get('costs'):
-                    costs = s['costs']
-                    flip_data = [
-                        ['Purchase', 'Rehab', 'Points', 'Interest', 'Closing', 'Holding', 'Total Costs'],
-                        [f"${costs.get('purchase', 0):,.0f}", f"${costs.get('rehab', 0):,.0f}", f"${costs.get('points', 0):,.0f}", 
-                         f"${costs.get('interest', 0):,.0f}", f"${costs.get('closing_buy', 0) + costs.get('closing_sell', 0):,.0f}",
-                         f"${costs.get('holding', 0):,.0f}", f"${costs.get('total', 0):,.0f}"]
-                    ]
-                    t = Table(flip_data, colWidths=[0.85*inch]*7)
-                    t.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F59E0B')),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, -1), 7),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E2E8F0'))
-                    ]))
-                    story.append(t)
-                
-                profit_data = [
-                    ['ARV', 'Max (70%)', 'Cash Needed', 'Gross Profit', 'Net Profit', 'ROI', 'Timeline'],
-                    [f"${s.get('arv', 0):,.0f}", f"${s.get('max_purchase_70_rule', 0):,.0f}", f"${s.get('cash_needed', 0):,.0f}",
-                     f"${s.get('gross_profit', 0):,.0f} ({s.get('gross_profit_pct', 0)}%)", 
-                     f"${s.get('profit', 0):,.0f} ({s.get('net_profit_pct', 0)}%)",
-                     f"{s.get('roi', 0)}%", s.get('timeline', '')]
-                ]
-                t = Table(profit_data, colWidths=[0.85*inch]*7)
-                t.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#22C55E')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 7),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E2E8F0'))
-                ]))
-                story.append(t)
-                story.append(Spacer(1, 8))
+        # Rates and down payments go back out in percent, like the inputs
+        for axis in result['axes']:
+            if axis['name'] in ('interest_rate', 'down_payment_pct'):
+                axis['values'] = [round(v * 100, 4) for v in axis['values']]
+        for name in ('interest_rate', 'down_payment_pct'):
+            if name in result['fixed']:
+                result['fixed'][name] = round(result['fixed'][name] * 100, 4)
         
-        story.append(PageBreak())
+        return jsonify({
+            'address': property_data['address'],
+            'arv': round(arv),
+            'comps_source': comps_source,
+            'rental_scenario': rental,
+            'flip_level': flip_level,
+            'axes': result['axes'],
+            'fixed': result['fixed'],
+            'monthly_cash_flow': result['cash_flow'].round(0).tolist(),
+            'cash_on_cash': result['cash_on_cash'].round(1).tolist(),
+            'net_profit': result['net_profit'].round(0).tolist()
+        })
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f'Invalid input: {e}'}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/simulate', methods=['POST'])
+def simulate_rental():
+    try:
+        from simulation import SIMULATION_MAX_PATHS, rental_base, run_simulation
+        
+        data = request.json
+        property_data = parse_property_input(data)
         
-        # Rental Scenarios
-        if data.get('rental_scenarios'):
-            story.append(Paragraph("Rental Analysis (20% Down, 7% Rate, 50% Expense Rule)", heading_style))
-            
-            for s in data['rental_scenarios']:
-                story.append(Paragraph(f"<b>{s['name']}</b>", styles['Normal']))
-                
-                # Income section
-                income_data = [
-                    ['Monthly Rent', 'Vacancy', 'EGI', 'Total Expenses', 'NOI', 'Mortgage', 'Cash Flow'],
-                    [f"${s.get('monthly_rent', 0):,.0f}", f"${s.get('vacancy', 0):,.0f} ({s.get('vacancy_rate', 0)}%)", 
-                     f"${s.get('effective_gross_income', 0):,.0f}", 
-                     f"${s.get('expenses', {}).get('total', 0):,.0f}",
-                     f"${s.get('noi', 0):,.0f}", f"${s.get('monthly_mortgage', 0):,.0f}", 
-                     f"${s.get('monthly_cash_flow', 0):,.0f}"]
-                ]
-                t = Table(income_data, colWidths=[0.85*inch]*7)
-                t.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3B82F6')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 7),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E2E8F0'))
-                ]))
-                story.append(t)
-                
-                # Expenses breakdown
-                if s.get('expenses'):
-                    exp = s['expenses']
-                    exp_data = [
-                        ['Mgmt (10%)', 'Repairs (8%)', 'CapEx (8%)', 'Taxes (10%)', 'Insurance (6%)', 'Total (50%)'],
-                        [f"${exp.get('management', 0):,.0f}", f"${exp.get('repairs', 0):,.0f}", f"${exp.get('capex', 0):,.0f}",
-                         f"${exp.get('taxes', 0):,.0f}", f"${exp.get('insurance', 0):,.0f}", f"${exp.get('total', 0):,.0f}"]
-                    ]
-                    t = Table(exp_data, colWidths=[1*inch]*6)
-                    t.setStyle(TableStyle([
-                        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#64748B')),
-                        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                        ('FONTSIZE', (0, 0), (-1, -1), 7),
-                        ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E2E8F0'))
-                    ]))
-                    story.append(t)
-                
-                # Returns
-                returns_data = [
-                    ['Cash Invested', 'Annual CF', 'Cash-on-Cash', 'Cap Rate', 'DSCR', '1% Rule'],
-                    [f"${s.get('cash_invested', 0):,.0f}", f"${s.get('annual_cash_flow', 0):,.0f}",
-                     f"{s.get('cash_on_cash', 0)}%", f"{s.get('cap_rate', 0)}%", 
-                     f"{s.get('dscr', 0)}", f"{s.get('one_pct_rule', 0)}%"]
-                ]
-                t = Table(returns_data, colWidths=[1*inch]*6)
-                t.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#22C55E')),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, -1), 7),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E2E8F0'))
-                ]))
-                story.append(t)
-                story.append(Spacer(1, 10))
+        paths = int(data.get('paths', 100000))
+        hold_years = int(data.get('hold_years', 10))
+        if not 1 <= paths <= SIMULATION_MAX_PATHS:
+            return jsonify({'error': f'paths must be between 1 and {SIMULATION_MAX_PATHS}'}), 400
+        if not 1 <= hold_years <= 40:
+            return jsonify({'error': 'hold_years must be between 1 and 40'}), 400
+        
+        base = rental_base(
+            property_data['purchasePrice'],
+            property_data['currentSqft'],
+            property_data['beds'],
+            get_fmr(property_data['zipcode'], property_data['beds']),
+            data.get('scenario', 'Open Market Rental')
+        )
+        simulation = run_simulation(
+            base,
+            data.get('distributions'),
+            hold_years=hold_years,
+            paths=paths,
+            seed=int(data.get('seed', 0)),
+            workers=data.get('workers')
+        )
         
-        doc.build(story)
-        buffer.seek(0)
-        return send_file(buffer, as_attachment=True, download_name='analysis_report.pdf', mimetype='application/pdf')
+        return jsonify({
+            'address': property_data['address'],
+            'scenario': base['scenario'],
+            'base_monthly_rent': round(base['gross_rent']),
+            'base_monthly_cash_flow': round(base['deterministic_monthly_cash_flow']),
+            'cash_invested': round(base['cash_invested']),
+            'simulation': simulation
+        })
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f'Invalid input: {e}'}), 400
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/report/excel', methods=['POST'])
-def create_excel_report():
+def estimate_arvs(parsed):
+    # parsed: [(index, property_data)]; uses a supplied "arv" when present and
+    # otherwise the comp-based estimate, fetching each comp search once.
+    # Returns (arvs, errors), both keyed by index; a group whose comps can't
+    # be fetched only fails its own properties.
+    arvs = {}
+    errors = {}
+    missing = []
+    for index, property_data in parsed:
+        if property_data.get('arv'):
+            arvs[index] = float(property_data['arv'])
+        else:
+            missing.append((index, property_data))
+    
+    def estimate_group(search_key, members):
+        first = members[0][1]
+        comps, comp_source = fetch_comps(
+            first['zipcode'], first['beds'], first['baths'], first['currentSqft'], first['yearBuilt']
+        )
+        rows = []
+        for index, property_data in members:
+            try:
+                rows.append({'index': index, 'status': 'ok', 'arv': summarize_comps(property_data, [dict(c) for c in comps], comp_source)[1]})
+            except Exception as e:
+                rows.append({'index': index, 'status': 'error', 'error': str(e)})
+        return rows
+    
+    for group in iter_group_results(group_by_key(missing, property_search_key), estimate_group):
+        for row in group:
+            if row['status'] == 'ok':
+                arvs[row['index']] = row['arv']
+            else:
+                errors[row['index']] = row['error']
+    return arvs, errors
+
+@app.route('/api/max-offer', methods=['POST'])
+def max_offer():
     try:
-        import openpyxl
-        from openpyxl.styles import Font, PatternFill
+        from offer_solver import solve_max_offers
         
         data = request.json
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Analysis"
+        rows = data.get('properties') or [data]
+        if len(rows) > BATCH_MAX_PROPERTIES:
+            return jsonify({'error': f'Batch limited to {BATCH_MAX_PROPERTIES} properties'}), 400
+        
+        parsed = []
+        for index, row in enumerate(rows):
+            # The asking price is not needed to solve for the maximum offer
+            property_data = parse_property_input(dict(row, purchasePrice=row.get('purchasePrice', 0)))
+            property_data['arv'] = row.get('arv')
+            parsed.append((index, property_data))
+        arvs, errors = estimate_arvs(parsed)
+        if 'properties' not in data and errors:
+            return jsonify({'error': errors[0]}), 500
+        solvable = [(index, p) for index, p in parsed if index in arvs]
+        
+        solved = solve_max_offers(
+            [p['currentSqft'] for _, p in solvable],
+            [p['beds'] for _, p in solvable],
+            [get_fmr(p['zipcode'], p['beds']) for _, p in solvable],
+            [arvs[i] for i, _ in solvable],
+            targets=data.get('targets'),
+            method=data.get('method', 'auto')
+        ) if solvable else {}
+        
+        results = [{'index': index, 'address': p['address'], 'error': errors[index]}
+                   for index, p in parsed if index not in arvs]
+        for i, (index, property_data) in enumerate(solvable):
+            offers = []
+            for scenario, solution in solved.items():
+                price = solution['prices'][i]
+                offers.append({
+                    'scenario': scenario,
+                    'metric': solution['metric'],
+                    'target': solution['target'],
+                    'method': solution['method'],
+                    'max_purchase_price': None if price != price else round(float(price))
+                })
+            results.append({
+                'index': index,
+                'address': property_data['address'],
+                'arv': round(arvs[index]),
+                'offers': offers
+            })
+        results.sort(key=lambda row: row['index'])
         
-        ws['A1'] = "Real Estate Investment Analysis"
-        ws['A1'].font = Font(bold=True, size=16)
-        ws['A3'] = "Address:"
-        ws['B3'] = data.get('address', '')
+        if 'properties' not in data:
+            return jsonify(results[0])
+        return jsonify({'results': results})
+    except (KeyError, ValueError) as e:
+        return jsonify({'error': f'Invalid input: {e}'}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    try:
+        job = get_job(job_id)
+        if not job:
+            return jsonify({'error': 'Job not found'}), 404
         
-        if data.get('scenarios'):
-            ws['A5'] = "Strategy"
-            ws['B5'] = "ROI"
-            ws['C5'] = "Profit/Cash Flow"
-            for col in ['A5', 'B5', 'C5']:
-                ws[col].font = Font(bold=True)
-                ws[col].fill = PatternFill(start_color="3B82F6", end_color="3B82F6", fill_type="solid")
-            
-            row = 6
-            for s in data['scenarios'][:8]:
-                ws[f'A{row}'] = s['name']
-                ws[f'B{row}'] = f"{s['roi']}%"
-                profit = s.get('profit') or s.get('annual_cash_flow', 0)
-                ws[f'C{row}'] = profit
-                row += 1
+        if job['status'] == 'running' and refresh_runs(job, APIFY_TOKEN):
+            job = complete_job(job)
         
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        return send_file(buffer, as_attachment=True, download_name='analysis_report.xlsx', mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        return job_response(job)
     except Exception as e:
+        import traceback
+        traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/analyses/<analysis_id>', methods=['GET'])
+def get_analysis(analysis_id):
+    # Ids are content hashes, so a matching If-None-Match is answered
+    # without touching the store
+    compact, fields = wants_compact(), requested_fields()
+    etag = analysis_id + variant_tag(compact, fields)
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers={'ETag': f'"{etag}"'})
+    analysis = load_analysis(analysis_id)
+    if analysis is None:
+        return jsonify({'error': 'Analysis not found'}), 404
+    response = json_response(shape_analysis(analysis, compact, fields))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+def collect_service_metrics():
+    caches = {'comps': comp_cache, 'lookups': lookup_cache, 'analyses': analysis_store}
+    for name, cache in caches.items():
+        stats = cache.stats()
+        for result in ('hits', 'misses'):
+            yield 'cache_requests_total', 'counter', 'Cache lookups by cache and result', {'cache': name, 'result': result}, stats[result]
+        yield 'cache_entries', 'gauge', 'Entries stored per cache', {'cache': name}, stats['entries']
+    
+    apify = apify_stats()
+    yield 'apify_circuit_open', 'gauge', 'Whether the Apify circuit breaker is open', {}, int(apify['circuit']['state'] == 'open')
+    for operation, call in apify['calls'].items():
+        for field in ('calls', 'errors', 'retries'):
+            yield f'apify_{field}_total', 'counter', f'Apify {field} by operation', {'operation': operation}, call[field]
+    
+    for name, flight in (('comps', comp_flight), ('lookups', lookup_flight)):
+        for outcome, count in flight.stats().items():
+            if outcome not in ('mode', 'in_flight'):
+                yield 'singleflight_total', 'counter', 'Single-flight calls by outcome', {'flight': name, 'outcome': outcome}, count
+
+add_collector(collect_service_metrics)
+
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/health', methods=['GET'])
 @app.route('/api/health', methods=['GET'])
 def health_check():
-    return jsonify({'status': 'healthy', 'apify_configured': bool(APIFY_TOKEN)})
+    return jsonify({
+        'status': 'healthy',
+        'apify_configured': bool(APIFY_TOKEN),
+        'cache': {
+            'comps': comp_cache.stats(),
+            'lookups': lookup_cache.stats(),
+            'analyses': analysis_store.stats()
+        },
+        'warehouse': comp_warehouse.stats(),
+        'apify': apify_stats(),
+        'singleflight': {
+            'comps': comp_flight.stats(),
+            'lookups': lookup_flight.stats()
+        }
+    })
 
 @app.route('/')
 def index():
@@ -1031,3 +1487,9 @@ def static_files(path):
 
 # Vercel handler
 app = app
+
+if __name__ == '__main__':
+    # Local development serves the report routes from the same process
+    from reports import reports
+    app.register_blueprint(reports)
+    app.run(debug=True, port=int(os.getenv('PORT', 5000)))
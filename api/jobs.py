@@ -0,0 +1,149 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import re
+import time
+import zlib
+
+from apify import TERMINAL_RUN_STATUSES, get_actor_run
+from cache import PersistentCache
+
+JOB_TTL = int(os.getenv('JOB_TTL', 24 * 3600))
+
+# Instances share no storage, so a job id carries everything needed to resume
+# the job: its kind, payload and actor run ids, signed so that a poll can't
+# point the service at someone else's runs. Any instance can decode the id,
+# poll Apify and finish the job; job_store only keeps the progress and result
+# this instance has already seen. Without JOB_SIGNING_KEY there is no secret
+# to sign with, so async jobs are off and requests run synchronously.
+job_store = PersistentCache(
+    'jobs',
+    ttl=JOB_TTL,
+    max_entries=int(os.getenv('JOB_MAX_ENTRIES', 10000)),
+    memory_entries=0
+)
+
+JOB_SIGNING_KEY = os.getenv('JOB_SIGNING_KEY', '').encode('utf-8')
+# base64url body, a dot and the 18-byte signature
+JOB_ID_PATTERN = re.compile(r'[A-Za-z0-9_-]{1,8192}\.[A-Za-z0-9_-]{24}')
+
+
+def jobs_enabled():
+    return bool(JOB_SIGNING_KEY)
+
+
+def job_signature(body):
+    digest = hmac.new(JOB_SIGNING_KEY, body.encode('ascii'), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:18]).decode('ascii')
+
+
+def encode_job_id(kind, created_at, payload, runs):
+    state = {
+        'kind': kind,
+        'created_at': created_at,
+        'payload': payload,
+        'runs': {name: {'run_id': run['run_id'], 'dataset_id': run.get('dataset_id')} for name, run in runs.items()}
+    }
+    packed = zlib.compress(json.dumps(state, sort_keys=True, separators=(',', ':')).encode('utf-8'), 9)
+    body = base64.urlsafe_b64encode(packed).decode('ascii').rstrip('=')
+    return f'{body}.{job_signature(body)}'
+
+
+def looks_like_job_id(value):
+    return isinstance(value, str) and JOB_ID_PATTERN.fullmatch(value) is not None
+
+
+def decode_job_id(job_id):
+    # The job a signed id describes, as it was when started; None when the
+    # id is malformed, forged or older than JOB_TTL
+    body, _, signature = job_id.partition('.')
+    if not jobs_enabled() or not looks_like_job_id(job_id) or not hmac.compare_digest(signature, job_signature(body)):
+        return None
+    try:
+        state = json.loads(zlib.decompress(base64.urlsafe_b64decode(body + '=' * (-len(body) % 4))))
+    except (ValueError, zlib.error):
+        return None
+    if time.time() - state['created_at'] > JOB_TTL:
+        return None
+    return {
+        'id': job_id,
+        'kind': state['kind'],
+        'status': 'running',
+        'created_at': state['created_at'],
+        'updated_at': time.time(),
+        'payload': state['payload'],
+        # Run statuses aren't part of the id; refresh_runs asks Apify
+        'runs': {name: dict(run, status='READY') for name, run in state['runs'].items()},
+        'result': None,
+        'error': None
+    }
+
+
+def create_job(kind, payload, runs=None):
+    now = time.time()
+    runs = runs or {}
+    job = {
+        'id': encode_job_id(kind, now, payload, runs),
+        'kind': kind,
+        'status': 'running',
+        'created_at': now,
+        'updated_at': now,
+        'payload': payload,
+        'runs': runs,
+        'result': None,
+        'error': None
+    }
+    save_job(job)
+    return job
+
+
+def get_job(job_id):
+    if not isinstance(job_id, str):
+        return None
+    cached = job_store.get(job_id)
+    return cached[0] if cached is not None else decode_job_id(job_id)
+
+
+def save_job(job):
+    job['updated_at'] = time.time()
+    job_store.set(job['id'], job)
+
+
+def finish_job(job, result=None, error=None):
+    job['status'] = 'failed' if error else 'succeeded'
+    job['result'] = result
+    job['error'] = error
+    save_job(job)
+    return job
+
+
+def refresh_runs(job, token):
+    # Poll every unfinished actor run once; returns True when all are terminal
+    for run in job['runs'].values():
+        if run['status'] in TERMINAL_RUN_STATUSES:
+            continue
+        try:
+            latest = get_actor_run(run['run_id'], token)
+        except Exception:
+            continue
+        run['status'] = latest['status']
+        run['dataset_id'] = latest['dataset_id'] or run.get('dataset_id')
+    save_job(job)
+    return all(run['status'] in TERMINAL_RUN_STATUSES for run in job['runs'].values())
+
+
+def job_summary(job):
+    summary = {
+        'job_id': job['id'],
+        'kind': job['kind'],
+        'status': job['status'],
+        'runs': {name: run['status'] for name, run in job['runs'].items()},
+        'elapsed_seconds': round(job['updated_at'] - job['created_at'], 1)
+    }
+    if job['status'] == 'succeeded':
+        summary['result'] = job['result']
+    if job['error']:
+        summary['error'] = job['error']
+    return summary
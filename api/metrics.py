@@ -0,0 +1,141 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import g, has_request_context, request
+
+# In-process latency histograms and counters, rendered in the Prometheus
+# text format. Request stages are timed with `with stage(name):`; inside a
+# request they are also reported back in the Server-Timing header.
+PREFIX = 'realestate_'
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+HELP = {
+    'request_duration_seconds': ('histogram', 'Request latency by route'),
+    'stage_duration_seconds': ('histogram', 'Time spent in each stage of a request'),
+    'comp_source_total': ('counter', 'Comp searches by where the comps came from'),
+    'lookup_source_total': ('counter', 'Subject property lookups by outcome'),
+    'report_cache_total': ('counter', 'PDF report renders served from or missing the cache')
+}
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_collectors = []
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, seconds, **labels):
+    key = _key(name, labels)
+    with _lock:
+        h = _histograms.get(key)
+        if h is None:
+            h = _histograms[key] = {'buckets': [0] * len(BUCKETS), 'sum': 0.0, 'count': 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                h['buckets'][i] += 1
+                break
+        h['sum'] += seconds
+        h['count'] += 1
+
+
+def current_route():
+    return (request.endpoint or 'unknown') if has_request_context() else 'background'
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        observe('stage_duration_seconds', elapsed, route=current_route(), stage=name)
+        if has_request_context() and 'stages' in g:
+            g.stages[name] = g.stages.get(name, 0.0) + elapsed
+
+
+def add_collector(collect):
+    # collect() -> iterable of (name, type, help, labels, value), sampled at
+    # scrape time for figures other modules already keep (cache stats, ...)
+    _collectors.append(collect)
+
+
+def server_timing(stages, total):
+    parts = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in stages.items()]
+    parts.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+def instrument_app(app):
+    @app.before_request
+    def start_timer():
+        g.request_start = time.perf_counter()
+        g.stages = {}
+
+    @app.after_request
+    def finish_timer(response):
+        if 'request_start' not in g:
+            return response
+        total = time.perf_counter() - g.request_start
+        observe('request_duration_seconds', total, route=current_route(), method=request.method, status=response.status_code)
+        # Streamed bodies are still being produced; their total covers the
+        # view only
+        response.headers['Server-Timing'] = server_timing(g.stages, total)
+        return response
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels) + '}'
+
+
+def render_prometheus():
+    with _lock:
+        histograms = {k: {'buckets': list(h['buckets']), 'sum': h['sum'], 'count': h['count']} for k, h in _histograms.items()}
+        counters = dict(_counters)
+
+    families = {}
+    for (name, labels), h in sorted(histograms.items()):
+        lines = families.setdefault(name, [])
+        cumulative = 0
+        for bound, count in zip(BUCKETS, h['buckets']):
+            cumulative += count
+            lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', f'{bound:g}'),))} {cumulative}")
+        lines.append(f"{PREFIX}{name}_bucket{_labels(labels + (('le', '+Inf'),))} {h['count']}")
+        lines.append(f"{PREFIX}{name}_sum{_labels(labels)} {h['sum']:.6f}")
+        lines.append(f"{PREFIX}{name}_count{_labels(labels)} {h['count']}")
+    for (name, labels), value in sorted(counters.items()):
+        families.setdefault(name, []).append(f'{PREFIX}{name}{_labels(labels)} {value:g}')
+
+    help_text = dict(HELP)
+    for collect in _collectors:
+        try:
+            samples = list(collect())
+        except Exception:
+            continue
+        for name, kind, text, labels, value in samples:
+            help_text.setdefault(name, (kind, text))
+            families.setdefault(name, []).append(f'{PREFIX}{name}{_labels(tuple(sorted(labels.items())))} {value:g}')
+
+    out = []
+    for name in sorted(families):
+        kind, text = help_text.get(name, ('untyped', name))
+        out.append(f'# HELP {PREFIX}{name} {text}')
+        out.append(f'# TYPE {PREFIX}{name} {kind}')
+        out.extend(families[name])
+    return '\n'.join(out) + '\n'
@@ -0,0 +1,161 @@
+import numpy as np
+
+from scenario_engine import FLIP_LEVELS, SCENARIO_NAMES, WHOLESALE_FEE_PCT, compute_scenarios
+
+# Every built-in metric is N(P) / D(P) with N and D linear in the purchase
+# price P, so "metric(P) >= target" inverts in closed form once N and D are
+# known at two prices. Anything else the engine reports is solved by batched
+# bisection, which only assumes the metric falls as the price rises.
+
+FLIP_SCENARIOS = {f'Fix & Flip ({level.title()})': level for level, _, _, _ in FLIP_LEVELS}
+
+# metric -> (numerator, denominator) built from one engine result block
+RENTAL_METRICS = {
+    'monthly_cash_flow': (lambda r: r['cash_flow'], None),
+    'cash_on_cash': (lambda r: r['annual_cash_flow'] * 100, lambda r: r['cash_invested']),
+    'cap_rate': (lambda r: r['noi'] * 1200, lambda r: r['purchase']),
+    'dscr': (lambda r: r['noi'], lambda r: r['monthly_mortgage'])
+}
+FLIP_METRICS = {
+    'net_profit': (lambda r: r['net_profit'], None),
+    'net_profit_pct': (lambda r: r['net_profit'] * 100, lambda r: r['arv']),
+    'roi': (lambda r: r['net_profit'] * 100, lambda r: r['cash_needed']),
+    'meets_70_rule': (lambda r: r['max_purchase_70'] - r['purchase'], None)
+}
+
+DEFAULT_TARGETS = {
+    'Fix & Flip (Light)': {'metric': 'net_profit_pct', 'target': 10},
+    'Fix & Flip (Medium)': {'metric': 'net_profit_pct', 'target': 10},
+    'Fix & Flip (Heavy)': {'metric': 'net_profit_pct', 'target': 10},
+    'Wholesale Assignment': {'metric': 'buyer_meets_70_rule', 'target': 'medium'},
+    'Open Market Rental': {'metric': 'monthly_cash_flow', 'target': 200},
+    'Section 8 Rental': {'metric': 'monthly_cash_flow', 'target': 200},
+    'Rent-by-Room': {'metric': 'monthly_cash_flow', 'target': 200}
+}
+
+BISECT_ITERATIONS = 60
+
+
+def _block(results, scenario):
+    if scenario in FLIP_SCENARIOS:
+        return results['flip'][FLIP_SCENARIOS[scenario]]
+    block = dict(results['rental'][scenario])
+    block['purchase'] = block['down_payment'] + block['loan_amount']
+    return block
+
+
+def _evaluate(columns, purchase):
+    sqft, beds, fmr, arv = columns
+    return compute_scenarios(purchase, sqft, beds, fmr, arv)
+
+
+def _linear_terms(columns, scenario, numerator, denominator):
+    n = len(columns[0])
+    at_zero = _block(_evaluate(columns, np.zeros(n)), scenario)
+    at_one = _block(_evaluate(columns, np.ones(n)), scenario)
+    n0 = numerator(at_zero)
+    n1 = numerator(at_one) - n0
+    if denominator is None:
+        return n0, n1, np.ones(n), np.zeros(n)
+    d0 = denominator(at_zero)
+    return n0, n1, d0, denominator(at_one) - d0
+
+
+def solve_closed_form(columns, scenario, numerator, denominator, target):
+    # Largest P >= 0 with (n0 + n1 P) / (d0 + d1 P) >= target
+    n0, n1, d0, d1 = _linear_terms(columns, scenario, numerator, denominator)
+    slope = n1 - target * d1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        price = (target * d0 - n0) / slope
+    # The metric must fall as price rises, and the answer must be positive
+    feasible = (slope < 0) & (price > 0) & np.isfinite(price)
+    return np.where(feasible, price, np.nan)
+
+
+def solve_bisection(columns, scenario, value, target, upper):
+    # Batched bisection: every property's bracket is halved in the same pass
+    n = len(columns[0])
+    lo = np.zeros(n)
+    hi = np.asarray(upper, dtype=float).copy()
+
+    def meets(price):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return value(_block(_evaluate(columns, price), scenario)) >= target
+
+    feasible = meets(np.full(n, 1.0))
+    for _ in range(BISECT_ITERATIONS):
+        mid = (lo + hi) / 2
+        ok = meets(mid)
+        lo = np.where(ok, mid, lo)
+        hi = np.where(ok, hi, mid)
+    # If even the upper bound meets the target the answer is unbounded
+    bounded = ~meets(hi)
+    return np.where(feasible & bounded, lo, np.nan)
+
+
+def _ratio_value(numerator, denominator):
+    if denominator is None:
+        return numerator
+    return lambda block: numerator(block) / denominator(block)
+
+
+def merge_targets(overrides):
+    # Each override is laid over its scenario's default, so {"target": 15}
+    # keeps the default metric
+    if overrides is None:
+        overrides = {}
+    if not isinstance(overrides, dict):
+        raise ValueError('targets must be an object')
+    merged = {scenario: dict(spec) for scenario, spec in DEFAULT_TARGETS.items()}
+    for scenario, spec in overrides.items():
+        if scenario not in SCENARIO_NAMES:
+            raise ValueError(f'Unknown scenario: {scenario}')
+        if not isinstance(spec, dict):
+            raise ValueError(f'Target for {scenario} must be an object')
+        merged[scenario].update({k: v for k, v in spec.items() if v is not None})
+    return merged
+
+
+def solve_max_offers(sqft, beds, fmr, arv, targets=None, method='auto'):
+    # Returns {scenario: {'metric', 'target', 'method', 'prices'}} for N
+    # properties at once; prices are NaN where no positive price qualifies
+    columns = [np.asarray(c, dtype=float) for c in (sqft, beds, fmr, arv)]
+    n = len(columns[0])
+    targets = merge_targets(targets)
+    upper = np.maximum(columns[3] * 3, 1e6)
+    solved = {}
+
+    for scenario in SCENARIO_NAMES:
+        spec = targets[scenario]
+        metric, target = spec['metric'], spec['target']
+
+        if scenario == 'Wholesale Assignment':
+            if metric != 'buyer_meets_70_rule':
+                raise ValueError('Wholesale Assignment only supports the buyer_meets_70_rule metric')
+            level = target if target in [l[0] for l in FLIP_LEVELS] else 'medium'
+            flip = _block(_evaluate(columns, np.zeros(n)), f'Fix & Flip ({level.title()})')
+            # The end buyer pays the contract price plus the assignment fee
+            max_70 = flip['max_purchase_70']
+            prices = np.where(max_70 > 0, max_70 / (1 + WHOLESALE_FEE_PCT), np.nan)
+            solved[scenario] = {'metric': metric, 'target': level, 'method': 'closed_form', 'prices': prices}
+            continue
+
+        registry = FLIP_METRICS if scenario in FLIP_SCENARIOS else RENTAL_METRICS
+        target = 0.0 if metric == 'meets_70_rule' else float(target)
+
+        if metric in registry:
+            numerator, denominator = registry[metric]
+            if method == 'bisect':
+                prices = solve_bisection(columns, scenario, _ratio_value(numerator, denominator), target, upper)
+                used = 'bisection'
+            else:
+                prices = solve_closed_form(columns, scenario, numerator, denominator, target)
+                used = 'closed_form'
+        else:
+            sample = _block(_evaluate([c[:1] for c in columns], np.ones(1)), scenario)
+            if metric not in sample or metric in ('purchase', 'holding_months', 'utilities', 'vacancy_rate'):
+                raise ValueError(f'Unknown metric for {scenario}: {metric}')
+            prices = solve_bisection(columns, scenario, lambda block: block[metric], target, upper)
+            used = 'bisection'
+        solved[scenario] = {'metric': metric, 'target': spec['target'], 'method': used, 'prices': prices}
+    return solved
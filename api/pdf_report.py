@@ -0,0 +1,233 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from io import BytesIO
+
+from cache import PersistentCache
+
+# Bump when the layout changes so cached PDFs are not served for it
+REPORT_VERSION = 1
+
+pdf_cache = PersistentCache(
+    'pdf_reports',
+    ttl=int(os.getenv('PDF_CACHE_TTL', 7 * 24 * 3600)),
+    max_entries=int(os.getenv('PDF_CACHE_MAX_ENTRIES', 2000)),
+    memory_entries=int(os.getenv('PDF_CACHE_LRU_SIZE', 32))
+)
+
+_templates = None
+_templates_lock = threading.Lock()
+
+
+def report_templates():
+    # Paragraph and table styles are immutable once built, so one set per
+    # process is shared by every render
+    global _templates
+    if _templates is None:
+        with _templates_lock:
+            if _templates is None:
+                _templates = _build_templates()
+    return _templates
+
+
+def _build_templates():
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import TableStyle
+
+    styles = getSampleStyleSheet()
+
+    def table_style(header_color, font_size, left_first_column=False):
+        commands = [
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(header_color)),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), font_size),
+            ('GRID', (0, 0), (-1, -1), 1, colors.HexColor('#E2E8F0'))
+        ]
+        if left_first_column:
+            commands.insert(3, ('ALIGN', (0, 0), (0, -1), 'LEFT'))
+        return TableStyle(commands)
+
+    return {
+        'normal': styles['Normal'],
+        'title': ParagraphStyle('CustomTitle', parent=styles['Heading1'], fontSize=18, textColor=colors.HexColor('#1E293B'), spaceAfter=15, alignment=TA_CENTER),
+        'heading': ParagraphStyle('Heading', parent=styles['Heading2'], fontSize=14, textColor=colors.HexColor('#1E293B'), spaceAfter=10, spaceBefore=15),
+        'comp_summary': table_style('#3B82F6', 9),
+        'comp_list': table_style('#64748B', 8, left_first_column=True),
+        'flip_costs': table_style('#F59E0B', 7),
+        'flip_profit': table_style('#22C55E', 7),
+        'rental_income': table_style('#3B82F6', 7),
+        'rental_expenses': table_style('#64748B', 7),
+        'rental_returns': table_style('#22C55E', 7)
+    }
+
+
+def report_payload(data):
+    # The subset of a posted analysis the PDF actually prints. Hashing this
+    # instead of the raw request keeps the cache key stable when the client
+    # sends extra or reordered fields. The report date is left out so the
+    # key doesn't change daily; render_pdf stamps it.
+    comps = data.get('comps') or {}
+    return {
+        'version': REPORT_VERSION,
+        'address': data.get('address', 'N/A'),
+        'propertyData': {k: (data.get('propertyData') or {}).get(k, 0) for k in ('purchasePrice', 'currentSqft', 'beds', 'baths')},
+        'comps': {
+            'total_found': comps.get('total_found', 0),
+            'average_price': comps.get('average_price', 0),
+            'average_price_per_sqft': comps.get('average_price_per_sqft', 0),
+            'estimated_value': comps.get('estimated_value', 0),
+            'properties': (comps.get('properties') or [])[:5]
+        },
+        'flip_scenarios': data.get('flip_scenarios') or [],
+        'rental_scenarios': data.get('rental_scenarios') or []
+    }
+
+
+def payload_hash(payload):
+    encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def render_pdf(payload, date=None):
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, PageBreak
+
+    t = report_templates()
+    buffer = BytesIO()
+    # invariant: no timestamps or random ids, so equal payloads and dates give equal bytes
+    doc = SimpleDocTemplate(buffer, pagesize=letter, topMargin=0.5*inch, bottomMargin=0.5*inch, invariant=1)
+    story = []
+
+    def table(rows, widths, style):
+        flowable = Table(rows, colWidths=widths)
+        flowable.setStyle(t[style])
+        story.append(flowable)
+
+    # Title
+    story.append(Paragraph("Real Estate Investment Analysis", t['title']))
+    story.append(Paragraph(f"<b>Address:</b> {payload['address']}", t['normal']))
+    date = date or datetime.now().strftime('%B %d, %Y')
+    story.append(Paragraph(f"<b>Date:</b> {date}", t['normal']))
+
+    prop = payload['propertyData']
+    story.append(Paragraph(f"<b>Purchase Price:</b> ${prop['purchasePrice']:,.0f} | <b>SqFt:</b> {prop['currentSqft']:,.0f} | <b>Beds/Baths:</b> {prop['beds']}/{prop['baths']}", t['normal']))
+    story.append(Spacer(1, 15))
+
+    # Comps Section
+    comps = payload['comps']
+    if comps['properties']:
+        story.append(Paragraph("Comparable Sales", t['heading']))
+        table([
+            ['Comps Found', 'Avg Price', 'Avg $/SqFt', 'Estimated ARV'],
+            [str(comps['total_found']), f"${comps['average_price']:,.0f}", f"${comps['average_price_per_sqft']:.2f}", f"${comps['estimated_value']:,.0f}"]
+        ], [1.5*inch] * 4, 'comp_summary')
+        story.append(Spacer(1, 10))
+
+        comp_data = [['Address', 'Price', 'Beds/Bath', 'SqFt', '$/SqFt', 'Dist']]
+        for comp in comps['properties']:
+            addr = comp.get('address', {})
+            street = str(addr.get('streetAddress') or comp.get('streetAddress') or 'N/A')
+            price = comp.get('price', {})
+            price_val = price.get('value', price) if isinstance(price, dict) else price
+            comp_data.append([
+                street[:25],
+                f"${price_val:,.0f}",
+                f"{comp.get('bedrooms', 0)}/{comp.get('bathrooms', 0)}",
+                f"{comp.get('livingArea', 0):,}",
+                f"${comp.get('price_per_sqft', 0):.0f}",
+                f"{comp.get('distance_miles', 0):.1f}mi"
+            ])
+        table(comp_data, [1.8*inch, 0.9*inch, 0.7*inch, 0.7*inch, 0.6*inch, 0.6*inch], 'comp_list')
+
+    story.append(Spacer(1, 15))
+
+    # Flip Scenarios
+    if payload['flip_scenarios']:
+        story.append(Paragraph("Fix & Flip Analysis (10% Down, 3 Points, 10% Interest)", t['heading']))
+
+        for s in payload['flip_scenarios']:
+            scenario_title = f"<b>{s['name']}</b>"
+            if s.get('meets_70_rule') == True:
+                scenario_title += " <font color='green'>[MEETS 70% RULE]</font>"
+            elif s.get('meets_70_rule') == False:
+                scenario_title += " <font color='red'>[FAILS 70% RULE]</font>"
+            story.append(Paragraph(scenario_title, t['normal']))
+
+            if s.get('costs'):
+                costs = s['costs']
+                table([
+                    ['Purchase', 'Rehab', 'Points', 'Interest', 'Closing', 'Holding', 'Total Costs'],
+                    [f"${costs.get('purchase', 0):,.0f}", f"${costs.get('rehab', 0):,.0f}", f"${costs.get('points', 0):,.0f}",
+                     f"${costs.get('interest', 0):,.0f}", f"${costs.get('closing_buy', 0) + costs.get('closing_sell', 0):,.0f}",
+                     f"${costs.get('holding', 0):,.0f}", f"${costs.get('total', 0):,.0f}"]
+                ], [0.85*inch] * 7, 'flip_costs')
+
+            table([
+                ['ARV', 'Max (70%)', 'Cash Needed', 'Gross Profit', 'Net Profit', 'ROI', 'Timeline'],
+                [f"${s.get('arv', 0):,.0f}", f"${s.get('max_purchase_70_rule', 0):,.0f}", f"${s.get('cash_needed', 0):,.0f}",
+                 f"${s.get('gross_profit', 0):,.0f} ({s.get('gross_profit_pct', 0)}%)",
+                 f"${s.get('profit', 0):,.0f} ({s.get('net_profit_pct', 0)}%)",
+                 f"{s.get('roi', 0)}%", s.get('timeline', '')]
+            ], [0.85*inch] * 7, 'flip_profit')
+            story.append(Spacer(1, 8))
+
+    story.append(PageBreak())
+
+    # Rental Scenarios
+    if payload['rental_scenarios']:
+        story.append(Paragraph("Rental Analysis (20% Down, 7% Rate, 50% Expense Rule)", t['heading']))
+
+        for s in payload['rental_scenarios']:
+            story.append(Paragraph(f"<b>{s['name']}</b>", t['normal']))
+
+            table([
+                ['Monthly Rent', 'Vacancy', 'EGI', 'Total Expenses', 'NOI', 'Mortgage', 'Cash Flow'],
+                [f"${s.get('monthly_rent', 0):,.0f}", f"${s.get('vacancy', 0):,.0f} ({s.get('vacancy_rate', 0)}%)",
+                 f"${s.get('effective_gross_income', 0):,.0f}",
+                 f"${s.get('expenses', {}).get('total', 0):,.0f}",
+                 f"${s.get('noi', 0):,.0f}", f"${s.get('monthly_mortgage', 0):,.0f}",
+                 f"${s.get('monthly_cash_flow', 0):,.0f}"]
+            ], [0.85*inch] * 7, 'rental_income')
+
+            if s.get('expenses'):
+                exp = s['expenses']
+                table([
+                    ['Mgmt (10%)', 'Repairs (8%)', 'CapEx (8%)', 'Taxes (10%)', 'Insurance (6%)', 'Total (50%)'],
+                    [f"${exp.get('management', 0):,.0f}", f"${exp.get('repairs', 0):,.0f}", f"${exp.get('capex', 0):,.0f}",
+                     f"${exp.get('taxes', 0):,.0f}", f"${exp.get('insurance', 0):,.0f}", f"${exp.get('total', 0):,.0f}"]
+                ], [1*inch] * 6, 'rental_expenses')
+
+            table([
+                ['Cash Invested', 'Annual CF', 'Cash-on-Cash', 'Cap Rate', 'DSCR', '1% Rule'],
+                [f"${s.get('cash_invested', 0):,.0f}", f"${s.get('annual_cash_flow', 0):,.0f}",
+                 f"{s.get('cash_on_cash', 0)}%", f"{s.get('cap_rate', 0)}%",
+                 f"{s.get('dscr', 0)}", f"{s.get('one_pct_rule', 0)}%"]
+            ], [1*inch] * 6, 'rental_returns')
+            story.append(Spacer(1, 10))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def report_etag(data):
+    return payload_hash(report_payload(data))
+
+
+def cached_pdf(data):
+    # Returns (pdf bytes, content hash, served from cache)
+    payload = report_payload(data)
+    key = payload_hash(payload)
+    cached = pdf_cache.get(key)
+    if cached is not None:
+        return base64.b64decode(cached[0]), key, True
+    pdf = render_pdf(payload)
+    pdf_cache.set(key, base64.b64encode(pdf).decode('ascii'))
+    return pdf, key, False
@@ -0,0 +1,259 @@
+import cProfile
+import hmac
+import io
+import json
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from functools import wraps
+
+from flask import Response, g, jsonify, request
+
+from cache import CACHE_DIR
+
+# Opt-in request profiling. A request carrying the admin secret in the
+# X-Profile header (or ?profile=) runs under cProfile, or under the stack
+# sampler with mode "sample". A small fraction of ordinary traffic can also
+# be sampled continuously with PROFILE_SAMPLE_RATE. Profiles are written to
+# PROFILE_DIR under a request id and served back to holders of the secret.
+PROFILE_SECRET = os.getenv('PROFILE_SECRET', '')
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', 5)) / 1000
+PROFILE_DIR = os.getenv('PROFILE_DIR', os.path.join(CACHE_DIR, 'profiles'))
+PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 200))
+
+PROFILE_MODES = ('cprofile', 'sample')
+# Accepted ?sort= values for text pstats: the pstats.SortKey values and their
+# aliases (tottime, ncalls, ...), i.e. every key sort_stats() takes
+PSTATS_SORT_KEYS = tuple(sorted(pstats.Stats.sort_arg_dict_default))
+
+# cProfile cannot run in two threads at once on newer interpreters, so a
+# second concurrent request asking for it is sampled instead
+_cprofile_lock = threading.Lock()
+
+
+class StackSampler:
+    # Samples one thread's Python stack every interval from a helper thread
+    # and counts collapsed stacks ("root;caller;callee count") for flame graphs
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def collapsed(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def _authorized(secret):
+    return bool(PROFILE_SECRET) and bool(secret) and hmac.compare_digest(secret, PROFILE_SECRET)
+
+
+def _requested_secret():
+    return request.headers.get('X-Profile') or request.args.get('profile')
+
+
+def _profile_path(profile_id, ext):
+    return os.path.join(PROFILE_DIR, f'{profile_id}.{ext}')
+
+
+def _prune():
+    try:
+        names = sorted(
+            (os.path.join(PROFILE_DIR, n) for n in os.listdir(PROFILE_DIR) if n.endswith('.json')),
+            key=os.path.getmtime
+        )
+    except OSError:
+        return
+    for meta_path in names[:max(0, len(names) - PROFILE_MAX_FILES)]:
+        base = meta_path[:-len('.json')]
+        for ext in ('.json', '.pstats', '.collapsed'):
+            try:
+                os.remove(base + ext)
+            except OSError:
+                pass
+
+
+def start_profile(mode, sampled=False):
+    if mode == 'cprofile' and not _cprofile_lock.acquire(blocking=False):
+        mode = 'sample'
+    g.profile = {
+        'id': uuid.uuid4().hex,
+        'mode': mode,
+        'sampled': sampled,
+        'route': request.endpoint or request.path,
+        'method': request.method,
+        'path': request.path,
+        'started_at': time.time(),
+        'start': time.perf_counter()
+    }
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+    else:
+        profiler = StackSampler(threading.get_ident())
+        profiler.start()
+    g.profiler = profiler
+
+
+def finish_profile(status):
+    meta = g.pop('profile')
+    profiler = g.pop('profiler')
+    meta['duration_ms'] = round((time.perf_counter() - meta.pop('start')) * 1000, 1)
+    meta['status'] = status
+    if meta['mode'] == 'cprofile':
+        profiler.disable()
+        _cprofile_lock.release()
+    else:
+        profiler.stop()
+        meta['samples'] = sum(profiler.stacks.values())
+
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        if meta['mode'] == 'cprofile':
+            profiler.dump_stats(_profile_path(meta['id'], 'pstats'))
+        else:
+            with open(_profile_path(meta['id'], 'collapsed'), 'w') as fp:
+                fp.write(profiler.collapsed())
+        with open(_profile_path(meta['id'], 'json'), 'w') as fp:
+            json.dump(meta, fp)
+        _prune()
+    except OSError:
+        return None
+    return meta
+
+
+def load_profile_meta(profile_id):
+    if not profile_id.isalnum():
+        return None
+    try:
+        with open(_profile_path(profile_id, 'json')) as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return None
+
+
+def list_profile_meta():
+    try:
+        names = [n for n in os.listdir(PROFILE_DIR) if n.endswith('.json')]
+    except OSError:
+        return []
+    profiles = [load_profile_meta(n[:-len('.json')]) for n in names]
+    return sorted((m for m in profiles if m), key=lambda m: m['started_at'], reverse=True)
+
+
+def pstats_text(profile_id, limit=40, sort='cumulative'):
+    out = io.StringIO()
+    stats = pstats.Stats(_profile_path(profile_id, 'pstats'), stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def enable_profiling(app, url_prefix='/api/profiles'):
+    @app.before_request
+    def maybe_profile():
+        if not PROFILE_SECRET and not PROFILE_SAMPLE_RATE:
+            return
+        if request.path.startswith(url_prefix):
+            return
+        secret = _requested_secret()
+        if secret:
+            if _authorized(secret):
+                mode = request.headers.get('X-Profile-Mode') or request.args.get('profile_mode') or 'cprofile'
+                start_profile(mode if mode in PROFILE_MODES else 'cprofile')
+        elif PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            start_profile('sample', sampled=True)
+
+    @app.after_request
+    def store_profile(response):
+        if 'profile' not in g:
+            return response
+        meta = finish_profile(response.status_code)
+        # Background samples stay invisible to the client
+        if meta and not meta['sampled']:
+            response.headers['X-Profile-Id'] = meta['id']
+            response.headers['X-Profile-Url'] = f"{url_prefix}/{meta['id']}"
+        return response
+
+    @app.teardown_request
+    def abandon_profile(error=None):
+        # An unhandled error skips after_request; still stop the profiler
+        if 'profile' in g:
+            finish_profile(500)
+
+    def guarded(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _authorized(_requested_secret()):
+                return jsonify({'error': 'Profiling is not enabled for this request'}), 403
+            return view(*args, **kwargs)
+        return wrapper
+
+    @app.route(url_prefix, methods=['GET'])
+    @guarded
+    def list_profiles():
+        return jsonify({'profiles': list_profile_meta()})
+
+    @app.route(f'{url_prefix}/aggregate', methods=['GET'])
+    @guarded
+    def aggregate_profiles():
+        # Every stored stack-sampled profile merged into one collapsed file,
+        # optionally for one route (?route=analyze_property)
+        route = request.args.get('route')
+        merged = Counter()
+        for meta in list_profile_meta():
+            if meta['mode'] != 'sample' or (route and meta['route'] != route):
+                continue
+            try:
+                with open(_profile_path(meta['id'], 'collapsed')) as fp:
+                    for line in fp:
+                        stack, _, count = line.rstrip('\n').rpartition(' ')
+                        merged[stack] += int(count)
+            except (OSError, ValueError):
+                continue
+        return Response(''.join(f'{stack} {count}\n' for stack, count in merged.most_common()), mimetype='text/plain')
+
+    @app.route(f'{url_prefix}/<profile_id>', methods=['GET'])
+    @guarded
+    def get_profile(profile_id):
+        # pstats: binary for `python -m pstats` / snakeviz, or ?format=text;
+        # sampled: collapsed stacks for flamegraph.pl / speedscope
+        meta = load_profile_meta(profile_id)
+        if meta is None:
+            return jsonify({'error': 'Profile not found'}), 404
+        if meta['mode'] == 'cprofile':
+            if request.args.get('format') == 'text':
+                sort = request.args.get('sort', 'cumulative')
+                if sort not in PSTATS_SORT_KEYS:
+                    return jsonify({'error': f"sort must be one of: {', '.join(PSTATS_SORT_KEYS)}"}), 400
+                return Response(pstats_text(profile_id, sort=sort), mimetype='text/plain')
+            with open(_profile_path(profile_id, 'pstats'), 'rb') as fp:
+                return Response(fp.read(), mimetype='application/octet-stream', headers={
+                    'Content-Disposition': f'attachment; filename={profile_id}.pstats'
+                })
+        with open(_profile_path(profile_id, 'collapsed')) as fp:
+            return Response(fp.read(), mimetype='text/plain')
@@ -0,0 +1,131 @@
+from flask import Blueprint, Flask, Response, request, jsonify, send_file, stream_with_context
+from flask_cors import CORS
+import os
+import sys
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analyses import resolve_analysis_ref
+from metrics import inc, instrument_app, render_prometheus, stage
+from excel_report import analysis_records, build_workbook_file, ndjson_records, stream_file
+from pdf_report import cached_pdf, report_etag
+from profiling import enable_profiling
+
+# PDF and Excel reports run as their own function so reportlab and openpyxl
+# never load in the analysis function; index.py mounts this blueprint only
+# for local development.
+reports = Blueprint('reports', __name__)
+
+# Where stored analyses and jobs are fetched from when this function's own
+# store does not have them. Only ever this configured URL: a URL built from
+# the request's Host header would let clients aim server-side fetches.
+ANALYSIS_SERVICE_URL = os.getenv('ANALYSIS_SERVICE_URL', '').rstrip('/') or None
+
+def posted_items(data):
+    # {"analyses": [...], "analysis_ids": [...], "job_ids": [...]} flattened
+    # into one list; other bodies are returned unchanged
+    if isinstance(data, dict) and {'analyses', 'analysis_ids', 'job_ids'} & set(data):
+        return (list(data.get('analyses') or [])
+                + [{'analysis_id': key} for key in data.get('analysis_ids') or []]
+                + list(data.get('job_ids') or []))
+    return data
+
+def requested_analysis(analysis_id):
+    # The stored analysis named in the URL or body, else the posted analysis
+    data = {'analysis_id': analysis_id} if analysis_id else request.get_json(force=True, silent=True)
+    if not isinstance(data, dict):
+        raise ValueError('Expected an analysis or an analysis_id')
+    data = resolve_analysis_ref(data, ANALYSIS_SERVICE_URL)
+    if data.get('status') == 'error':
+        raise LookupError(data['error'])
+    return data
+
+@reports.route('/api/report/pdf', methods=['POST'])
+@reports.route('/api/report/pdf/<analysis_id>', methods=['GET'])
+def create_pdf_report(analysis_id=None):
+    try:
+        with stage('resolve'):
+            data = requested_analysis(analysis_id)
+            etag = report_etag(data)
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={'ETag': f'"{etag}"'})
+        with stage('render'):
+            pdf, content_hash, hit = cached_pdf(data)
+        inc('report_cache_total', result='hit' if hit else 'miss')
+        response = send_file(BytesIO(pdf), as_attachment=True, download_name='analysis_report.pdf', mimetype='application/pdf')
+        response.headers['ETag'] = f'"{content_hash}"'
+        response.headers['X-Report-Cache'] = 'hit' if hit else 'miss'
+        return response
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+@reports.route('/api/report/excel', methods=['POST'])
+@reports.route('/api/report/excel/<analysis_id>', methods=['GET'])
+def create_excel_report(analysis_id=None):
+    # A stored analysis by id, one posted analysis (or {"analysis_id"}), a
+    # JSON list / {"analyses", "analysis_ids"}, or NDJSON batch rows read
+    # line by line for portfolio exports
+    try:
+        if analysis_id:
+            with stage('resolve'):
+                records = [requested_analysis(analysis_id)]
+        elif request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            records = (resolve_analysis_ref(r, ANALYSIS_SERVICE_URL) for r in ndjson_records(request.stream))
+        else:
+            data = posted_items(request.get_json(force=True, silent=True))
+            records = (resolve_analysis_ref(r, ANALYSIS_SERVICE_URL) for r in analysis_records(data))
+        # NDJSON and id lists are read and resolved while the sheets are written
+        with stage('workbook'):
+            path = build_workbook_file(records)
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+    return Response(stream_file(path), mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', headers={
+        'Content-Disposition': 'attachment; filename=analysis_report.xlsx',
+        'Content-Length': str(os.path.getsize(path))
+    })
+
+@reports.route('/api/report/bulk', methods=['POST'])
+def create_bulk_report():
+    # {"analyses": [...], "analysis_ids": [...], "job_ids": [...]}, a JSON
+    # list of analyses or job ids, or NDJSON rows (e.g.
+    # /api/analyze/batch?detail=full output)
+    from bulk_report import BULK_REPORT_MAX, stream_report_zip
+
+    if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+        items = ndjson_records(request.stream, strict=False)
+    else:
+        items = posted_items(request.get_json(force=True, silent=True))
+        if not isinstance(items, list) or not items:
+            return jsonify({'error': 'Provide analyses, analysis_ids or job_ids'}), 400
+        if len(items) > BULK_REPORT_MAX:
+            return jsonify({'error': f'Bulk reports are limited to {BULK_REPORT_MAX} items'}), 400
+
+    return Response(stream_with_context(stream_report_zip(items, ANALYSIS_SERVICE_URL)), mimetype='application/zip', headers={
+        'Content-Disposition': 'attachment; filename=analysis_reports.zip'
+    })
+
+@reports.route('/api/report/metrics', methods=['GET'])
+def report_metrics():
+    # This function's own histograms; /api/metrics covers the analysis function
+    return Response(render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+# Vercel handler
+app = Flask(__name__)
+CORS(app)
+instrument_app(app)
+enable_profiling(app, url_prefix='/api/report/profiles')
+app.register_blueprint(reports)
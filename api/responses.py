@@ -0,0 +1,202 @@
+import gzip
+import hashlib
+import json
+import os
+import zlib
+
+from flask import Response, request
+
+# Response shaping for analysis payloads: a compact form that references
+# scenarios by index instead of repeating them, a fields= projection, and
+# gzip/brotli negotiated from Accept-Encoding. orjson and brotli are used
+# when installed.
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+
+# Comp fields the app displays; compact mode drops everything else scraped
+COMPACT_COMP_FIELDS = ('bedrooms', 'bathrooms', 'livingArea', 'price_per_sqft', 'distance_miles', 'yearBuilt')
+
+_orjson = None
+_brotli = None
+
+
+def _optional(name):
+    try:
+        return __import__(name)
+    except ImportError:
+        return False
+
+
+def dumps(obj):
+    global _orjson
+    if _orjson is None:
+        _orjson = _optional('orjson')
+    if _orjson:
+        return _orjson.dumps(obj, option=_orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def brotli_available():
+    global _brotli
+    if _brotli is None:
+        _brotli = _optional('brotli')
+    return bool(_brotli)
+
+
+def wants_compact(data=None):
+    flag = request.args.get('compact', (data or {}).get('compact', False))
+    return str(flag).lower() in ('1', 'true', 'yes')
+
+
+def requested_fields(data=None):
+    spec = request.args.get('fields', (data or {}).get('fields'))
+    if not spec:
+        return None
+    if isinstance(spec, str):
+        spec = spec.split(',')
+    return [f.strip() for f in spec if f.strip()]
+
+
+def compact_comp(comp):
+    address = comp.get('address') or {}
+    price = comp.get('price')
+    compact = {
+        'streetAddress': address.get('streetAddress') or comp.get('streetAddress') or 'N/A',
+        'city': address.get('city', comp.get('city')),
+        'zipcode': address.get('zipcode', comp.get('zipcode')),
+        'price': price.get('value') if isinstance(price, dict) else price,
+        'dateSold': comp.get('dateSold') or (comp.get('listing') or {}).get('dateSold')
+    }
+    for field in COMPACT_COMP_FIELDS:
+        compact[field] = comp.get(field)
+    return compact
+
+
+def compact_scenario(scenario):
+    # Flip details repeat costs plus the ARV, and sale_price is the ARV
+    if scenario.get('type') != 'flip':
+        return scenario
+    return {k: v for k, v in scenario.items() if k not in ('details', 'sale_price')}
+
+
+def compact_analysis(analysis):
+    # Each scenario appears once, in flip_scenarios or rental_scenarios;
+    # scenarios and best_scenario hold ["flip"|"rental", index] references
+    # and best_flip/best_rental hold indexes
+    flips = analysis.get('flip_scenarios') or []
+    rentals = analysis.get('rental_scenarios') or []
+    refs = {id(s): ['flip', i] for i, s in enumerate(flips)}
+    refs.update({id(s): ['rental', i] for i, s in enumerate(rentals)})
+
+    def ref(scenario):
+        if scenario is None:
+            return None
+        found = refs.get(id(scenario))
+        if found is not None:
+            return found
+        # Scenarios loaded from JSON are copies; match by value instead
+        for kind, pool in (('flip', flips), ('rental', rentals)):
+            if scenario in pool:
+                return [kind, pool.index(scenario)]
+        return None
+
+    compact = {k: v for k, v in analysis.items() if k not in ('scenarios', 'flip_scenarios', 'rental_scenarios', 'best_scenario', 'best_flip', 'best_rental', 'comps')}
+    comps = dict(analysis.get('comps') or {})
+    comps['properties'] = [compact_comp(c) for c in comps.get('properties') or []]
+    best_flip = ref(analysis.get('best_flip'))
+    best_rental = ref(analysis.get('best_rental'))
+    compact.update({
+        'compact': 1,
+        'comps': comps,
+        'flip_scenarios': [compact_scenario(s) for s in flips],
+        'rental_scenarios': [compact_scenario(s) for s in rentals],
+        'scenarios': [ref(s) for s in analysis.get('scenarios') or []],
+        'best_scenario': ref(analysis.get('best_scenario')),
+        'best_flip': best_flip[1] if best_flip else None,
+        'best_rental': best_rental[1] if best_rental else None
+    })
+    return compact
+
+
+def project(obj, fields):
+    # fields: dotted paths ("comps.estimated_value", "flip_scenarios.roi");
+    # lists are projected element-wise
+    tree = {}
+    for field in fields:
+        node = tree
+        for part in field.split('.'):
+            node = node.setdefault(part, {})
+    return _project(obj, tree)
+
+
+def _project(obj, tree):
+    if not tree:
+        return obj
+    if isinstance(obj, list):
+        return [_project(item, tree) for item in obj]
+    if not isinstance(obj, dict):
+        return obj
+    return {k: _project(obj[k], sub) for k, sub in tree.items() if k in obj}
+
+
+def shape_analysis(analysis, compact=False, fields=None):
+    if compact:
+        analysis = compact_analysis(analysis)
+    if fields:
+        analysis = project(analysis, fields)
+    return analysis
+
+
+def variant_tag(compact=False, fields=None):
+    # Suffix that keeps ETags distinct per representation
+    if not compact and not fields:
+        return ''
+    spec = f"{int(bool(compact))}:{','.join(fields or [])}"
+    return '-' + hashlib.sha256(spec.encode('utf-8')).hexdigest()[:8]
+
+
+def negotiated_encoding():
+    offered = ['br', 'gzip'] if brotli_available() else ['gzip']
+    return request.accept_encodings.best_match(offered)
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return _brotli.compress(body, quality=min(COMPRESS_LEVEL, 11))
+    return gzip.compress(body, compresslevel=COMPRESS_LEVEL, mtime=0)
+
+
+def json_response(obj, status=200, headers=None):
+    body = dumps(obj)
+    response = Response(body, status=status, mimetype='application/json', headers=headers)
+    response.vary.add('Accept-Encoding')
+    encoding = negotiated_encoding() if len(body) >= COMPRESS_MIN_BYTES else None
+    if encoding:
+        response.set_data(compress(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def compressed_stream(chunks):
+    # Compresses a streamed body incrementally, flushing after every chunk so
+    # clients can decode rows as they arrive. Returns (chunks, encoding).
+    encoding = negotiated_encoding()
+    if encoding is None:
+        return chunks, None
+    if encoding == 'br':
+        compressor = _brotli.Compressor(quality=min(COMPRESS_LEVEL, 11))
+        step = lambda data: compressor.process(data) + compressor.flush()
+        finish = compressor.finish
+    else:
+        compressor = zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        step = lambda data: compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        finish = compressor.flush
+
+    def generate():
+        for chunk in chunks:
+            data = step(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+            if data:
+                yield data
+        yield finish()
+
+    return generate(), encoding
@@ -0,0 +1,449 @@
+import numpy as np
+
+# Column-oriented versions of calculate_flip_scenarios and
+# calculate_rental_scenarios: every input is an array of N properties and all
+# seven scenarios are computed in one pass. The assumptions mirror the scalar
+# functions exactly so the dict view produced by scenario_dicts() matches them
+# field for field.
+
+FLIP_LEVELS = (
+    # level, rehab $/sqft, ARV multiplier, holding months
+    ('light', 25, 1.0, 4),
+    ('medium', 45, 1.05, 6),
+    ('heavy', 75, 1.15, 8)
+)
+HARD_MONEY_DOWN_PCT = 0.10
+HARD_MONEY_POINTS = 0.03
+HARD_MONEY_RATE = 0.10
+
+DOWN_PAYMENT_PCT = 0.20
+INTEREST_RATE = 0.07
+LOAN_TERM_YEARS = 30
+CLOSING_COST_PCT = 0.03
+
+WHOLESALE_FEE_PCT = 0.06
+EARNEST_MONEY = 1000
+
+ROOM_PRICES = (650, 550, 500, 450, 400)
+ROOM_UTILITIES = 150
+
+RENTALS = (
+    # name, vacancy, mgmt, repairs, capex, taxes, insurance, utilities, risk, intensity
+    ('Open Market Rental', 0.08, 0.10, 0.08, 0.08, 0.10, 0.06, 0, 'Medium', 'Medium'),
+    ('Section 8 Rental', 0.05, 0.10, 0.08, 0.08, 0.10, 0.06, 0, 'Low', 'Low-Medium'),
+    ('Rent-by-Room', 0.10, 0.12, 0.10, 0.08, 0.10, 0.06, ROOM_UTILITIES, 'Medium-High', 'High')
+)
+
+SCENARIO_NAMES = (
+    'Fix & Flip (Light)', 'Fix & Flip (Medium)', 'Fix & Flip (Heavy)', 'Wholesale Assignment',
+    'Open Market Rental', 'Section 8 Rental', 'Rent-by-Room'
+)
+
+
+def monthly_payment(loan_amount, rate, years):
+    # Closed-form P&I; rate and years may be scalars or arrays that broadcast
+    # against loan_amount. Scalars take the same float path as the scalar
+    # calculator so results match it bit for bit.
+    if np.ndim(rate) == 0 and np.ndim(years) == 0:
+        monthly_rate = float(rate) / 12
+        num_payments = float(years) * 12
+        if monthly_rate > 0:
+            growth = (1 + monthly_rate)**num_payments
+            return loan_amount * (monthly_rate * growth) / (growth - 1)
+        return loan_amount / num_payments
+
+    monthly_rate = np.asarray(rate, dtype=float) / 12
+    num_payments = np.asarray(years, dtype=float) * 12
+    with np.errstate(divide='ignore', invalid='ignore'):
+        growth = (1 + monthly_rate)**num_payments
+        amortized = loan_amount * (monthly_rate * growth) / (growth - 1)
+    return np.where(monthly_rate > 0, amortized, loan_amount / num_payments)
+
+
+def _ratio(numerator, denominator, scale=100):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(denominator > 0, numerator / denominator * scale, 0.0)
+
+
+def _as_columns(*columns):
+    arrays = np.broadcast_arrays(*[np.asarray(c, dtype=float) for c in columns])
+    return [np.ascontiguousarray(a) for a in arrays]
+
+
+def compute_flip_scenarios(purchase, sqft, arv, rehab_per_sqft=None):
+    purchase, sqft, estimated_arv = _as_columns(purchase, sqft, arv)
+    results = {}
+
+    for level, level_rehab_per_sqft, arv_multiplier, holding_time in FLIP_LEVELS:
+        rehab = sqft * (level_rehab_per_sqft if rehab_per_sqft is None else rehab_per_sqft)
+        arv = estimated_arv * arv_multiplier
+
+        max_purchase_70 = (arv * 0.70) - rehab
+
+        total_project_cost = purchase + rehab
+        loan_amount = total_project_cost * (1 - HARD_MONEY_DOWN_PCT)
+        down_payment = total_project_cost * HARD_MONEY_DOWN_PCT
+        points_cost = loan_amount * HARD_MONEY_POINTS
+        interest = loan_amount * (HARD_MONEY_RATE / 12) * holding_time
+
+        closing_buy = purchase * 0.02
+        closing_sell = arv * 0.06
+        holding_costs = holding_time * 500
+
+        total_costs = purchase + rehab + points_cost + interest + closing_buy + closing_sell + holding_costs
+        total_cash_needed = down_payment + points_cost + closing_buy + holding_costs
+
+        gross_profit = arv - purchase - rehab
+        net_profit = arv - total_costs
+
+        results[level] = {
+            'purchase': purchase,
+            'rehab': rehab,
+            'arv': arv,
+            'max_purchase_70': max_purchase_70,
+            'meets_70_rule': purchase <= max_purchase_70,
+            'down_payment': down_payment,
+            'loan_amount': loan_amount,
+            'points': points_cost,
+            'interest': interest,
+            'closing_buy': closing_buy,
+            'closing_sell': closing_sell,
+            'holding_months': holding_time,
+            'total_costs': total_costs,
+            'cash_needed': total_cash_needed,
+            'gross_profit': gross_profit,
+            'gross_profit_pct': _ratio(gross_profit, arv),
+            'net_profit': net_profit,
+            'net_profit_pct': _ratio(net_profit, arv),
+            'roi': _ratio(net_profit, total_cash_needed)
+        }
+
+    assignment_fee = purchase * WHOLESALE_FEE_PCT
+    results['wholesale'] = {
+        'purchase': purchase,
+        'assignment_fee': assignment_fee,
+        'roi': assignment_fee / EARNEST_MONEY * 100
+    }
+    return results
+
+
+def room_rents(beds):
+    beds = np.asarray(beds, dtype=float)
+    totals = np.concatenate(([0.0], np.cumsum(ROOM_PRICES)))
+    rooms = np.clip(beds, 0, len(ROOM_PRICES)).astype(int)
+    return totals[rooms], rooms
+
+
+def compute_rental_scenarios(purchase, sqft, beds, fmr, rate=INTEREST_RATE,
+                             down_payment_pct=DOWN_PAYMENT_PCT, years=LOAN_TERM_YEARS, rent=None):
+    purchase, sqft, beds, fmr = _as_columns(purchase, sqft, beds, fmr)
+
+    down_payment = purchase * down_payment_pct
+    loan_amount = purchase - down_payment
+    closing_costs = purchase * CLOSING_COST_PCT
+    monthly_mortgage = monthly_payment(loan_amount, rate, years)
+    cash_invested = down_payment + closing_costs
+
+    room_total, num_rooms = room_rents(beds)
+    gross_rents = (
+        np.maximum(sqft * 0.85, fmr * 0.9),
+        fmr * 1.0,
+        room_total
+    )
+    if rent is not None:
+        gross_rents = (np.asarray(rent, dtype=float),) * len(RENTALS)
+
+    results = {}
+    for spec, gross_rent in zip(RENTALS, gross_rents):
+        name, vacancy_rate, mgmt_rate, repairs_rate, capex_rate, taxes_rate, insurance_rate, utilities = spec[:8]
+        vacancy = gross_rent * vacancy_rate
+        egi = gross_rent - vacancy
+
+        mgmt = gross_rent * mgmt_rate
+        repairs = gross_rent * repairs_rate
+        capex = gross_rent * capex_rate
+        taxes = gross_rent * taxes_rate
+        insurance = gross_rent * insurance_rate
+        total_expenses = mgmt + repairs + capex + taxes + insurance
+        if utilities:
+            total_expenses = total_expenses + utilities
+
+        noi = egi - total_expenses
+        cash_flow = noi - monthly_mortgage
+        annual_cash_flow = cash_flow * 12
+
+        results[name] = {
+            'gross_rent': gross_rent,
+            'vacancy_rate': vacancy_rate,
+            'vacancy': vacancy,
+            'egi': egi,
+            'management': mgmt,
+            'repairs': repairs,
+            'capex': capex,
+            'taxes': taxes,
+            'insurance': insurance,
+            'utilities': utilities,
+            'total_expenses': total_expenses,
+            'noi': noi,
+            'down_payment': down_payment,
+            'loan_amount': loan_amount,
+            'closing_costs': closing_costs,
+            'monthly_mortgage': monthly_mortgage,
+            'cash_flow': cash_flow,
+            'annual_cash_flow': annual_cash_flow,
+            'cash_invested': cash_invested,
+            'cash_on_cash': _ratio(annual_cash_flow, cash_invested),
+            'cap_rate': _ratio(noi * 12, purchase),
+            'one_pct_rule': _ratio(gross_rent, purchase),
+            'dscr': _ratio(noi, monthly_mortgage, scale=1),
+            'num_rooms': num_rooms,
+            'fmr': fmr
+        }
+    return results
+
+
+def compute_scenarios(purchase, sqft, beds, fmr, arv):
+    return {
+        'flip': compute_flip_scenarios(purchase, sqft, arv),
+        'rental': compute_rental_scenarios(purchase, sqft, beds, fmr)
+    }
+
+
+SENSITIVITY_AXES = ('purchase_price', 'interest_rate', 'down_payment_pct', 'rent', 'rehab_per_sqft')
+
+
+def _grid_axis(values, position):
+    shape = [1] * len(SENSITIVITY_AXES)
+    shape[position] = -1
+    return np.asarray(values, dtype=float).reshape(shape)
+
+
+def sensitivity_grid(sqft, beds, fmr, arv, purchase_prices, interest_rates=(INTEREST_RATE,),
+                     down_payment_pcts=(DOWN_PAYMENT_PCT,), rents=None, rehab_per_sqft=None,
+                     rental='Open Market Rental', flip_level='medium'):
+    # Evaluates the rental and flip math over the Cartesian product of the
+    # axes by broadcasting; rates and down payments are fractions. Returns the
+    # metric arrays with single-valued axes squeezed out, so sweeping two axes
+    # yields a plain 2-D heat map.
+    values = [purchase_prices, interest_rates, down_payment_pcts, rents, rehab_per_sqft]
+    grid = [None if v is None else _grid_axis(v, i) for i, v in enumerate(values)]
+    purchase, rate, down_payment_pct, rent, rehab = grid
+
+    rentals = compute_rental_scenarios(
+        purchase, sqft, beds, fmr,
+        rate=rate, down_payment_pct=down_payment_pct, rent=rent
+    )
+    flips = compute_flip_scenarios(purchase, sqft, arv, rehab_per_sqft=rehab)
+    r = rentals[rental]
+    f = flips[flip_level]
+
+    shape = tuple(1 if v is None else len(v) for v in values)
+    keep = [i for i, n in enumerate(shape) if n > 1]
+
+    def shaped(array):
+        return np.broadcast_to(array, shape).reshape([shape[i] for i in keep])
+
+    return {
+        'axes': [{'name': SENSITIVITY_AXES[i], 'values': list(map(float, values[i]))} for i in keep],
+        'fixed': {SENSITIVITY_AXES[i]: float(values[i][0]) for i, n in enumerate(shape) if n == 1 and values[i] is not None},
+        'cash_flow': shaped(r['cash_flow']),
+        'cash_on_cash': shaped(r['cash_on_cash']),
+        'net_profit': shaped(f['net_profit'])
+    }
+
+
+def scenario_roi_matrix(results):
+    # (N, 7) ROI / cash-on-cash matrix in SCENARIO_NAMES order
+    flips = results['flip']
+    rentals = results['rental']
+    columns = [flips[level]['roi'] for level, _, _, _ in FLIP_LEVELS]
+    columns.append(flips['wholesale']['roi'])
+    columns.extend(rentals[spec[0]]['cash_on_cash'] for spec in RENTALS)
+    return np.column_stack(columns)
+
+
+def _f(array, i):
+    return float(array[i])
+
+
+def _flip_dict(level, r, i):
+    holding_time = r['holding_months']
+    purchase = _f(r['purchase'], i)
+    rehab = _f(r['rehab'], i)
+    arv = _f(r['arv'], i)
+    points_cost = _f(r['points'], i)
+    interest = _f(r['interest'], i)
+    closing_buy = _f(r['closing_buy'], i)
+    closing_sell = _f(r['closing_sell'], i)
+    holding_costs = holding_time * 500
+    total_costs = _f(r['total_costs'], i)
+
+    return {
+        'name': f'Fix & Flip ({level.title()})',
+        'type': 'flip',
+        'purchase_price': round(purchase),
+        'rehab_cost': round(rehab),
+        'arv': round(arv),
+        'max_purchase_70_rule': round(_f(r['max_purchase_70'], i)),
+        'meets_70_rule': bool(r['meets_70_rule'][i]),
+        'financing': {
+            'down_payment': round(_f(r['down_payment'], i)),
+            'down_payment_pct': HARD_MONEY_DOWN_PCT * 100,
+            'loan_amount': round(_f(r['loan_amount'], i)),
+            'points': round(points_cost),
+            'points_pct': HARD_MONEY_POINTS * 100,
+            'interest_rate': HARD_MONEY_RATE * 100,
+            'interest_cost': round(interest),
+            'holding_months': holding_time
+        },
+        'costs': {
+            'purchase': round(purchase),
+            'rehab': round(rehab),
+            'points': round(points_cost),
+            'interest': round(interest),
+            'closing_buy': round(closing_buy),
+            'closing_sell': round(closing_sell),
+            'holding': round(holding_costs),
+            'total': round(total_costs)
+        },
+        'total_investment': round(total_costs),
+        'cash_needed': round(_f(r['cash_needed'], i)),
+        'sale_price': round(arv),
+        'gross_profit': round(_f(r['gross_profit'], i)),
+        'gross_profit_pct': round(_f(r['gross_profit_pct'], i), 1),
+        'profit': round(_f(r['net_profit'], i)),
+        'net_profit_pct': round(_f(r['net_profit_pct'], i), 1),
+        'roi': round(_f(r['roi'], i), 1),
+        'timeline': f'{holding_time} months',
+        'timeline_days': holding_time * 30,
+        'details': {
+            'purchase': purchase,
+            'rehab': round(rehab),
+            'interest': round(interest),
+            'points': round(points_cost),
+            'closing_buy': round(closing_buy),
+            'closing_sell': round(closing_sell),
+            'holding': round(holding_costs),
+            'arv': round(arv)
+        }
+    }
+
+
+def _wholesale_dict(r, i):
+    purchase = _f(r['purchase'], i)
+    assignment_fee = _f(r['assignment_fee'], i)
+    return {
+        'name': 'Wholesale Assignment',
+        'type': 'wholesale',
+        'purchase_price': round(purchase),
+        'total_investment': EARNEST_MONEY,
+        'cash_needed': EARNEST_MONEY,
+        'profit': round(assignment_fee),
+        'roi': round(_f(r['roi'], i), 1),
+        'timeline': '30 days',
+        'timeline_days': 30,
+        'details': {
+            'contract_price': purchase,
+            'assignment_fee': round(assignment_fee),
+            'buyer_price': round(purchase + assignment_fee),
+            'earnest_money': EARNEST_MONEY
+        }
+    }
+
+
+def _rental_dict(spec, r, i):
+    name, vacancy_rate = spec[0], spec[1]
+    risk_level, intensity = spec[8], spec[9]
+    gross_rent = _f(r['gross_rent'], i)
+    coc = _f(r['cash_on_cash'], i)
+
+    scenario = {'name': name, 'type': 'rental', 'monthly_rent': round(gross_rent)}
+    if name == 'Section 8 Rental':
+        scenario['fmr'] = round(_f(r['fmr'], i))
+    if name == 'Rent-by-Room':
+        num_rooms = int(r['num_rooms'][i])
+        scenario['room_breakdown'] = list(ROOM_PRICES[:num_rooms])
+        scenario['num_rooms'] = num_rooms
+
+    expenses = {
+        'management': round(_f(r['management'], i)),
+        'repairs': round(_f(r['repairs'], i)),
+        'capex': round(_f(r['capex'], i)),
+        'taxes': round(_f(r['taxes'], i)),
+        'insurance': round(_f(r['insurance'], i))
+    }
+    if r['utilities']:
+        expenses['utilities'] = round(r['utilities'])
+    expenses['total'] = round(_f(r['total_expenses'], i))
+
+    scenario.update({
+        'vacancy_rate': vacancy_rate * 100,
+        'vacancy': round(_f(r['vacancy'], i)),
+        'effective_gross_income': round(_f(r['egi'], i)),
+        'expenses': expenses
+    })
+    if not r['utilities']:
+        scenario['expense_ratio'] = 50
+    scenario.update({
+        'noi': round(_f(r['noi'], i)),
+        'financing': {
+            'down_payment': round(_f(r['down_payment'], i)),
+            'down_payment_pct': DOWN_PAYMENT_PCT * 100,
+            'loan_amount': round(_f(r['loan_amount'], i)),
+            'interest_rate': INTEREST_RATE * 100,
+            'loan_term': LOAN_TERM_YEARS,
+            'closing_costs': round(_f(r['closing_costs'], i))
+        },
+        'monthly_mortgage': round(_f(r['monthly_mortgage'], i)),
+        'monthly_cash_flow': round(_f(r['cash_flow'], i)),
+        'annual_cash_flow': round(_f(r['annual_cash_flow'], i)),
+        'cash_invested': round(_f(r['cash_invested'], i)),
+        'cash_on_cash': round(coc, 1),
+        'cap_rate': round(_f(r['cap_rate'], i), 1),
+        'dscr': round(_f(r['dscr'], i), 2)
+    })
+    if name == 'Open Market Rental':
+        scenario['one_pct_rule'] = round(_f(r['one_pct_rule'], i), 2)
+    scenario.update({
+        'roi': round(coc, 1),
+        'timeline': 'Ongoing',
+        'risk_level': risk_level,
+        'management_intensity': intensity
+    })
+    if name == 'Section 8 Rental':
+        scenario['government_portion'] = '70%'
+        scenario['tenant_portion'] = '30%'
+    return scenario
+
+
+def scenario_dicts(results, i):
+    # Per-property view in the exact shape of the scalar calculators:
+    # (flip_scenarios, rental_scenarios)
+    flips = results['flip']
+    flip_scenarios = [_flip_dict(level, flips[level], i) for level, _, _, _ in FLIP_LEVELS]
+    flip_scenarios.append(_wholesale_dict(flips['wholesale'], i))
+    rental_scenarios = [_rental_dict(spec, results['rental'][spec[0]], i) for spec in RENTALS]
+    return flip_scenarios, rental_scenarios
+
+
+def scenario_summaries(results, i):
+    # Lightweight per-property view (name, type, headline numbers) without
+    # building the full nested dicts
+    flips = results['flip']
+    rentals = results['rental']
+    summaries = []
+    for (level, _, _, _), name in zip(FLIP_LEVELS, SCENARIO_NAMES):
+        r = flips[level]
+        summaries.append({'name': name, 'type': 'flip', 'roi': round(_f(r['roi'], i), 1), 'profit': round(_f(r['net_profit'], i))})
+    w = flips['wholesale']
+    summaries.append({'name': 'Wholesale Assignment', 'type': 'wholesale', 'roi': round(_f(w['roi'], i), 1), 'profit': round(_f(w['assignment_fee'], i))})
+    for spec in RENTALS:
+        r = rentals[spec[0]]
+        summaries.append({
+            'name': spec[0],
+            'type': 'rental',
+            'roi': round(_f(r['cash_on_cash'], i), 1),
+            'monthly_cash_flow': round(_f(r['cash_flow'], i)),
+            'cap_rate': round(_f(r['cap_rate'], i), 1)
+        })
+    return summaries
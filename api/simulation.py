@@ -0,0 +1,210 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from scenario_engine import INTEREST_RATE, LOAN_TERM_YEARS, RENTALS, compute_rental_scenarios
+
+SIMULATION_MAX_WORKERS = int(os.getenv('SIMULATION_MAX_WORKERS', os.cpu_count() or 1))
+SIMULATION_MAX_PATHS = int(os.getenv('SIMULATION_MAX_PATHS', 1000000))
+
+# Paths are generated in fixed-size chunks, each with its own child seed, so
+# the draws depend only on (seed, paths) and never on how many workers ran.
+CHUNK_PATHS = 10000
+
+DEFAULT_DISTRIBUTIONS = {
+    # Annual vacancy fraction ~ Beta with this mean / sd (mean defaults to the scenario's)
+    'vacancy': {'mean': None, 'sd': 0.03},
+    # Annual rent growth ~ Normal
+    'rent_growth': {'mean': 0.03, 'sd': 0.02},
+    # Unplanned repair/capex events per year ~ Poisson(rate), cost ~ LogNormal(median, sigma)
+    'repair_shocks': {'rate': 0.3, 'median_cost': 2500, 'sigma': 0.8},
+    # Optional ARM reset: from `year` on, rate = base + Normal(mean, sd); year 0 disables
+    'rate_reset': {'year': 0, 'mean': 0.01, 'sd': 0.01}
+}
+
+PERCENTILES = (5, 50, 95)
+
+_pool = None
+_pool_unavailable = False
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    # One pool per process, started on first use; None where worker
+    # processes cannot be created (e.g. some serverless sandboxes), in which
+    # case chunks run inline
+    global _pool, _pool_unavailable
+    if _pool is not None or _pool_unavailable or SIMULATION_MAX_WORKERS < 2:
+        return _pool
+    with _pool_lock:
+        if _pool is None and not _pool_unavailable:
+            try:
+                import multiprocessing
+                # spawn: workers must not inherit the parent's SQLite connections or threads
+                _pool = ProcessPoolExecutor(max_workers=SIMULATION_MAX_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+            except (ImportError, NotImplementedError, OSError):
+                _pool_unavailable = True
+    return _pool
+
+
+def reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def merge_distributions(overrides):
+    if overrides is None:
+        overrides = {}
+    if not isinstance(overrides, dict):
+        raise ValueError('distributions must be an object')
+    merged = {name: dict(params) for name, params in DEFAULT_DISTRIBUTIONS.items()}
+    for name, params in overrides.items():
+        if name not in merged:
+            raise ValueError(f'Unknown distribution: {name}')
+        if not isinstance(params, dict):
+            raise ValueError(f'Distribution {name} must be an object')
+        for key, value in params.items():
+            if key not in merged[name]:
+                raise ValueError(f'Unknown parameter for {name}: {key}')
+            if value is not None and (isinstance(value, bool) or not isinstance(value, (int, float))):
+                raise ValueError(f'{name}.{key} must be a number')
+        merged[name].update({k: v for k, v in params.items() if v is not None})
+    return merged
+
+
+def _beta_params(mean, sd):
+    mean = min(max(mean, 1e-4), 1 - 1e-4)
+    variance = min(sd ** 2, mean * (1 - mean) * 0.99)
+    concentration = mean * (1 - mean) / variance - 1
+    return mean * concentration, (1 - mean) * concentration
+
+
+def _remaining_balance(loan, monthly_rate, num_payments, paid):
+    growth_n = (1 + monthly_rate) ** num_payments
+    growth_k = (1 + monthly_rate) ** paid
+    return loan * (growth_n - growth_k) / (growth_n - 1)
+
+
+def _payment(balance, monthly_rate, num_payments):
+    monthly_rate = np.maximum(monthly_rate, 1e-9)
+    growth = (1 + monthly_rate) ** num_payments
+    return balance * monthly_rate * growth / (growth - 1)
+
+
+def simulate_chunk(base, distributions, hold_years, paths, seed_sequence):
+    rng = np.random.default_rng(seed_sequence)
+    years = hold_years
+
+    vacancy = distributions['vacancy']
+    a, b = _beta_params(vacancy['mean'], vacancy['sd'])
+    vacancy_rates = rng.beta(a, b, size=(paths, years))
+
+    growth = distributions['rent_growth']
+    rent_growth = rng.normal(growth['mean'], growth['sd'], size=(paths, years))
+    # Year 1 rent is the underwritten rent; growth compounds from year 2
+    rent_growth[:, 0] = 0.0
+    monthly_rent = base['gross_rent'] * np.cumprod(1 + rent_growth, axis=1)
+
+    shocks = distributions['repair_shocks']
+    events = rng.poisson(shocks['rate'], size=(paths, years))
+    total_events = int(events.sum())
+    shock_costs = np.zeros((paths, years))
+    if total_events:
+        costs = rng.lognormal(np.log(shocks['median_cost']), shocks['sigma'], size=total_events)
+        cell = np.repeat(np.arange(paths * years), events.ravel())
+        np.add.at(shock_costs.ravel(), cell, costs)
+
+    loan = base['loan_amount']
+    monthly_rate = base['interest_rate'] / 12
+    num_payments = base['loan_term'] * 12
+    payment = np.full((paths, years), base['monthly_mortgage'])
+    reset = distributions['rate_reset']
+    reset_year = int(reset.get('year') or 0)
+    if 0 < reset_year < years and loan > 0:
+        new_rate = np.maximum(base['interest_rate'] + rng.normal(reset['mean'], reset['sd'], size=paths), 0.0)
+        paid = reset_year * 12
+        balance = _remaining_balance(loan, monthly_rate, num_payments, paid)
+        payment[:, reset_year:] = _payment(balance, new_rate / 12, num_payments - paid)[:, None]
+
+    egi = monthly_rent * (1 - vacancy_rates)
+    operating = monthly_rent * base['expense_rate'] + base['fixed_expenses']
+    annual_cash_flow = 12 * (egi - operating - payment) - shock_costs
+    return annual_cash_flow
+
+
+def _bands(values, axis=0):
+    p5, p50, p95 = np.percentile(values, PERCENTILES, axis=axis)
+    return {'p5': np.round(p5, 0).tolist(), 'p50': np.round(p50, 0).tolist(), 'p95': np.round(p95, 0).tolist()}
+
+
+def run_simulation(base, distributions, hold_years=10, paths=100000, seed=0, workers=None):
+    paths = int(min(paths, SIMULATION_MAX_PATHS))
+    distributions = merge_distributions(distributions)
+    if distributions['vacancy']['mean'] is None:
+        distributions['vacancy']['mean'] = base['vacancy_rate']
+    workers = max(1, min(int(workers or SIMULATION_MAX_WORKERS), SIMULATION_MAX_WORKERS))
+    chunk_sizes = [CHUNK_PATHS] * (paths // CHUNK_PATHS)
+    if paths % CHUNK_PATHS:
+        chunk_sizes.append(paths % CHUNK_PATHS)
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    args = [(base, distributions, hold_years, n, s) for n, s in zip(chunk_sizes, seeds)]
+
+    chunks = None
+    pool = get_pool() if workers > 1 and len(args) > 1 else None
+    if pool is not None:
+        try:
+            # At most `workers` chunks in flight; chunk order is kept
+            chunks = []
+            for start in range(0, len(args), workers):
+                futures = [pool.submit(simulate_chunk, *a) for a in args[start:start + workers]]
+                chunks.extend(future.result() for future in futures)
+        except (BrokenProcessPool, RuntimeError):
+            # A worker died; later requests get a fresh pool
+            reset_pool()
+            chunks = None
+    if chunks is None:
+        chunks = [simulate_chunk(*a) for a in args]
+
+    annual = np.concatenate(chunks)
+    cumulative = np.cumsum(annual, axis=1)
+    return {
+        'paths': paths,
+        'hold_years': hold_years,
+        'seed': seed,
+        'annual_cash_flow': _bands(annual),
+        'monthly_cash_flow': _bands(annual / 12),
+        'cumulative_cash_flow': _bands(cumulative),
+        'cash_on_cash': _bands(annual / base['cash_invested'] * 100) if base['cash_invested'] > 0 else None,
+        'prob_negative_cash_flow_by_year': np.round((annual < 0).mean(axis=0), 4).tolist(),
+        'prob_any_negative_year': round(float((annual < 0).any(axis=1).mean()), 4),
+        'prob_negative_cumulative': round(float((cumulative[:, -1] < 0).mean()), 4),
+        'expected_total_cash_flow': round(float(cumulative[:, -1].mean()))
+    }
+
+
+def rental_base(purchase, sqft, beds, fmr, scenario='Open Market Rental'):
+    # Year-one underwriting for one rental scenario, taken from the engine
+    spec = next((s for s in RENTALS if s[0] == scenario), None)
+    if spec is None:
+        raise ValueError(f'Unknown rental scenario: {scenario}')
+    name, vacancy_rate, mgmt, repairs, capex, taxes, insurance, utilities = spec[:8]
+    r = compute_rental_scenarios([purchase], [sqft], [beds], [fmr])[name]
+    return {
+        'scenario': name,
+        'gross_rent': float(r['gross_rent'][0]),
+        'vacancy_rate': vacancy_rate,
+        'expense_rate': mgmt + repairs + capex + taxes + insurance,
+        'fixed_expenses': float(utilities),
+        'loan_amount': float(r['loan_amount'][0]),
+        'interest_rate': INTEREST_RATE,
+        'loan_term': LOAN_TERM_YEARS,
+        'monthly_mortgage': float(r['monthly_mortgage'][0]),
+        'cash_invested': float(r['cash_invested'][0]),
+        'deterministic_monthly_cash_flow': float(r['cash_flow'][0])
+    }
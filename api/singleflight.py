@@ -0,0 +1,123 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+
+from cache import CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# 'thread' coalesces callers inside one process. 'file' additionally takes a
+# per-key lock file so worker processes on the same host queue behind one
+# fetch; the ones that wait re-check the shared cache before fetching.
+SINGLEFLIGHT_MODE = os.getenv('SINGLEFLIGHT_MODE', 'thread')
+SINGLEFLIGHT_WAIT = float(os.getenv('SINGLEFLIGHT_WAIT', 330))
+LOCK_POLL_SECONDS = 0.05
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self, name, mode=None, lock_dir=None):
+        self.name = name
+        self.mode = mode or SINGLEFLIGHT_MODE
+        if self.mode == 'file' and fcntl is None:
+            self.mode = 'thread'
+        self.lock_dir = lock_dir or os.path.join(CACHE_DIR, 'singleflight')
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {'leaders': 0, 'coalesced': 0, 'process_waits': 0, 'process_hits': 0}
+
+    def do(self, key, fn, check=None):
+        # Runs fn() once for every concurrent caller with the same key and
+        # hands them all its result (or its exception). `check` is tried
+        # after waiting on another process and short-circuits fn when it
+        # returns something other than None. Waiters get their own deep copy
+        # so callers may mutate what they receive.
+        k = key if isinstance(key, str) else json.dumps(list(key), separators=(',', ':'))
+        with self._lock:
+            call = self._calls.get(k)
+            leader = call is None
+            if leader:
+                call = self._calls[k] = _Call()
+                self._counters['leaders'] += 1
+            else:
+                call.waiters += 1
+                self._counters['coalesced'] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        result = None
+        try:
+            if self.mode == 'file':
+                result = self._run_locked(k, fn, check)
+            else:
+                result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(k, None)
+                waiters = call.waiters
+            if waiters and call.error is None:
+                # Waiters copy from a snapshot the leader's caller never touches
+                call.result = copy.deepcopy(result)
+            call.done.set()
+        return result
+
+    def _run_locked(self, key, fn, check):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        try:
+            os.makedirs(self.lock_dir, exist_ok=True)
+            handle = open(os.path.join(self.lock_dir, f'{self.name}-{digest}.lock'), 'a+')
+        except OSError:
+            return fn()
+
+        with handle:
+            deadline = time.time() + SINGLEFLIGHT_WAIT
+            waited = False
+            while True:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except OSError:
+                    if time.time() >= deadline:
+                        # Holder looks stuck; fetch without it rather than hang
+                        return fn()
+                    waited = True
+                    time.sleep(LOCK_POLL_SECONDS)
+            try:
+                if waited:
+                    with self._lock:
+                        self._counters['process_waits'] += 1
+                    if check is not None:
+                        found = check()
+                        if found is not None:
+                            with self._lock:
+                                self._counters['process_hits'] += 1
+                            return found
+                return fn()
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats['in_flight'] = len(self._calls)
+        stats['mode'] = self.mode
+        return stats
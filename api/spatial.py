@@ -0,0 +1,96 @@
+import numpy as np
+
+EARTH_RADIUS_MILES = 3959
+MILES_PER_DEGREE_LAT = 69.05
+
+# Points are bucketed into fixed lat/lon cells (~1.4 miles tall at the default
+# size). A radius query only visits the handful of cells its bounding box
+# touches and runs one vectorized haversine over their members.
+DEFAULT_CELL_DEGREES = 0.02
+
+
+def haversine_miles(lat1, lon1, lat2, lon2):
+    # All arguments in radians; any of them may be arrays
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def distances_from(lat, lon, lats, lons):
+    # Degrees in, miles out
+    return haversine_miles(
+        np.radians(lat), np.radians(lon),
+        np.radians(np.asarray(lats, dtype=float)), np.radians(np.asarray(lons, dtype=float))
+    )
+
+
+class SpatialIndex:
+    def __init__(self, lats, lons, cell_degrees=DEFAULT_CELL_DEGREES):
+        lats = np.asarray(lats, dtype=float)
+        lons = np.asarray(lons, dtype=float)
+        self.cell_degrees = cell_degrees
+        self.size = len(lats)
+
+        rows = np.floor(lats / cell_degrees).astype(np.int64)
+        cols = np.floor(lons / cell_degrees).astype(np.int64)
+        keys = self._key(rows, cols)
+        order = np.argsort(keys, kind='stable')
+
+        # Members of each cell are contiguous in `order`
+        self._order = order
+        self._lat = np.radians(lats[order])
+        self._lon = np.radians(lons[order])
+        sorted_keys = keys[order]
+        unique, starts, counts = np.unique(sorted_keys, return_index=True, return_counts=True)
+        self._cells = {int(k): (int(s), int(s + c)) for k, s, c in zip(unique, starts, counts)}
+
+    @staticmethod
+    def _key(row, col):
+        return (row + 10000) * 100000 + (col + 20000)
+
+    def _candidates(self, lat, lon, radius_miles):
+        dlat = radius_miles / MILES_PER_DEGREE_LAT
+        dlon = radius_miles / (MILES_PER_DEGREE_LAT * max(np.cos(np.radians(lat)), 1e-6))
+        row_lo = int(np.floor((lat - dlat) / self.cell_degrees))
+        row_hi = int(np.floor((lat + dlat) / self.cell_degrees))
+        col_lo = int(np.floor((lon - dlon) / self.cell_degrees))
+        col_hi = int(np.floor((lon + dlon) / self.cell_degrees))
+
+        if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) > len(self._cells):
+            # Box covers more cells than exist: scanning everything is cheaper
+            return np.arange(self.size)
+
+        slices = []
+        for row in range(row_lo, row_hi + 1):
+            for col in range(col_lo, col_hi + 1):
+                span = self._cells.get(self._key(row, col))
+                if span:
+                    slices.append(np.arange(span[0], span[1]))
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(slices) if len(slices) > 1 else slices[0]
+
+    def radius(self, lat, lon, radius_miles):
+        # Returns (positions, miles) of every point within radius, nearest first;
+        # positions index the arrays the index was built from
+        candidates = self._candidates(lat, lon, radius_miles)
+        miles = haversine_miles(np.radians(lat), np.radians(lon), self._lat[candidates], self._lon[candidates])
+        inside = miles <= radius_miles
+        candidates, miles = candidates[inside], miles[inside]
+        nearest = np.argsort(miles, kind='stable')
+        return self._order[candidates[nearest]], miles[nearest]
+
+    def nearest(self, lat, lon, k, max_radius_miles=None):
+        # k nearest points, growing the search radius until k are inside it
+        radius = self.cell_degrees * MILES_PER_DEGREE_LAT
+        while True:
+            positions, miles = self.radius(lat, lon, radius)
+            exhausted = max_radius_miles is not None and radius >= max_radius_miles
+            if len(positions) >= k or exhausted or len(positions) == self.size or radius > 2 * np.pi * EARTH_RADIUS_MILES:
+                break
+            radius *= 2
+        if max_radius_miles is not None:
+            keep = miles <= max_radius_miles
+            positions, miles = positions[keep], miles[keep]
+        return positions[:k], miles[:k]
@@ -0,0 +1,368 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from cache import CACHE_DIR
+
+# Sold comps from every Apify run and imported dataset export, one row per
+# zpid. Searches are answered from here when enough recent rows match, so
+# repeat searches in a market never leave the box.
+
+INGEST_BATCH_ROWS = 1000
+# zpids looked up per query when filtering radius candidates
+NEARBY_CHUNK_ROWS = 500
+READ_CHUNK_BYTES = 1 << 16
+
+COLUMNS = (
+    'zpid', 'zipcode', 'sold_date', 'beds', 'baths', 'living_area',
+    'year_built', 'price', 'latitude', 'longitude', 'ingested_at', 'raw'
+)
+UPSERT = (
+    f"INSERT INTO sold_comps ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+    'ON CONFLICT(zpid) DO UPDATE SET ' + ', '.join(f'{c} = excluded.{c}' for c in COLUMNS[1:])
+)
+
+
+def _number(value):
+    if isinstance(value, dict):
+        value = value.get('value')
+    if isinstance(value, str):
+        value = re.sub(r'[^\d.]', '', value)
+    try:
+        return float(value) if value not in (None, '') else None
+    except ValueError:
+        return None
+
+
+def _sold_date(item):
+    value = item.get('dateSold') or item.get('soldDate') or item.get('lastSoldDate')
+    if value is None:
+        value = ((item.get('hdpData') or {}).get('homeInfo') or {}).get('dateSold')
+    if value in (None, ''):
+        return None
+    if isinstance(value, (int, float)):
+        # Zillow reports epoch milliseconds
+        seconds = value / 1000 if value > 1e11 else value
+        return datetime.fromtimestamp(seconds, timezone.utc).strftime('%Y-%m-%d')
+    match = re.match(r'(\d{4})-(\d{2})-(\d{2})', str(value))
+    if match:
+        return match.group(0)
+    for fmt in ('%m/%d/%Y', '%m/%d/%y'):
+        try:
+            return datetime.strptime(str(value), fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            pass
+    return None
+
+
+def _zipcode(item, default_zipcode=None):
+    address = item.get('address') if isinstance(item.get('address'), dict) else {}
+    zipcode = item.get('zipcode') or address.get('zipcode') or default_zipcode
+    return str(zipcode).strip()[:5] if zipcode else None
+
+
+def warehouse_row(item, default_zipcode=None, now=None):
+    # Raw Apify comp -> row tuple, or None when it could never be used as a comp
+    if not isinstance(item, dict) or not item.get('zpid'):
+        return None
+    beds = _number(item.get('bedrooms'))
+    baths = _number(item.get('bathrooms'))
+    living_area = _number(item.get('livingArea'))
+    price = _number(item.get('price'))
+    if not (beds and baths and living_area and price):
+        return None
+    lat_long = item.get('latLong') or {}
+    return (
+        str(item['zpid']),
+        _zipcode(item, default_zipcode),
+        _sold_date(item),
+        beds,
+        baths,
+        living_area,
+        _number(item.get('yearBuilt')),
+        price,
+        _number(item.get('latitude', lat_long.get('latitude'))),
+        _number(item.get('longitude', lat_long.get('longitude'))),
+        now or time.time(),
+        json.dumps(item, separators=(',', ':'))
+    )
+
+
+def sold_window_start(window, now=None):
+    # '6m' -> ISO date six months back; unknown formats disable the filter
+    match = re.fullmatch(r'(\d+)\s*([dwmy])', str(window or '').strip().lower())
+    if not match:
+        return None
+    count, unit = int(match.group(1)), match.group(2)
+    days = count * {'d': 1, 'w': 7, 'm': 30.44, 'y': 365.25}[unit]
+    start = datetime.fromtimestamp(now or time.time(), timezone.utc) - timedelta(days=days)
+    return start.strftime('%Y-%m-%d')
+
+
+def iter_export(fp):
+    # Yields items from a dataset export, either a JSON array or JSON lines,
+    # without loading the file
+    decoder = json.JSONDecoder()
+    buffer = fp.read(READ_CHUNK_BYTES)
+    stripped = buffer.lstrip()
+    if not stripped.startswith('['):
+        lines = (buffer + fp.readline()).splitlines()
+        for line in lines:
+            if line.strip():
+                yield json.loads(line)
+        for line in fp:
+            if line.strip():
+                yield json.loads(line)
+        return
+
+    buffer = stripped[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = fp.read(READ_CHUNK_BYTES)
+            if not chunk:
+                raise
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+        if len(buffer) < READ_CHUNK_BYTES:
+            buffer += fp.read(READ_CHUNK_BYTES)
+
+
+class CompWarehouse:
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, 'warehouse.sqlite3')
+        self._local = threading.local()
+        self._disk_ok = True
+        self._spatial_lock = threading.Lock()
+        self._spatial = None
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None or not self._disk_ok:
+            return conn
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sold_comps ('
+                'zpid TEXT PRIMARY KEY, zipcode TEXT, sold_date TEXT, beds REAL, baths REAL, '
+                'living_area REAL, year_built REAL, price REAL, latitude REAL, longitude REAL, '
+                'ingested_at REAL NOT NULL, raw TEXT NOT NULL)'
+            )
+            conn.execute(
+                'CREATE INDEX IF NOT EXISTS idx_sold_comps_search '
+                'ON sold_comps (zipcode, sold_date, beds, living_area)'
+            )
+            conn.commit()
+        except sqlite3.Error:
+            # No writable disk: the warehouse is simply empty
+            self._disk_ok = False
+            return None
+        self._local.conn = conn
+        return conn
+
+    def _upsert(self, conn, rows):
+        try:
+            conn.executemany(UPSERT, rows)
+            conn.commit()
+            return True
+        except sqlite3.Error:
+            conn.rollback()
+            return False
+
+    def recording(self, items, default_zipcode=None, counts=None):
+        # Passes items through untouched while upserting them by zpid in
+        # batches, so a streaming pipeline can fill the warehouse as it goes.
+        # Rows are serialized before the item is handed on, so consumers may
+        # mutate it. Whatever was read is flushed when the generator closes.
+        conn = self._connection()
+        counts = {'read': 0, 'stored': 0, 'skipped': 0} if counts is None else counts
+        now = time.time()
+        rows = []
+        try:
+            for item in items:
+                counts['read'] += 1
+                row = warehouse_row(item, default_zipcode, now)
+                if row is None:
+                    counts['skipped'] += 1
+                elif conn is not None:
+                    rows.append(row)
+                if len(rows) >= INGEST_BATCH_ROWS:
+                    if self._upsert(conn, rows):
+                        counts['stored'] += len(rows)
+                    rows = []
+                yield item
+        finally:
+            if rows and self._upsert(conn, rows):
+                counts['stored'] += len(rows)
+
+    def ingest(self, items, default_zipcode=None):
+        # Re-importing the same export is a no-op apart from refreshing
+        # ingested_at. Returns counts.
+        counts = {'read': 0, 'stored': 0, 'skipped': 0}
+        for _ in self.recording(items, default_zipcode, counts):
+            pass
+        return counts
+
+    def _filters(self, actor_input, now, max_age, by_zipcode=True):
+        # WHERE clauses and parameters for a comps actor input
+        clauses, params = [], []
+        if by_zipcode:
+            clauses.append('zipcode = ?')
+            params.append(str(actor_input.get('location', '')).strip()[:5])
+        for column, op, key in (
+            ('beds', '>=', 'minBeds'), ('beds', '<=', 'maxBeds'),
+            ('baths', '>=', 'minBaths'),
+            ('year_built', '>=', 'minYearBuilt'), ('year_built', '<=', 'maxYearBuilt')
+        ):
+            if actor_input.get(key) is not None:
+                clauses.append(f'{column} {op} ?')
+                params.append(float(actor_input[key]))
+        min_size, max_size = _number(actor_input.get('minSize')), _number(actor_input.get('maxSize'))
+        if max_size:
+            clauses.append('living_area BETWEEN ? AND ?')
+            params.extend([min_size or 0, max_size])
+        window_start = sold_window_start(actor_input.get('maxSoldDate'), now)
+        if window_start:
+            # Undated rows count while their ingest is inside the window; the
+            # actor only returned them because they sold inside it
+            clauses.append('(sold_date >= ? OR (sold_date IS NULL AND ingested_at >= ?))')
+            start = datetime.strptime(window_start, '%Y-%m-%d').replace(tzinfo=timezone.utc).timestamp()
+            params.extend([window_start, start])
+        if max_age is not None:
+            clauses.append('ingested_at >= ?')
+            params.append(now - max_age)
+        return clauses, params
+
+    def search(self, actor_input, now=None, max_age=None):
+        # Runs a comps actor input against the warehouse. Returns
+        # (raw items newest sale first, seconds since the stalest match was
+        # refreshed) - the age is None when nothing matched. Rows ingested
+        # more than max_age seconds ago are left out.
+        conn = self._connection()
+        if conn is None:
+            return [], None
+        now = now or time.time()
+        clauses, params = self._filters(actor_input, now, max_age)
+        try:
+            rows = conn.execute(
+                f"SELECT raw, ingested_at FROM sold_comps WHERE {' AND '.join(clauses)} "
+                'ORDER BY sold_date DESC LIMIT ?',
+                params + [int(actor_input.get('maxItems') or 20)]
+            ).fetchall()
+        except sqlite3.Error:
+            return [], None
+        if not rows:
+            return [], None
+        return [json.loads(raw) for raw, _ in rows], now - min(ingested_at for _, ingested_at in rows)
+
+    def _spatial_index(self, conn):
+        # (SpatialIndex, zpids) over every row with coordinates, or None.
+        # Rebuilt once new zpids have been added; re-ingesting a known zpid
+        # keeps its rowid and its place in the index.
+        from spatial import SpatialIndex
+        version = conn.execute('SELECT COUNT(*), MAX(rowid) FROM sold_comps').fetchone()
+        with self._spatial_lock:
+            if self._spatial is None or self._spatial[0] != version:
+                rows = conn.execute(
+                    'SELECT zpid, latitude, longitude FROM sold_comps '
+                    'WHERE latitude IS NOT NULL AND longitude IS NOT NULL'
+                ).fetchall()
+                zpids = [zpid for zpid, _, _ in rows]
+                index = SpatialIndex([lat for _, lat, _ in rows], [lon for _, _, lon in rows]) if rows else None
+                self._spatial = (version, index, zpids)
+            _, index, zpids = self._spatial
+        return (index, zpids) if index is not None else None
+
+    def nearby(self, actor_input, lat, lon, radius_miles, k, now=None, max_age=None):
+        # Like search, but the matches are the k rows nearest (lat, lon)
+        # within radius_miles, from any ZIP, nearest first. Radius candidates
+        # come from the spatial index and are filtered in distance order, a
+        # chunk at a time, until k have matched.
+        conn = self._connection()
+        if conn is None:
+            return [], None
+        now = now or time.time()
+        clauses, params = self._filters(actor_input, now, max_age, by_zipcode=False)
+        try:
+            spatial = self._spatial_index(conn)
+            if spatial is None:
+                return [], None
+            index, zpids = spatial
+            positions, _ = index.radius(lat, lon, radius_miles)
+            rows = []
+            for start in range(0, len(positions), NEARBY_CHUNK_ROWS):
+                chunk = [zpids[p] for p in positions[start:start + NEARBY_CHUNK_ROWS]]
+                found = {zpid: (raw, ingested_at) for zpid, raw, ingested_at in conn.execute(
+                    f"SELECT zpid, raw, ingested_at FROM sold_comps WHERE zpid IN ({', '.join('?' * len(chunk))})"
+                    + ''.join(f' AND {clause}' for clause in clauses),
+                    chunk + params
+                )}
+                rows.extend(found[zpid] for zpid in chunk if zpid in found)
+                if len(rows) >= k:
+                    break
+        except sqlite3.Error:
+            return [], None
+        rows = rows[:k]
+        if not rows:
+            return [], None
+        return [json.loads(raw) for raw, _ in rows], now - min(ingested_at for _, ingested_at in rows)
+
+    def stats(self):
+        conn = self._connection()
+        if conn is None:
+            return {'persistent': False, 'comps': 0}
+        try:
+            count, zipcodes, newest = conn.execute(
+                'SELECT COUNT(*), COUNT(DISTINCT zipcode), MAX(ingested_at) FROM sold_comps'
+            ).fetchone()
+        except sqlite3.Error:
+            return {'persistent': False, 'comps': 0}
+        return {
+            'persistent': True,
+            'comps': count,
+            'zipcodes': zipcodes,
+            'last_ingest_age_seconds': round(time.time() - newest, 1) if newest else None
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load Apify sold-comp dataset exports into the comp warehouse')
+    parser.add_argument('--path', help='warehouse file (default: $WAREHOUSE_PATH or $CACHE_DIR/warehouse.sqlite3)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    ingest = commands.add_parser('ingest', help='import JSON or JSONL exports ("-" reads stdin)')
+    ingest.add_argument('files', nargs='+')
+    ingest.add_argument('--zipcode', help='zipcode for items that do not carry one')
+    commands.add_parser('stats')
+    args = parser.parse_args(argv)
+
+    warehouse = CompWarehouse(args.path or os.getenv('WAREHOUSE_PATH'))
+    if args.command == 'stats':
+        print(json.dumps(warehouse.stats(), indent=2))
+        return 0
+
+    for name in args.files:
+        if name == '-':
+            counts = warehouse.ingest(iter_export(sys.stdin), args.zipcode)
+        else:
+            with open(name, encoding='utf-8') as fp:
+                counts = warehouse.ingest(iter_export(fp), args.zipcode)
+        print(f"{name}: {counts['read']} read, {counts['stored']} stored, {counts['skipped']} skipped")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
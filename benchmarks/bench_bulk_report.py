@@ -0,0 +1,71 @@
+"""Bulk PDF export through api/bulk_report.py against one render per request.
+
+    python benchmarks/bench_bulk_report.py [--reports 60] [--workers 4]
+
+Renders the same uncached deal list twice: one report at a time, as
+separate /api/report/pdf calls would, and as a streamed ZIP on the process
+pool. Verifies the archive and its manifest. Pool speedup is bounded by the
+machine's core count.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='bench-bulk-'))
+os.environ['APIFY_API_TOKEN'] = ''
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from fixtures.analyses import sample_analyses  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reports', type=int, default=60)
+    parser.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    os.environ['BULK_REPORT_WORKERS'] = str(args.workers)
+
+    import bulk_report
+    from pdf_report import render_pdf, report_payload
+
+    analyses = sample_analyses(args.reports)
+    render_pdf(report_payload(analyses[0]))
+
+    start = time.perf_counter()
+    for analysis in analyses:
+        render_pdf(report_payload(analysis))
+    serial = time.perf_counter() - start
+    print(f'one at a time: {serial:6.2f} s')
+
+    # Start the workers outside the timing, as a warm server would have them
+    pool = bulk_report.get_pool()
+    if pool is not None:
+        pool.submit(render_pdf, report_payload(analyses[0])).result()
+    bulk_report.pdf_cache.clear()
+
+    start = time.perf_counter()
+    first_chunk = None
+    buffer = io.BytesIO()
+    for chunk in bulk_report.stream_report_zip(analyses):
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        buffer.write(chunk)
+    bulk = time.perf_counter() - start
+    print(f'bulk zip ({args.workers} workers): {bulk:6.2f} s, first bytes after {first_chunk * 1000:.0f} ms, '
+          f'{serial / bulk:.1f}x')
+
+    archive = zipfile.ZipFile(buffer)
+    manifest = json.loads(archive.read('manifest.json'))
+    ok = archive.testzip() is None and manifest['reports'] == args.reports
+    print(f"archive: {len(archive.namelist()) - 1} reports, {manifest['failed']} failed, valid: {ok}")
+    bulk_report.reset_pool()
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Peak memory of the streaming Excel export against the property count.
+
+    python benchmarks/bench_excel_export.py [--sizes 100,500,2000]
+
+Writes a portfolio workbook (Summary, Comps, Flip and Rental sheets) for each
+size with api/excel_report.py and reports the traced peak and the file size
+(timings include tracemalloc overhead). With write-only sheets the peak
+should stay roughly flat as rows grow.
+"""
+import argparse
+import copy
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='bench-excel-'))
+os.environ['APIFY_API_TOKEN'] = ''
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+import excel_report  # noqa: E402
+from fixtures.analyses import sample_analysis  # noqa: E402
+
+
+def portfolio(template, count):
+    # Generated lazily, as NDJSON rows are read from a request body
+    for i in range(count):
+        analysis = copy.deepcopy(template)
+        analysis['address'] = f'{100 + i} Main St, Atlanta, GA 30344'
+        yield {'index': i, 'status': 'ok', 'analysis': analysis}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='100,500,2000')
+    args = parser.parse_args()
+
+    template = sample_analysis()
+    # Load openpyxl before measuring
+    os.remove(excel_report.build_workbook_file(portfolio(template, 1)))
+
+    for size in [int(s) for s in args.sizes.split(',')]:
+        tracemalloc.start()
+        start = time.perf_counter()
+        path = excel_report.build_workbook_file(portfolio(template, size))
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        file_size = os.path.getsize(path)
+        os.remove(path)
+        print(f'{size:>6} properties: {elapsed:6.2f} s, peak {peak / 1024:8.1f} KiB, '
+              f'file {file_size / 1024:8.1f} KiB')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Per-report render time and memory for api/pdf_report.py.
+
+    python benchmarks/bench_pdf_report.py [--reports 30]
+
+Compares three ways of serving the same analysis:
+
+  per-request styles  style sheet and table styles rebuilt for every report,
+                      as the original route did
+  shared templates    styles built once per process
+  content-hash cache  repeat download of an already rendered report
+
+and checks that equal payloads render to identical bytes.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='bench-pdf-'))
+os.environ['APIFY_API_TOKEN'] = ''
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+import pdf_report  # noqa: E402
+from fixtures.analyses import sample_analysis  # noqa: E402
+
+
+def measure(label, analyses, serve):
+    timings = []
+    peaks = []
+    for analysis in analyses:
+        tracemalloc.start()
+        start = time.perf_counter()
+        serve(analysis)
+        timings.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    timings.sort()
+    print(f'{label:>20}: median {timings[len(timings) // 2] * 1000:7.2f} ms, '
+          f'peak {sum(peaks) / len(peaks) / 1024:8.1f} KiB per report')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reports', type=int, default=30)
+    args = parser.parse_args()
+
+    analyses = [sample_analysis(i) for i in range(args.reports)]
+    payloads = [pdf_report.report_payload(a) for a in analyses]
+    # Load reportlab before timing anything
+    pdf_report.render_pdf(payloads[0])
+
+    def per_request_styles(payload):
+        pdf_report._templates = None
+        return pdf_report.render_pdf(payload)
+
+    measure('per-request styles', payloads, per_request_styles)
+    measure('shared templates', payloads, pdf_report.render_pdf)
+
+    pdf_report.pdf_cache.clear()
+    for analysis in analyses:
+        pdf_report.cached_pdf(analysis)
+    measure('content-hash cache', analyses, pdf_report.cached_pdf)
+
+    identical = pdf_report.render_pdf(payloads[0]) == pdf_report.render_pdf(dict(payloads[0]))
+    print(f'deterministic output: {identical}')
+    return 0 if identical else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
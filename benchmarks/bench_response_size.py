@@ -0,0 +1,59 @@
+"""Bytes on the wire for /api/analyze and /api/analyze/batch response shapes.
+
+    python benchmarks/bench_response_size.py [--batch 50]
+
+Prints the size of the full, compact and fields= projected forms of one
+analysis and of a detail=full batch, uncompressed and with each encoding
+this environment can negotiate (brotli only if installed).
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+os.environ.setdefault('CACHE_DIR', tempfile.mkdtemp(prefix='bench-response-'))
+os.environ['APIFY_API_TOKEN'] = ''
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from index import app  # noqa: E402
+from responses import brotli_available  # noqa: E402
+
+PROPERTY = {
+    'address': '123 Main St, Atlanta, GA 30344', 'purchasePrice': 150000, 'currentSqft': 1500,
+    'beds': 3, 'baths': 2, 'zipcode': '30344', 'yearBuilt': 1995
+}
+FIELDS = 'analysis_id,comps.estimated_value,best_scenario.name,best_scenario.roi'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--batch', type=int, default=50)
+    args = parser.parse_args()
+
+    client = app.test_client()
+    encodings = ['identity', 'gzip'] + (['br'] if brotli_available() else [])
+    batch = [dict(PROPERTY, address=f'{100 + i} Main St, Atlanta, GA 30344') for i in range(args.batch)]
+    cases = [
+        ('analyze', '/api/analyze', PROPERTY),
+        ('analyze compact', '/api/analyze?compact=1', PROPERTY),
+        ('analyze fields=', f'/api/analyze?fields={FIELDS}', PROPERTY),
+        (f'batch x{args.batch} full', '/api/analyze/batch?detail=full', batch),
+        (f'batch x{args.batch} compact', '/api/analyze/batch?detail=full&compact=1', batch)
+    ]
+
+    print(f"{'':>22}" + ''.join(f'{e:>12}' for e in encodings))
+    baseline = {}
+    for label, path, body in cases:
+        sizes = []
+        for encoding in encodings:
+            response = client.post(path, json=body, headers={'Accept-Encoding': encoding})
+            assert response.status_code == 200, (path, response.status_code)
+            sizes.append(len(response.data))
+        baseline.setdefault(label.split()[0], sizes[0])
+        ratio = sizes[-1] / baseline[label.split()[0]]
+        print(f'{label:>22}' + ''.join(f'{s:>12,}' for s in sizes) + f'   {ratio:6.1%} of full')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Parity check and throughput benchmark for api/scenario_engine.py.
+
+    python benchmarks/bench_scenario_engine.py [--n 100000] [--parity 5000]
+
+Compares the vectorized engine's dict view against calculate_flip_scenarios
+and calculate_rental_scenarios for random properties (exit status 1 on any
+mismatch), then times both implementations.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from index import calculate_flip_scenarios, calculate_rental_scenarios, get_fmr  # noqa: E402
+from scenario_engine import compute_scenarios, scenario_dicts  # noqa: E402
+from fixtures.seeded import scalar_inputs, seeded_properties  # noqa: E402
+
+
+def check_parity(n, seed):
+    purchase, sqft, beds, zipcodes, arv = seeded_properties(n, seed)
+    fmr = [get_fmr(str(z), int(b)) for z, b in zip(zipcodes, beds)]
+    results = compute_scenarios(purchase, sqft, beds, fmr, arv)
+
+    mismatches = 0
+    for i in range(n):
+        property_data = scalar_inputs(purchase, sqft, beds, zipcodes, i)
+        expected = (
+            calculate_flip_scenarios(property_data, float(arv[i])),
+            calculate_rental_scenarios(property_data, float(arv[i]))
+        )
+        actual = scenario_dicts(results, i)
+        if actual != expected:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f'  mismatch at {i}: {property_data} arv={arv[i]}')
+    return mismatches
+
+
+def bench_engine(n, seed, repeat=5):
+    purchase, sqft, beds, zipcodes, arv = seeded_properties(n, seed)
+    fmr = np.array([get_fmr(str(z), int(b)) for z, b in zip(zipcodes, beds)], dtype=float)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        compute_scenarios(purchase, sqft, beds, fmr, arv)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def bench_scalar(n, seed):
+    purchase, sqft, beds, zipcodes, arv = seeded_properties(n, seed)
+    start = time.perf_counter()
+    for i in range(n):
+        property_data = scalar_inputs(purchase, sqft, beds, zipcodes, i)
+        calculate_flip_scenarios(property_data, float(arv[i]))
+        calculate_rental_scenarios(property_data, float(arv[i]))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--n', type=int, default=100000)
+    parser.add_argument('--parity', type=int, default=5000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print(f'parity: {args.parity} random properties')
+    mismatches = check_parity(args.parity, args.seed)
+    print(f'  {mismatches} mismatches')
+
+    engine = bench_engine(args.n, args.seed)
+    scalar = bench_scalar(args.n, args.seed)
+    print(f'engine: {args.n} properties in {engine * 1000:.1f} ms ({args.n / engine:,.0f} properties/s)')
+    print(f'scalar: {args.n} properties in {scalar * 1000:.1f} ms ({args.n / scalar:,.0f} properties/s)')
+    print(f'speedup: {scalar / engine:.0f}x')
+
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Radius and k-nearest query latency for api/spatial.py.
+
+    python benchmarks/bench_spatial.py [--points 500000] [--queries 2000]
+
+Builds an index over random sales spread across a metro-sized box, checks a
+sample of radius queries against a brute-force haversine scan, and reports
+per-query latency.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api'))
+
+from spatial import SpatialIndex, distances_from  # noqa: E402
+
+# Roughly the Atlanta metro
+LAT_RANGE = (33.4, 34.2)
+LON_RANGE = (-84.8, -83.9)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--points', type=int, default=500000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--radius', type=float, default=2.0)
+    parser.add_argument('--k', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(3)
+    lats = rng.uniform(*LAT_RANGE, args.points)
+    lons = rng.uniform(*LON_RANGE, args.points)
+    query_lats = rng.uniform(*LAT_RANGE, args.queries)
+    query_lons = rng.uniform(*LON_RANGE, args.queries)
+
+    start = time.perf_counter()
+    index = SpatialIndex(lats, lons)
+    print(f'build: {args.points} points in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+    failures = 0
+    for lat, lon in zip(query_lats[:20], query_lons[:20]):
+        positions, _ = index.radius(lat, lon, args.radius)
+        brute = np.flatnonzero(distances_from(lat, lon, lats, lons) <= args.radius)
+        if set(positions.tolist()) != set(brute.tolist()):
+            failures += 1
+    print(f'radius check vs brute force: {failures} failures')
+
+    for name, query in (
+        (f'radius {args.radius} mi', lambda lat, lon: index.radius(lat, lon, args.radius)),
+        (f'{args.k}-nearest', lambda lat, lon: index.nearest(lat, lon, args.k))
+    ):
+        timings = []
+        for lat, lon in zip(query_lats, query_lons):
+            start = time.perf_counter()
+            query(lat, lon)
+            timings.append(time.perf_counter() - start)
+        timings = np.array(timings) * 1000
+        print(f'{name}: p50 {np.percentile(timings, 50):.3f} ms, p99 {np.percentile(timings, 99):.3f} ms')
+
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,29 @@
+"""Analyses for the report benchmarks, built the way /api/analyze builds them.
+
+    from fixtures.analyses import sample_analysis, sample_analyses
+
+Comps come from fetch_comps, so with APIFY_API_TOKEN unset (as every
+benchmark runs) they are the demo comps and the analyses are deterministic.
+api/ must be on sys.path and CACHE_DIR set before these are called.
+"""
+
+
+def sample_analysis(i=0):
+    # The i-th deal: 100 + i Main St, $1,000 dearer per step
+    from index import build_analysis, fetch_comps, parse_property_input
+
+    property_data = parse_property_input({
+        'address': f'{100 + i} Main St, Atlanta, GA 30344',
+        'purchasePrice': 120000 + 1000 * i,
+        'currentSqft': 1500,
+        'beds': 3,
+        'baths': 2,
+        'zipcode': '30344',
+        'yearBuilt': 1995
+    })
+    comps, comp_source = fetch_comps('30344', 3, 2, 1500, 1995)
+    return build_analysis(property_data, comps, comp_source)
+
+
+def sample_analyses(count):
+    return [sample_analysis(i) for i in range(count)]
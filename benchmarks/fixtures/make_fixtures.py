@@ -0,0 +1,82 @@
+"""Regenerates the benchmark fixtures in this directory.
+
+    python benchmarks/fixtures/make_fixtures.py
+
+The output is seeded and checked in; only rerun this when the fixtures
+should change, and re-save the baseline afterwards
+(python benchmarks/suite.py --save).
+
+  properties.json      subject properties with coordinates and an ARV
+  comps.json           normalized sold comps around metro Atlanta
+  safmr_sample.csv     HUD SAFMR-style rents for the fixture ZIPs
+"""
+import csv
+import json
+import os
+import random
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SEED = 20240601
+CENTER = (33.749, -84.388)
+ZIPCODES = [f'30{n:03d}' for n in range(301, 361)]
+
+
+def write_rows(path, rows):
+    # A JSON array with one record per line, so fixture diffs stay readable
+    with open(path, 'w') as fp:
+        fp.write('[\n' + ',\n'.join(json.dumps(row, sort_keys=True) for row in rows) + '\n]\n')
+
+
+def main():
+    rng = random.Random(SEED)
+
+    properties = []
+    for i in range(60):
+        sqft = rng.randrange(700, 3800, 10)
+        price = round(sqft * rng.uniform(55, 190), -3)
+        properties.append({
+            'address': f'{rng.randrange(100, 9900)} {rng.choice(["Oak", "Pine", "Peachtree", "Main", "Elm"])} St, Atlanta, GA',
+            'zipcode': rng.choice(ZIPCODES),
+            'purchasePrice': price,
+            'currentSqft': sqft,
+            'beds': rng.randrange(1, 6),
+            'baths': rng.choice([1, 1.5, 2, 2.5, 3]),
+            'yearBuilt': rng.randrange(1925, 2020),
+            'latitude': round(CENTER[0] + rng.uniform(-0.25, 0.25), 6),
+            'longitude': round(CENTER[1] + rng.uniform(-0.25, 0.25), 6),
+            'arv': round(price * rng.uniform(0.8, 1.9), -3)
+        })
+
+    comps = []
+    for i in range(600):
+        sqft = rng.randrange(700, 3800, 10)
+        value = round(sqft * rng.uniform(70, 230), -3)
+        zipcode = rng.choice(ZIPCODES)
+        comps.append({
+            'zpid': str(10_000_000 + i),
+            'address': {'streetAddress': f'{rng.randrange(100, 9900)} Comp Rd', 'city': 'Atlanta', 'state': 'GA', 'zipcode': zipcode},
+            'price': {'value': value},
+            'bedrooms': rng.randrange(1, 6),
+            'bathrooms': rng.choice([1, 1.5, 2, 2.5, 3]),
+            'livingArea': sqft,
+            'yearBuilt': rng.randrange(1925, 2020),
+            'price_per_sqft': round(value / sqft, 2),
+            'distance_miles': 0.0,
+            # A few comps without coordinates, as scraped data has
+            'latitude': None if i % 37 == 0 else round(CENTER[0] + rng.uniform(-0.3, 0.3), 6),
+            'longitude': None if i % 37 == 0 else round(CENTER[1] + rng.uniform(-0.3, 0.3), 6),
+            'listing': {'dateSold': f'2024-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}'}
+        })
+
+    write_rows(os.path.join(HERE, 'properties.json'), properties)
+    write_rows(os.path.join(HERE, 'comps.json'), comps)
+    with open(os.path.join(HERE, 'safmr_sample.csv'), 'w', newline='') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(['ZIP Code', 'SAFMR 0BR', 'SAFMR 1BR', 'SAFMR 2BR', 'SAFMR 3BR', 'SAFMR 4BR'])
+        for zipcode in ZIPCODES:
+            base = rng.randrange(950, 1700, 10)
+            writer.writerow([zipcode] + [base + step for step in (0, 110, 320, 740, 1080)])
+
+
+if __name__ == '__main__':
+    main()
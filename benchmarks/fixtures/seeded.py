@@ -0,0 +1,33 @@
+"""Seeded random property columns for the scenario engine parity checks.
+
+    from fixtures.seeded import seeded_properties, scalar_inputs
+
+Shared by benchmarks/bench_scenario_engine.py and tests/test_scenario_engine.py
+so the benchmark and the tests exercise the same input distribution.
+"""
+import numpy as np
+
+ZIPCODES = ('30344', '30310', '30032', '99999')
+
+
+def seeded_properties(n, seed):
+    # (purchase, sqft, beds, zipcodes, arv) columns; prices are rounded to
+    # anything from thousands to cents so the rounding paths are all hit
+    rng = np.random.default_rng(seed)
+    purchase = np.round(rng.uniform(40000, 600000, n), rng.integers(-3, 2))
+    sqft = rng.integers(600, 4500, n).astype(float)
+    beds = rng.integers(0, 7, n)
+    zipcodes = rng.choice(ZIPCODES, n)
+    arv = purchase * rng.uniform(0.7, 2.0, n)
+    return purchase, sqft, beds, zipcodes, arv
+
+
+def scalar_inputs(purchase, sqft, beds, zipcodes, i):
+    # The i-th property as the dict the scalar calculators take
+    return {
+        'purchasePrice': float(purchase[i]),
+        'currentSqft': float(sqft[i]),
+        'beds': int(beds[i]),
+        'baths': 2.0,
+        'zipcode': str(zipcodes[i])
+    }
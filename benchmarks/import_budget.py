@@ -0,0 +1,116 @@
+"""Cold-start import budget for the Vercel entry points.
+
+    python benchmarks/import_budget.py [--runs 5] [--update]
+
+Each entry point is imported in a fresh interpreter under `python -X
+importtime`; the best cumulative import time of the entry module is compared
+with benchmarks/import_budget.json. The script also checks that heavy
+libraries stay out of each entry point, both at import and after serving
+its light routes. Exits 1 on any regression. --update rewrites the budgets
+from this machine's timings plus headroom.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+API_DIR = os.path.join(ROOT, 'api')
+BUDGET_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'import_budget.json')
+
+# Budgets written by --update are the measured time times this
+HEADROOM = 1.5
+
+# Light requests replayed in-process after import; none may pull in a
+# forbidden module
+ROUTE_PROBES = {
+    'index': [
+        ('GET', '/api/health', None),
+        ('POST', '/api/lookup-property', {'address': '123 Main St, Atlanta, GA 30344'}),
+        ('POST', '/api/analyze', {
+            'address': '123 Main St, Atlanta, GA 30344', 'purchasePrice': 150000, 'currentSqft': 1500,
+            'beds': 3, 'baths': 2, 'zipcode': '30344', 'yearBuilt': 1995
+        })
+    ],
+    'reports': []
+}
+
+PROBE_SCRIPT = '''
+import json, sys
+import {module} as entry
+client = entry.app.test_client()
+for method, path, body in json.loads(sys.argv[1]):
+    response = client.open(path, method=method, json=body)
+    assert response.status_code < 500, (path, response.status_code)
+print(json.dumps(sorted(m.split('.')[0] for m in sys.modules)))
+'''
+
+
+def child_env():
+    env = dict(os.environ)
+    # No token: the probes must never reach the network
+    env['APIFY_API_TOKEN'] = ''
+    env['CACHE_DIR'] = tempfile.mkdtemp(prefix='import-budget-')
+    env.pop('PYTHONPATH', None)
+    return env
+
+
+def import_ms(module, env):
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=API_DIR, env=env, capture_output=True, text=True, check=True
+    )
+    for line in result.stderr.splitlines():
+        parts = [p.strip() for p in line.split('|')]
+        if len(parts) == 3 and parts[2] == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f'no importtime line for {module}')
+
+
+def loaded_modules(module, env):
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE_SCRIPT.format(module=module), json.dumps(ROUTE_PROBES.get(module, []))],
+        cwd=API_DIR, env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return set(json.loads(result.stdout.strip().splitlines()[-1]))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--update', action='store_true')
+    args = parser.parse_args()
+
+    with open(BUDGET_PATH) as fp:
+        budgets = json.load(fp)
+
+    env = child_env()
+    failures = 0
+    for module, budget in budgets.items():
+        # The first run also warms the bytecode cache
+        timings = [import_ms(module, env) for _ in range(args.runs + 1)][1:]
+        best = min(timings)
+        forbidden = sorted(set(budget['forbidden']) & loaded_modules(module, env))
+
+        if args.update:
+            budget['max_ms'] = round(best * HEADROOM, 1)
+        over = best > budget['max_ms']
+        failures += over + bool(forbidden)
+        status = 'FAIL' if over or forbidden else 'ok'
+        print(f"{module}: {best:.1f} ms (budget {budget['max_ms']} ms) {status}")
+        if forbidden:
+            print(f"  loads forbidden modules: {', '.join(forbidden)}")
+
+    if args.update:
+        with open(BUDGET_PATH, 'w') as fp:
+            json.dump(budgets, fp, indent=2)
+            fp.write('\n')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,236 @@
+"""Microbenchmarks for the calculators and report generators.
+
+    python benchmarks/suite.py                    # run and compare with the baseline
+    python benchmarks/suite.py --save             # run and record a new baseline
+    python benchmarks/suite.py -k distances       # only cases whose name matches
+
+Every case runs against the checked-in fixtures in benchmarks/fixtures (the
+FMR lookups use a table built from safmr_sample.csv), so numbers only move
+when the code does. Each case reports ops/sec, per-op latency percentiles
+and the peak traced allocation of one op; the median is the lowest of five
+timed rounds. A comparison run exits 1 when a case's median latency or peak
+allocation exceeds the baseline by more than --threshold. Baselines are
+machine specific; re-save on the machine that runs the comparison, and
+tighten --threshold on quiet dedicated hardware.
+"""
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+FIXTURES = os.path.join(HERE, 'fixtures')
+BASELINE_PATH = os.path.join(HERE, 'baseline.json')
+ROUNDS = 5
+
+_scratch = tempfile.mkdtemp(prefix='bench-suite-')
+os.environ['CACHE_DIR'] = os.path.join(_scratch, 'cache')
+os.environ['FMR_TABLE_PATH'] = os.path.join(_scratch, 'fmr.bin')
+os.environ['APIFY_API_TOKEN'] = ''
+os.environ.pop('PROFILE_SECRET', None)
+os.environ.pop('PROFILE_SAMPLE_RATE', None)
+sys.path.insert(0, os.path.join(HERE, '..', 'api'))
+
+import fmr  # noqa: E402
+
+fmr.build_table([(2025, os.path.join(FIXTURES, 'safmr_sample.csv'))], os.environ['FMR_TABLE_PATH'])
+
+import index  # noqa: E402
+import pdf_report  # noqa: E402
+import reports  # noqa: E402
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as fp:
+        return json.load(fp)
+
+
+class Case:
+    # setup() runs untimed before every sample and returns the sample's
+    # argument; run(arg) is timed. inner ops are timed together for
+    # functions too fast to time one call at a time.
+    def __init__(self, name, run, setup=None, inner=1):
+        self.name = name
+        self.run = run
+        self.setup = setup or (lambda: None)
+        self.inner = inner
+
+
+def build_cases():
+    properties = load_fixture('properties.json')
+    comps = load_fixture('comps.json')
+    inputs = [index.parse_property_input(p) for p in properties]
+    for parsed, raw in zip(inputs, properties):
+        parsed['latitude'], parsed['longitude'] = raw['latitude'], raw['longitude']
+    arvs = [p['arv'] for p in properties]
+    fmr_keys = [(p['zipcode'], beds) for p in properties for beds in range(5)]
+
+    analyses = []
+    for i, property_data in enumerate(inputs[:10]):
+        subject_comps = copy.deepcopy(comps[i * 10:i * 10 + 60])
+        analyses.append(index.build_analysis(property_data, subject_comps, {'source': 'fixture'}))
+
+    client = reports.app.test_client()
+    cycle = {'i': 0}
+
+    def next_index(n):
+        cycle['i'] = (cycle['i'] + 1) % n
+        return cycle['i']
+
+    def next_property():
+        i = next_index(len(inputs))
+        return inputs[i], arvs[i]
+
+    def comps_sample(count):
+        def setup():
+            start = next_index(len(comps) - count)
+            subject = inputs[start % len(inputs)]
+            return copy.deepcopy(comps[start:start + count]), subject['latitude'], subject['longitude']
+        return setup
+
+    def fmr_lookups(_):
+        for zipcode, beds in fmr_keys:
+            fmr.get_fmr(zipcode, beds)
+
+    def post_report(kind):
+        def run(analysis):
+            response = client.post(f'/api/report/{kind}', json=analysis)
+            assert response.status_code == 200, response.status_code
+            response.get_data()
+        return run
+
+    def uncached_analysis():
+        # Rendering is what is measured, so no sample may hit the PDF cache
+        pdf_report.pdf_cache.clear()
+        return analyses[next_index(len(analyses))]
+
+    return [
+        Case('calculate_flip_scenarios', lambda arg: index.calculate_flip_scenarios(*arg), next_property),
+        Case('calculate_rental_scenarios', lambda arg: index.calculate_rental_scenarios(*arg), next_property),
+        Case('calculate_distances[20]', lambda arg: index.calculate_distances(*arg), comps_sample(20)),
+        Case('calculate_distances[500]', lambda arg: index.calculate_distances(*arg), comps_sample(500)),
+        Case('get_fmr', fmr_lookups, inner=len(fmr_keys)),
+        Case('create_pdf_report', post_report('pdf'), uncached_analysis),
+        Case('create_pdf_report[cached]', post_report('pdf'), lambda: analyses[0]),
+        Case('create_excel_report', post_report('excel'), lambda: analyses[next_index(len(analyses))])
+    ]
+
+
+def percentile(sorted_values, pct):
+    index_ = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index_]
+
+
+def measure(case, min_time, min_samples, max_samples, alloc_samples):
+    for _ in range(3):
+        case.run(case.setup())
+
+    # Timed in rounds; the median compared against the baseline is the
+    # lowest round median, which shrugs off a round disturbed by other load
+    timings = []
+    medians = []
+    total = 0.0
+    for _ in range(ROUNDS):
+        round_timings = []
+        round_total = 0.0
+        while (len(round_timings) < max_samples // ROUNDS
+               and (round_total < min_time / ROUNDS or len(round_timings) < min_samples)):
+            arg = case.setup()
+            start = time.perf_counter()
+            case.run(arg)
+            elapsed = time.perf_counter() - start
+            round_timings.append(elapsed / case.inner)
+            round_total += elapsed
+        medians.append(percentile(sorted(round_timings), 50))
+        timings.extend(round_timings)
+        total += round_total
+
+    peaks = []
+    for _ in range(alloc_samples):
+        arg = case.setup()
+        tracemalloc.start()
+        case.run(arg)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        'samples': len(timings),
+        'ops_per_sec': round(len(timings) * case.inner / total, 1),
+        'p50_us': round(min(medians) * 1e6, 3),
+        'p95_us': round(percentile(timings, 95) * 1e6, 3),
+        'p99_us': round(percentile(timings, 99) * 1e6, 3),
+        'peak_kib': round(max(peaks) / 1024 / case.inner, 2)
+    }
+
+
+def compare(name, result, base, threshold):
+    # Returns the reasons a case regressed against its baseline
+    reasons = []
+    if result['p50_us'] > base['p50_us'] * (1 + threshold):
+        reasons.append(f"p50 {result['p50_us'] / base['p50_us'] - 1:+.0%}")
+    # Allocation peaks of a few KiB jitter with interpreter internals
+    if result['peak_kib'] > base['peak_kib'] * (1 + threshold) + 4:
+        reasons.append(f"peak {result['peak_kib'] / base['peak_kib'] - 1:+.0%}")
+    return reasons
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-k', dest='pattern', default='', help='only run cases whose name contains this')
+    parser.add_argument('--save', action='store_true', help='write the results as the new baseline')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=0.5, help='allowed slowdown before a case fails (0.5 = 50%%)')
+    parser.add_argument('--min-time', type=float, default=1.0, help='seconds of timed samples per case')
+    parser.add_argument('--min-samples', type=int, default=20)
+    parser.add_argument('--max-samples', type=int, default=20000)
+    parser.add_argument('--alloc-samples', type=int, default=5)
+    args = parser.parse_args()
+
+    baseline = {'results': {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+
+    results = {}
+    failures = []
+    print(f"{'case':<28}{'ops/sec':>12}{'p50 us':>11}{'p95 us':>11}{'p99 us':>11}{'peak KiB':>10}  vs baseline")
+    for case in build_cases():
+        if args.pattern not in case.name:
+            continue
+        result = measure(case, args.min_time, args.min_samples, args.max_samples, args.alloc_samples)
+        results[case.name] = result
+        base = baseline['results'].get(case.name)
+        if base is None:
+            status = 'new'
+        else:
+            reasons = compare(case.name, result, base, args.threshold)
+            status = f"{result['p50_us'] / base['p50_us'] - 1:+.0%}"
+            if reasons and not args.save:
+                failures.append(case.name)
+                status = 'REGRESSED ' + ', '.join(reasons)
+        print(f"{case.name:<28}{result['ops_per_sec']:>12,.1f}{result['p50_us']:>11,.1f}{result['p95_us']:>11,.1f}"
+              f"{result['p99_us']:>11,.1f}{result['peak_kib']:>10,.1f}  {status}")
+
+    if args.save:
+        baseline['results'].update(results)
+        baseline['machine'] = {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()}
+        with open(args.baseline, 'w') as fp:
+            json.dump(baseline, fp, indent=2, sort_keys=True)
+            fp.write('\n')
+        print(f'baseline saved to {os.path.relpath(args.baseline)}')
+        return 0
+
+    if failures:
+        print(f"{len(failures)} case(s) regressed more than {args.threshold:.0%}: {', '.join(failures)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
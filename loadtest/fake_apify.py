@@ -0,0 +1,450 @@
+"""Local stand-in for the Apify API, for load tests that burn no credits.
+
+    python loadtest/fake_apify.py --port 8099 --latency lognormal:40:0.5 \\
+        --comps-run-time lognormal:1500:0.6 --error-rate 0.02 --rate-limit 30
+
+    APIFY_BASE_URL=http://127.0.0.1:8099/v2 APIFY_API_TOKEN=fake python api/index.py
+
+Serves the endpoints api/apify.py calls, for both actors:
+
+  POST /v2/acts/<actor>/run-sync-get-dataset-items   property lookups
+  POST /v2/acts/<actor>/runs?waitForFinish=          comp searches, async jobs
+  GET  /v2/actor-runs/<id>?waitForFinish=
+  GET  /v2/datasets/<id>/items?format=jsonl&offset=&limit=
+
+from recorded items (loadtest/recordings, or real dataset exports given with
+--property-items / --comps-items). Subjects are matched by street address
+and comps by ZIP; anything unrecorded is answered with a recorded item
+rewritten to the requested address or ZIP, so every request finds data.
+Recorded sale dates are shifted so the newest sale is recent.
+
+Latency specs are milliseconds: "50", "uniform:20:200", "normal:100:30",
+"lognormal:MEDIAN:SIGMA" or "exp:MEAN". --latency delays every response;
+the run-time specs set how long an actor run takes before it SUCCEEDS (or
+FAILS, with --run-failure-rate). --error-rate answers that fraction of calls
+with a 500/502/503, and --rate-limit throttles to that many requests per
+second (bursts of --burst) with 429 and Retry-After, as Apify does.
+
+GET /_stats returns call, status and run counts; POST /_stats resets them.
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RECORDINGS = os.path.join(HERE, 'recordings')
+sys.path.insert(0, os.path.join(HERE, '..', 'api'))
+
+from addresses import normalize_address  # noqa: E402
+from apify import COMPS_ACTOR, PROPERTY_ACTOR  # noqa: E402
+
+# Finished runs are forgotten after this long so long tests stay bounded
+RUN_RETENTION_SECONDS = 900
+
+
+class Latency:
+    # A parsed latency spec; sample() returns seconds
+    KINDS = {'fixed': 1, 'uniform': 2, 'normal': 2, 'lognormal': 2, 'exp': 1}
+
+    def __init__(self, spec):
+        kind, _, rest = spec.partition(':') if ':' in spec else ('fixed', '', spec)
+        try:
+            params = [float(p) for p in rest.split(':')]
+        except ValueError:
+            raise ValueError(f'Invalid latency spec {spec!r}')
+        if kind not in self.KINDS or len(params) != self.KINDS[kind]:
+            raise ValueError(f'Invalid latency spec {spec!r}')
+        self.spec = spec
+        self.kind = kind
+        self.params = params
+
+    def sample(self):
+        p = self.params
+        if self.kind == 'fixed':
+            ms = p[0]
+        elif self.kind == 'uniform':
+            ms = random.uniform(p[0], p[1])
+        elif self.kind == 'normal':
+            ms = random.gauss(p[0], p[1])
+        elif self.kind == 'lognormal':
+            ms = p[0] * math.exp(random.gauss(0, p[1]))
+        else:
+            ms = random.expovariate(1 / p[0]) if p[0] > 0 else 0
+        return max(0.0, ms) / 1000
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = max(1.0, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        # Returns 0 when a token was taken, else seconds until the next one
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+
+def read_items(path):
+    # A dataset export: JSON array or JSON lines
+    with open(path) as fp:
+        text = fp.read()
+    if text.lstrip().startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def rebase_sale_dates(items, now_ms):
+    # Moves every epoch-ms dateSold by the same amount so the newest sale was
+    # yesterday and sold-window filters keep matching
+    dates = [item['dateSold'] for item in items if isinstance(item.get('dateSold'), (int, float))]
+    if not dates:
+        return
+    shift = now_ms - 86_400_000 - max(dates)
+    for item in items:
+        if isinstance(item.get('dateSold'), (int, float)):
+            item['dateSold'] += shift
+
+
+def _stable_index(key, n):
+    return int(hashlib.sha1(key.encode()).hexdigest()[:8], 16) % n
+
+
+def _street_key(address):
+    return normalize_address(str(address).split(',')[0])
+
+
+class Recordings:
+    def __init__(self, property_items, comp_items, not_found_rate=0.0):
+        self.properties = property_items
+        self.by_street = {_street_key(p.get('address', '')): p for p in property_items}
+        self.comps_by_zip = {}
+        for item in comp_items:
+            zipcode = str(item.get('zipcode') or (item.get('address') or {}).get('zipcode') or '')[:5]
+            self.comps_by_zip.setdefault(zipcode, []).append(item)
+        self.zips = sorted(self.comps_by_zip)
+        self.not_found_rate = not_found_rate
+
+    def property_items(self, actor_input):
+        address = actor_input.get('addresses') or ''
+        if isinstance(address, list):
+            address = address[0] if address else ''
+        address = str(address)
+        if not address or not self.properties or random.random() < self.not_found_rate:
+            return []
+        recorded = self.by_street.get(_street_key(address))
+        if recorded is not None:
+            return [recorded]
+        # An unrecorded address borrows a recorded house, keeping its own
+        # street and, when given, its own city/state/ZIP
+        item = dict(self.properties[_stable_index(address, len(self.properties))])
+        parts = [p.strip() for p in address.split(',')]
+        if len(parts) < 3 or not re.search(r'\d{5}', parts[-1]):
+            parts = [parts[0]] + [p.strip() for p in item['address'].split(',')[1:]]
+        item['address'] = ', '.join(parts)
+        item['zpid'] = 40_000_000 + _stable_index(normalize_address(address), 10_000_000)
+        return [item]
+
+    def comp_items(self, actor_input):
+        zipcode = str(actor_input.get('location', '')).strip()[:5]
+        limit = int(actor_input.get('maxItems') or 20)
+        items = self.comps_by_zip.get(zipcode)
+        if items is None and self.zips:
+            # Another ZIP's sales, moved to this one with their own zpids
+            borrowed = self.comps_by_zip[self.zips[_stable_index(zipcode, len(self.zips))]]
+            items = [dict(item, zipcode=zipcode, zpid=f"{zipcode}{item.get('zpid')}") for item in borrowed]
+        return (items or [])[:limit]
+
+
+class FakeApify:
+    def __init__(self, recordings, latency, property_run_time, comps_run_time,
+                 error_rate=0.0, run_failure_rate=0.0, rate_limit=None, burst=10):
+        self.recordings = recordings
+        self.latency = latency
+        self.run_times = {PROPERTY_ACTOR: property_run_time, COMPS_ACTOR: comps_run_time}
+        self.error_rate = error_rate
+        # Calls still to be failed before --error-rate applies, for tests that
+        # need an exact failure sequence
+        self.fail_next = 0
+        self.run_failure_rate = run_failure_rate
+        self.bucket = TokenBucket(rate_limit, burst) if rate_limit else None
+        self._lock = threading.Lock()
+        self.runs = {}
+        self.datasets = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._lock:
+            self.stats = {
+                'started_at': time.time(),
+                'requests': Counter(),
+                'statuses': Counter(),
+                'runs': Counter(),
+                'throttled': 0,
+                'injected_errors': 0,
+                'items_served': 0
+            }
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'uptime_seconds': round(time.time() - self.stats['started_at'], 1),
+                'requests': dict(self.stats['requests']),
+                'statuses': {str(k): v for k, v in self.stats['statuses'].items()},
+                'runs': dict(self.stats['runs']),
+                'active_runs': sum(1 for run in self.runs.values() if run['finishes_at'] > time.time()),
+                'throttled': self.stats['throttled'],
+                'injected_errors': self.stats['injected_errors'],
+                'items_served': self.stats['items_served']
+            }
+
+    def count(self, key, amount=1, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                self.stats[name][value] += amount
+            if key:
+                self.stats[key] += amount
+
+    def inject_failure(self):
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return True
+        return random.random() < self.error_rate
+
+    def actor_items(self, actor, actor_input):
+        if actor == PROPERTY_ACTOR:
+            return self.recordings.property_items(actor_input)
+        if actor == COMPS_ACTOR:
+            return self.recordings.comp_items(actor_input)
+        return None
+
+    def run_time(self, actor):
+        spec = self.run_times.get(actor)
+        return spec.sample() if spec else 0.0
+
+    def start_run(self, actor, items):
+        now = time.time()
+        run_id = uuid.uuid4().hex[:17]
+        dataset_id = uuid.uuid4().hex[:17]
+        failed = random.random() < self.run_failure_rate
+        run = {
+            'id': run_id,
+            'actId': actor,
+            'defaultDatasetId': dataset_id,
+            'startedAt': now,
+            'finishes_at': now + self.run_time(actor),
+            'final_status': 'FAILED' if failed else 'SUCCEEDED'
+        }
+        with self._lock:
+            self._prune(now)
+            self.runs[run_id] = run
+            self.datasets[dataset_id] = [] if failed else items
+            self.stats['runs']['started'] += 1
+            self.stats['runs'][run['final_status'].lower()] += 1
+        return run
+
+    def _prune(self, now):
+        expired = [k for k, run in self.runs.items() if now - run['finishes_at'] > RUN_RETENTION_SECONDS]
+        for run_id in expired:
+            self.datasets.pop(self.runs.pop(run_id)['defaultDatasetId'], None)
+
+    def run_data(self, run):
+        finished = time.time() >= run['finishes_at']
+        return {'data': {
+            'id': run['id'],
+            'actId': run['actId'],
+            'defaultDatasetId': run['defaultDatasetId'],
+            'status': run['final_status'] if finished else 'RUNNING'
+        }}
+
+    def wait_for(self, run, seconds):
+        remaining = run['finishes_at'] - time.time()
+        if remaining > 0 and seconds > 0:
+            time.sleep(min(remaining, seconds))
+
+
+def make_handler(fake):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, format, *args):
+            pass
+
+        def send_body(self, status, body, content_type='application/json', headers=None):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+            fake.count(None, statuses=status)
+
+        def send_error_body(self, status, error_type, message, headers=None):
+            self.send_body(status, {'error': {'type': error_type, 'message': message}}, headers=headers)
+
+        def read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b''
+            try:
+                return json.loads(raw) if raw else {}
+            except ValueError:
+                return None
+
+        def do_GET(self):
+            self.dispatch('GET')
+
+        def do_POST(self):
+            self.dispatch('POST')
+
+        def dispatch(self, method):
+            url = urlparse(self.path)
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            body = self.read_json() if method == 'POST' else None
+            path = url.path[len('/v2'):] if url.path.startswith('/v2/') else url.path
+
+            if path == '/_stats':
+                if method == 'POST':
+                    fake.reset_stats()
+                return self.send_body(200, fake.snapshot())
+
+            route = re.sub(r'/(acts|actor-runs|datasets)/[^/]+', r'/\1/:id', path)
+            fake.count(None, requests=f'{method} {route}')
+            time.sleep(fake.latency.sample())
+
+            if not query.get('token'):
+                return self.send_error_body(401, 'token-not-provided', 'Authentication token was not provided')
+            if fake.bucket is not None:
+                wait = fake.bucket.take()
+                if wait:
+                    fake.count('throttled')
+                    return self.send_error_body(429, 'rate-limit-exceeded', 'You have exceeded the rate limit',
+                                                headers={'Retry-After': str(max(1, math.ceil(wait)))})
+            if fake.inject_failure():
+                fake.count('injected_errors')
+                return self.send_error_body(random.choice((500, 502, 503)), 'internal-error', 'Injected failure')
+
+            parts = path.strip('/').split('/')
+            if method == 'POST' and len(parts) == 3 and parts[0] == 'acts':
+                return self.actor_call(parts[1], parts[2], query, body)
+            if method == 'GET' and len(parts) == 2 and parts[0] == 'actor-runs':
+                return self.get_run(parts[1], query)
+            if method == 'GET' and len(parts) == 3 and parts[0] == 'datasets' and parts[2] == 'items':
+                return self.dataset_items(parts[1], query)
+            return self.send_error_body(404, 'page-not-found', f'No route for {method} {path}')
+
+        def actor_call(self, actor, action, query, body):
+            if body is None:
+                return self.send_error_body(400, 'invalid-input', 'Input is not valid JSON')
+            items = fake.actor_items(actor, body)
+            if items is None:
+                return self.send_error_body(404, 'record-not-found', f'Actor {actor} was not found')
+            if action == 'run-sync-get-dataset-items':
+                run = fake.start_run(actor, items)
+                fake.wait_for(run, float('inf'))
+                if run['final_status'] != 'SUCCEEDED':
+                    return self.send_error_body(400, 'run-failed', f"Actor run {run['id']} failed")
+                fake.count('items_served', len(items))
+                return self.send_body(201, items)
+            if action == 'runs':
+                run = fake.start_run(actor, items)
+                fake.wait_for(run, float(query.get('waitForFinish') or 0))
+                return self.send_body(201, fake.run_data(run))
+            return self.send_error_body(404, 'page-not-found', f'Unknown actor action {action}')
+
+        def get_run(self, run_id, query):
+            run = fake.runs.get(run_id)
+            if run is None:
+                return self.send_error_body(404, 'record-not-found', f'Actor run {run_id} was not found')
+            fake.wait_for(run, float(query.get('waitForFinish') or 0))
+            return self.send_body(200, fake.run_data(run))
+
+        def dataset_items(self, dataset_id, query):
+            items = fake.datasets.get(dataset_id)
+            if items is None:
+                return self.send_error_body(404, 'record-not-found', f'Dataset {dataset_id} was not found')
+            offset = int(query.get('offset') or 0)
+            limit = int(query['limit']) if query.get('limit') else None
+            page = items[offset:] if limit is None else items[offset:offset + limit]
+            fake.count('items_served', len(page))
+            headers = {'X-Apify-Pagination-Offset': str(offset), 'X-Apify-Pagination-Total': str(len(items))}
+            if query.get('format') == 'jsonl':
+                body = ''.join(json.dumps(item) + '\n' for item in page).encode()
+                return self.send_body(200, body, 'application/jsonl', headers)
+            return self.send_body(200, page, headers=headers)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Apify API')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--property-items', default=os.path.join(RECORDINGS, 'property_info.jsonl'),
+                        help='recorded property-info actor items (JSON or JSONL export)')
+    parser.add_argument('--comps-items', default=os.path.join(RECORDINGS, 'sold_comps.jsonl'),
+                        help='recorded sold-comps actor items (JSON or JSONL export)')
+    parser.add_argument('--keep-dates', action='store_true', help='serve recorded sale dates unshifted')
+    parser.add_argument('--latency', type=Latency, default=Latency('20'), help='delay before every response (ms spec)')
+    parser.add_argument('--property-run-time', type=Latency, default=Latency('lognormal:800:0.4'),
+                        help='property lookup run duration (ms spec)')
+    parser.add_argument('--comps-run-time', type=Latency, default=Latency('lognormal:1500:0.5'),
+                        help='comp search run duration (ms spec)')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of calls answered with a 5xx')
+    parser.add_argument('--run-failure-rate', type=float, default=0.0, help='fraction of actor runs that end FAILED')
+    parser.add_argument('--not-found-rate', type=float, default=0.0, help='fraction of property lookups finding nothing')
+    parser.add_argument('--rate-limit', type=float, default=None, help='requests per second before 429s (default: unlimited)')
+    parser.add_argument('--burst', type=float, default=10, help='requests allowed at once under --rate-limit')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+    comp_items = read_items(args.comps_items)
+    if not args.keep_dates:
+        rebase_sale_dates(comp_items, int(time.time() * 1000))
+    recordings = Recordings(read_items(args.property_items), comp_items, args.not_found_rate)
+    fake = FakeApify(
+        recordings, args.latency, args.property_run_time, args.comps_run_time,
+        error_rate=args.error_rate, run_failure_rate=args.run_failure_rate,
+        rate_limit=args.rate_limit, burst=args.burst
+    )
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(fake))
+    server.daemon_threads = True
+    print(f'fake Apify on http://{args.host}:{server.server_port}/v2 '
+          f'({len(recordings.properties)} properties, {sum(len(v) for v in recordings.comps_by_zip.values())} comps '
+          f'in {len(recordings.zips)} ZIPs)', flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""Open-loop load generator for the lookup, analyze and report endpoints.
+
+    python loadtest/loadgen.py --url http://127.0.0.1:5000 --rps 20 --duration 60 \\
+        --mix lookup=3,analyze=5,pdf=1,excel=1 --fresh 0.3 --fake-apify http://127.0.0.1:8099
+
+Requests are sent on a fixed schedule at --rps (--poisson for random
+arrivals) from --concurrency worker threads, whether or not earlier ones have
+answered. Latency is measured from each request's scheduled send time, so
+time spent queued behind a saturated server or generator counts against it.
+Request bodies come from benchmarks/fixtures/properties.json; --fresh is the
+fraction of lookups and analyses sent with an unseen address, size and year
+so they miss every cache and reach Apify. Report requests fetch a stored
+analysis by the analysis_id of an earlier analyze response.
+
+The summary has throughput, latency percentiles and a status/error breakdown
+per endpoint, plus where the analyses' comps came from. A rising share of
+"demo (degraded)" comps is Apify failing behind a 200. The app's
+/api/health Apify counters and, with --fake-apify, the stand-in's own call
+counts are printed after the run. --json writes everything to a file, and
+--max-error-rate makes the run exit 1 when exceeded.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROPERTIES = os.path.join(HERE, '..', 'benchmarks', 'fixtures', 'properties.json')
+OPERATIONS = ('lookup', 'analyze', 'pdf', 'excel')
+
+_local = threading.local()
+
+
+def session():
+    # One keep-alive session per worker thread
+    if not hasattr(_local, 'session'):
+        import requests
+        from requests.adapters import HTTPAdapter
+        _local.session = requests.Session()
+        _local.session.mount('http://', HTTPAdapter(pool_maxsize=1))
+        _local.session.mount('https://', HTTPAdapter(pool_maxsize=1))
+    return _local.session
+
+
+def parse_mix(text):
+    weights = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f'Unknown operation {name!r} (expected one of {", ".join(OPERATIONS)})')
+        weights[name] = float(weight or 1)
+    if not any(weights.values()):
+        raise argparse.ArgumentTypeError('The mix needs at least one operation with a positive weight')
+    return weights
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))]
+
+
+class Workload:
+    # Builds request bodies; fresh ones never repeat an address or comp search
+    def __init__(self, properties, fresh, compact):
+        self.properties = properties
+        self.fresh = fresh
+        self.compact = compact
+        self.analysis_ids = []
+        self._lock = threading.Lock()
+        self._serial = 0
+
+    def subject(self):
+        prop = dict(random.choice(self.properties))
+        prop.pop('arv', None)
+        if random.random() < self.fresh:
+            with self._lock:
+                self._serial += 1
+                serial = self._serial
+            street = prop['address'].split(' ', 1)[1]
+            prop['address'] = f"{10000 + serial} {street}"
+            # A new size band and year band make a comp search key no cache holds
+            prop['currentSqft'] = 400 + 100 * (serial % 60) + random.randrange(0, 40)
+            prop['yearBuilt'] = 1900 + 5 * (serial % 25)
+        return prop
+
+    def remember(self, analysis_id):
+        with self._lock:
+            self.analysis_ids.append(analysis_id)
+            if len(self.analysis_ids) > 1000:
+                del self.analysis_ids[:500]
+
+    def stored_id(self):
+        with self._lock:
+            return random.choice(self.analysis_ids) if self.analysis_ids else None
+
+    def request(self, operation):
+        # (method, path, json body) for one operation
+        if operation == 'lookup':
+            prop = self.subject()
+            return 'POST', '/api/lookup-property', {'address': f"{prop['address']} {prop['zipcode']}"}
+        if operation == 'analyze':
+            body = self.subject()
+            if self.compact:
+                body['compact'] = True
+            return 'POST', '/api/analyze', body
+        analysis_id = self.stored_id()
+        if analysis_id is None:
+            return None
+        return 'GET', f'/api/report/{operation}/{analysis_id}', None
+
+
+class Results:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.service_times = defaultdict(list)
+        self.outcomes = defaultdict(Counter)
+        self.comp_sources = Counter()
+        self.bytes = Counter()
+        self.max_lag = 0.0
+
+    def record(self, operation, outcome, latency, service_time, size=0, comp_source=None):
+        with self._lock:
+            self.latencies[operation].append(latency)
+            self.service_times[operation].append(service_time)
+            self.outcomes[operation][outcome] += 1
+            self.bytes[operation] += size
+            if comp_source:
+                self.comp_sources[comp_source] += 1
+
+    def lag(self, seconds):
+        with self._lock:
+            self.max_lag = max(self.max_lag, seconds)
+
+
+def comp_source_label(body):
+    comps = body.get('comps') if isinstance(body, dict) else None
+    if not isinstance(comps, dict):
+        return None
+    source = comps.get('source', 'unknown')
+    return f'{source} (degraded)' if comps.get('degraded') else source
+
+
+def fire(base_url, workload, results, operation, scheduled, timeout):
+    request = workload.request(operation)
+    if request is None:
+        results.record(operation, 'no analysis_id yet', 0.0, 0.0)
+        return
+    method, path, body = request
+    started = time.perf_counter()
+    results.lag(started - scheduled)
+    import requests
+    try:
+        response = session().request(method, base_url + path, json=body, timeout=timeout)
+        content = response.content
+    except requests.Timeout:
+        outcome, content, response = 'timeout', b'', None
+    except requests.ConnectionError:
+        outcome, content, response = 'connection error', b'', None
+    except requests.RequestException as e:
+        outcome, content, response = type(e).__name__, b'', None
+    finished = time.perf_counter()
+
+    comp_source = None
+    if response is not None:
+        outcome = str(response.status_code)
+        if operation in ('analyze', 'lookup') and response.headers.get('Content-Type', '').startswith('application/json'):
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = None
+            if operation == 'analyze' and response.ok and isinstance(payload, dict):
+                comp_source = comp_source_label(payload)
+                if payload.get('analysis_id'):
+                    workload.remember(payload['analysis_id'])
+            elif response.status_code == 503 and isinstance(payload, dict) and payload.get('degraded'):
+                outcome = '503 degraded'
+    results.record(operation, outcome, finished - scheduled, finished - started, len(content), comp_source)
+
+
+def seed_analysis(base_url, workload, timeout):
+    # Report requests need one stored analysis before the clock starts
+    method, path, body = workload.request('analyze')
+    response = session().request(method, base_url + path, json=body, timeout=timeout)
+    response.raise_for_status()
+    workload.remember(response.json()['analysis_id'])
+
+
+def run(args, workload, results):
+    operations = [op for op in args.mix if args.mix[op] > 0]
+    weights = [args.mix[op] for op in operations]
+    executor = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix='loadgen')
+    start = time.perf_counter()
+    deadline = start + args.duration
+    next_send = start
+    sent = 0
+    try:
+        while next_send < deadline:
+            delay = next_send - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            operation = random.choices(operations, weights)[0]
+            executor.submit(fire, args.url, workload, results, operation, next_send, args.timeout)
+            sent += 1
+            next_send += random.expovariate(args.rps) if args.poisson else 1 / args.rps
+    except KeyboardInterrupt:
+        deadline = time.perf_counter()
+    executor.shutdown(wait=True)
+    return sent, deadline - start, time.perf_counter() - start
+
+
+def fetch_json(url, timeout=10):
+    try:
+        response = session().get(url, timeout=timeout)
+        return response.json() if response.ok else None
+    except Exception:
+        return None
+
+
+def summarize(args, results, sent, send_seconds, total_seconds):
+    ok_statuses = {'200', '201', '304'}
+    summary = {
+        'target_rps': args.rps,
+        'sent': sent,
+        'send_seconds': round(send_seconds, 2),
+        'wall_seconds': round(total_seconds, 2),
+        'max_schedule_lag_ms': round(results.max_lag * 1000, 1),
+        'operations': {},
+        'comp_sources': dict(results.comp_sources)
+    }
+    completed = errors = 0
+    for operation in OPERATIONS:
+        latencies = sorted(results.latencies.get(operation, []))
+        if not latencies:
+            continue
+        service = sorted(results.service_times[operation])
+        outcomes = results.outcomes[operation]
+        failed = sum(count for outcome, count in outcomes.items() if outcome not in ok_statuses)
+        completed += len(latencies)
+        errors += failed
+        summary['operations'][operation] = {
+            'requests': len(latencies),
+            'throughput_rps': round(len(latencies) / total_seconds, 2),
+            'error_rate': round(failed / len(latencies), 4),
+            'latency_ms': {f'p{p}': round(percentile(latencies, p) * 1000, 1) for p in (50, 90, 95, 99)},
+            'max_ms': round(latencies[-1] * 1000, 1),
+            'service_p50_ms': round(percentile(service, 50) * 1000, 1),
+            'avg_kib': round(results.bytes[operation] / len(latencies) / 1024, 1),
+            'outcomes': dict(outcomes)
+        }
+    summary['completed'] = completed
+    summary['throughput_rps'] = round(completed / total_seconds, 2) if total_seconds else 0
+    summary['error_rate'] = round(errors / completed, 4) if completed else 0
+    return summary
+
+
+def print_summary(summary, health, fake_stats):
+    print(f"sent {summary['sent']} requests in {summary['send_seconds']}s (target {summary['target_rps']} rps), "
+          f"completed {summary['completed']} in {summary['wall_seconds']}s = {summary['throughput_rps']} rps, "
+          f"errors {summary['error_rate']:.1%}, max schedule lag {summary['max_schedule_lag_ms']} ms")
+    print(f"\n{'endpoint':<10}{'reqs':>7}{'rps':>8}{'p50 ms':>10}{'p90 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'err':>8}  outcomes")
+    for operation, s in summary['operations'].items():
+        lat = s['latency_ms']
+        outcomes = ', '.join(f'{k}: {v}' for k, v in sorted(s['outcomes'].items(), key=lambda kv: -kv[1]))
+        print(f"{operation:<10}{s['requests']:>7}{s['throughput_rps']:>8.1f}{lat['p50']:>10,.1f}{lat['p90']:>10,.1f}"
+              f"{lat['p95']:>10,.1f}{lat['p99']:>10,.1f}{s['max_ms']:>10,.1f}{s['error_rate']:>8.1%}  {outcomes}")
+
+    if summary['comp_sources']:
+        total = sum(summary['comp_sources'].values())
+        print('\nanalysis comp sources: ' + ', '.join(
+            f'{source} {count} ({count / total:.0%})' for source, count in sorted(summary['comp_sources'].items(), key=lambda kv: -kv[1])))
+
+    apify = (health or {}).get('apify')
+    if apify:
+        print(f"\napp Apify client: circuit {apify['circuit']['state']} "
+              f"(opened {apify['circuit']['times_opened']}x)")
+        for operation, call in sorted(apify['calls'].items()):
+            print(f"  {operation:<14} calls {call['calls']:>6}  errors {call['errors']:>5}  retries {call['retries']:>5}  "
+                  f"avg {call['avg_ms']:>8.1f} ms  max {call['max_ms']:>8.1f} ms")
+    if fake_stats:
+        print(f"\nfake Apify: {sum(fake_stats['requests'].values())} calls, statuses {fake_stats['statuses']}, "
+              f"runs {fake_stats['runs']}, throttled {fake_stats['throttled']}, injected errors {fake_stats['injected_errors']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help='base URL of the app')
+    parser.add_argument('--rps', type=float, default=10, help='target requests per second')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to send for')
+    parser.add_argument('--concurrency', type=int, default=64, help='requests in flight at most')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('lookup=3,analyze=5,pdf=1,excel=1'),
+                        help='operation weights, e.g. lookup=3,analyze=5,pdf=1,excel=1')
+    parser.add_argument('--fresh', type=float, default=0.2, help='fraction of lookups/analyses that miss every cache')
+    parser.add_argument('--compact', action='store_true', help='request compact analyses')
+    parser.add_argument('--poisson', action='store_true', help='exponential inter-arrival times instead of a fixed rate')
+    parser.add_argument('--timeout', type=float, default=120, help='per-request timeout in seconds')
+    parser.add_argument('--fake-apify', help='fake Apify base URL whose /_stats to reset and report')
+    parser.add_argument('--json', dest='json_path', help='write the summary to this file')
+    parser.add_argument('--max-error-rate', type=float, default=None, help='exit 1 above this overall error rate')
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if args.rps <= 0 or args.duration <= 0:
+        parser.error('--rps and --duration must be positive')
+    if args.seed is not None:
+        random.seed(args.seed)
+    args.url = args.url.rstrip('/')
+    fake_stats_url = args.fake_apify.rstrip('/').removesuffix('/v2') + '/_stats' if args.fake_apify else None
+
+    with open(PROPERTIES) as fp:
+        workload = Workload(json.load(fp), args.fresh, args.compact)
+    if args.mix.get('pdf') or args.mix.get('excel'):
+        try:
+            seed_analysis(args.url, workload, args.timeout)
+        except Exception as e:
+            print(f'could not store a seed analysis for report requests: {e}', file=sys.stderr)
+    if fake_stats_url:
+        try:
+            session().post(fake_stats_url, timeout=10)
+        except Exception as e:
+            print(f'could not reset fake Apify stats: {e}', file=sys.stderr)
+
+    results = Results()
+    sent, send_seconds, total_seconds = run(args, workload, results)
+    summary = summarize(args, results, sent, send_seconds, total_seconds)
+    health = fetch_json(args.url + '/api/health')
+    fake_stats = fetch_json(fake_stats_url) if fake_stats_url else None
+    print_summary(summary, health, fake_stats)
+
+    if args.json_path:
+        with open(args.json_path, 'w') as fp:
+            json.dump({'summary': summary, 'health': health, 'fake_apify': fake_stats}, fp, indent=2)
+            fp.write('\n')
+    if args.max_error_rate is not None and summary['error_rate'] > args.max_error_rate:
+        print(f"error rate {summary['error_rate']:.1%} is above {args.max_error_rate:.1%}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""Regenerates the recorded actor responses served by loadtest/fake_apify.py.
+
+    python loadtest/recordings/make_recordings.py
+
+Items are written in the shape the two actors return them, one per line, as
+a dataset export would be (both files can be swapped for real exports):
+
+  property_info.jsonl   aknahin~zillow-property-info-scraper items, one per
+                        subject in benchmarks/fixtures/properties.json
+  sold_comps.jsonl      igolaizola~zillow-scraper-ppe sold listings for the
+                        fixture ZIPs
+
+The output is seeded and checked in; only rerun this when it should change.
+"""
+import json
+import os
+import random
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROPERTIES = os.path.join(HERE, '..', '..', 'benchmarks', 'fixtures', 'properties.json')
+SEED = 20240715
+CENTER = (33.749, -84.388)
+ZIPCODES = [f'30{n:03d}' for n in range(301, 361)]
+COMPS_PER_ZIP = 15
+# Sale dates are spread over the six months before this (epoch ms, as Zillow
+# reports them)
+SOLD_BEFORE_MS = 1_735_689_600_000
+
+
+def write_lines(path, items):
+    with open(path, 'w') as fp:
+        for item in items:
+            fp.write(json.dumps(item, sort_keys=True) + '\n')
+
+
+def main():
+    rng = random.Random(SEED)
+    with open(PROPERTIES) as fp:
+        subjects = json.load(fp)
+
+    properties = []
+    for i, subject in enumerate(subjects):
+        properties.append({
+            'zpid': 20_000_000 + i,
+            'address': f"{subject['address']} {subject['zipcode']}",
+            'beds': subject['beds'],
+            'baths': subject['baths'],
+            'area': subject['currentSqft'],
+            'yearBuilt': subject['yearBuilt'],
+            'lotSize': round(rng.uniform(0.1, 0.6), 2),
+            'latLong': {'latitude': subject['latitude'], 'longitude': subject['longitude']},
+            'zestimate': round(subject['arv'] * rng.uniform(0.85, 1.1), -3),
+            'statusText': rng.choice(['Off market', 'For sale', 'Sold']),
+            'imgSrc': f'https://photos.example.com/{20_000_000 + i}.jpg',
+            'homeType': 'SINGLE_FAMILY'
+        })
+
+    comps = []
+    for zipcode in ZIPCODES:
+        for _ in range(COMPS_PER_ZIP):
+            sqft = rng.randrange(700, 3800, 10)
+            comps.append({
+                'zpid': 30_000_000 + len(comps),
+                'streetAddress': f'{rng.randrange(100, 9900)} {rng.choice(["Maple", "Cedar", "Hill", "Lake"])} Dr',
+                'city': 'Atlanta',
+                'state': 'GA',
+                'zipcode': zipcode,
+                'price': round(sqft * rng.uniform(70, 230), -3),
+                'bedrooms': rng.randrange(1, 6),
+                'bathrooms': rng.choice([1, 1.5, 2, 2.5, 3]),
+                'livingArea': sqft,
+                'yearBuilt': rng.randrange(1925, 2020),
+                'homeType': 'SINGLE_FAMILY',
+                'homeStatus': 'RECENTLY_SOLD',
+                'dateSold': SOLD_BEFORE_MS - rng.randrange(0, 180) * 86_400_000,
+                'latitude': round(CENTER[0] + rng.uniform(-0.3, 0.3), 6),
+                'longitude': round(CENTER[1] + rng.uniform(-0.3, 0.3), 6)
+            })
+
+    write_lines(os.path.join(HERE, 'property_info.jsonl'), properties)
+    write_lines(os.path.join(HERE, 'sold_comps.jsonl'), comps)
+
+
+if __name__ == '__main__':
+    main()
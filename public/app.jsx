@@ -78,38 +78,124 @@ function RealEstateAnalyzer() {
     setPropertyData({ ...propertyData, [e.target.name]: e.target.value });
   };
 
+  const rankScenarios = (partial) =>
+    [...partial.flip_scenarios, ...partial.rental_scenarios].sort((a, b) => b.roi - a.roi);
+
+  // Folds one /api/analyze/stream event into the partial results
+  const applyEvent = (partial, event, data) => {
+    switch (event) {
+      case 'property':
+        return { ...data, comps: { total_found: 0, properties: [], pending: true }, flip_scenarios: [], rental_scenarios: [], scenarios: [] };
+      case 'rental': {
+        const next = { ...partial, rental_scenarios: data.rental_scenarios, best_rental: data.best_rental };
+        return { ...next, scenarios: rankScenarios(next) };
+      }
+      case 'comp':
+        return { ...partial, comps: { ...partial.comps, total_found: partial.comps.total_found + 1, properties: [...partial.comps.properties, data] } };
+      case 'comps':
+        return { ...partial, comps: data };
+      case 'flip': {
+        const next = { ...partial, flip_scenarios: data.flip_scenarios, best_flip: data.best_flip, best_scenario: data.best_scenario };
+        return { ...next, scenarios: rankScenarios(next) };
+      }
+      case 'analysis':
+        return data;
+      case 'error':
+        throw new Error(data.error || 'Analysis failed');
+      default:
+        return partial;
+    }
+  };
+
+  // Reads Server-Sent Events off a fetch response body
+  const readEvents = async (response, onEvent) => {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+      let end;
+      while ((end = buffer.indexOf('\n\n')) >= 0) {
+        const frame = buffer.slice(0, end);
+        buffer = buffer.slice(end + 2);
+        let event = 'message';
+        let data = '';
+        frame.split('\n').forEach(line => {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        });
+        if (data) onEvent(event, JSON.parse(data));
+      }
+    }
+  };
+
+  const analyzeOnce = async () => {
+    const response = await fetch('/api/analyze', {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(propertyData)
+    });
+    
+    const data = await response.json();
+    
+    if (response.ok) {
+      setResults(data);
+    } else {
+      setError(data.error || 'Analysis failed');
+    }
+  };
+
+  // Rental numbers render as soon as the request lands, comps as they are
+  // parsed, and flips once the ARV is known
   const analyzeProperty = async () => {
     setLoading(true);
     setError(null);
     
     try {
-      const response = await fetch('/api/analyze', {
+      const response = await fetch('/api/analyze/stream', {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(propertyData)
       });
       
-      const data = await response.json();
-      
-      if (response.ok) {
-        setResults(data);
-      } else {
+      if (response.status === 404 || response.status === 405 || !response.body) {
+        await analyzeOnce();
+      } else if (!response.ok) {
+        const data = await response.json();
         setError(data.error || 'Analysis failed');
+      } else {
+        let partial = null;
+        await readEvents(response, (event, data) => {
+          partial = applyEvent(partial, event, data);
+          setResults(partial);
+        });
       }
     } catch (err) {
-      setError('Cannot connect to API');
+      setError(err.message && err.message !== 'Failed to fetch' ? err.message : 'Cannot connect to API');
     } finally {
       setLoading(false);
     }
   };
 
+  // Reports are fetched by analysis id; the full analysis is only posted
+  // back when the server no longer has it stored
+  const fetchReport = async (kind) => {
+    if (results.analysis_id) {
+      const response = await fetch(`/api/report/${kind}/${results.analysis_id}`);
+      if (response.status !== 404) return response;
+    }
+    return fetch(`/api/report/${kind}`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(results)
+    });
+  };
+
   const downloadPDF = async () => {
     try {
-      const response = await fetch('/api/report/pdf', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(results)
-      });
+      const response = await fetchReport('pdf');
       const blob = await response.blob();
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
@@ -123,11 +209,7 @@ function RealEstateAnalyzer() {
 
   const downloadExcel = async () => {
     try {
-      const response = await fetch('/api/report/excel', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(results)
-      });
+      const response = await fetchReport('excel');
       const blob = await response.blob();
       const url = window.URL.createObjectURL(blob);
       const a = document.createElement('a');
@@ -245,11 +327,11 @@ function RealEstateAnalyzer() {
               </div>
               <div>
                 <div style={{ fontSize: '13px', color: '#6b7280' }}>Avg Price/SqFt</div>
-                <div style={{ fontSize: '26px', fontWeight: '700', color: '#1f2937' }}>${results.comps.average_price_per_sqft}</div>
+                <div style={{ fontSize: '26px', fontWeight: '700', color: '#1f2937' }}>{results.comps.pending ? 'Searching...' : `$${results.comps.average_price_per_sqft}`}</div>
               </div>
               <div>
                 <div style={{ fontSize: '13px', color: '#6b7280' }}>Comp-Based ARV</div>
-                <div style={{ fontSize: '26px', fontWeight: '700', color: '#1f2937' }}>{formatCurrency(results.comps.estimated_value)}</div>
+                <div style={{ fontSize: '26px', fontWeight: '700', color: '#1f2937' }}>{results.comps.pending ? 'Searching...' : formatCurrency(results.comps.estimated_value)}</div>
               </div>
               <div>
                 <div style={{ fontSize: '13px', color: '#6b7280' }}>Zestimate</div>
@@ -483,7 +565,8 @@ function RealEstateAnalyzer() {
             ))}
           </div>
 
-          {/* Download Buttons */}
+          {/* Download Buttons, once the analysis is complete and stored */}
+          {results.analysis_id && (
           <div style={{ display: 'flex', gap: '15px', flexWrap: 'wrap' }}>
             <button onClick={downloadPDF} style={{ flex: '1', minWidth: '200px', padding: '15px', background: '#dc2626', color: 'white', border: 'none', borderRadius: '8px', fontSize: '16px', fontWeight: '600', cursor: 'pointer' }}>
               Download PDF Report
@@ -492,6 +575,7 @@ function RealEstateAnalyzer() {
               Download Excel Report
             </button>
           </div>
+          )}
         </>
       )}
     </div>
@@ -0,0 +1,15 @@
+import os
+import sys
+import tempfile
+
+# The api modules read their configuration at import time: point every cache
+# at a throwaway directory and run without an Apify token unless a test says
+# otherwise
+os.environ['CACHE_DIR'] = tempfile.mkdtemp(prefix='realestatetool-tests-')
+os.environ['APIFY_API_TOKEN'] = ''
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+API_DIR = os.path.join(ROOT, 'api')
+sys.path.insert(0, API_DIR)
+# benchmarks/ for fixtures.*, the seeded inputs the benchmarks also use
+sys.path.append(os.path.join(ROOT, 'benchmarks'))
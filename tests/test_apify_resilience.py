@@ -0,0 +1,156 @@
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, os.path.join(ROOT, 'loadtest'))
+
+import apify  # noqa: E402
+import index  # noqa: E402
+from apify import COMPS_ACTOR, ApifyError, ApifyUnavailable, CircuitBreaker  # noqa: E402
+from fake_apify import RECORDINGS, FakeApify, Latency, Recordings, make_handler, read_items  # noqa: E402
+
+MAX_RETRIES = 2
+BACKOFF_MAX = 0.05
+COMP_INPUT = {'location': '30344', 'maxItems': 5}
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    recordings = Recordings(
+        read_items(os.path.join(RECORDINGS, 'property_info.jsonl')),
+        read_items(os.path.join(RECORDINGS, 'sold_comps.jsonl'))
+    )
+    fake = FakeApify(recordings, Latency('0'), Latency('0'), Latency('0'))
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(fake))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(apify, 'APIFY_BASE_URL', f'http://127.0.0.1:{server.server_port}/v2')
+    monkeypatch.setattr(apify, 'APIFY_MAX_RETRIES', MAX_RETRIES)
+    monkeypatch.setattr(apify, 'APIFY_BACKOFF_BASE', 0.01)
+    monkeypatch.setattr(apify, 'APIFY_BACKOFF_MAX', BACKOFF_MAX)
+    monkeypatch.setattr(apify, 'breaker', CircuitBreaker(threshold=3, reset_timeout=60))
+    monkeypatch.setattr(apify, '_metrics', {})
+    yield fake
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def backoffs(monkeypatch):
+    # Every delay apify_request sleeps before a retry
+    delays = []
+    real_backoff = apify._backoff
+
+    def recording_backoff(attempt, response):
+        delay = real_backoff(attempt, response)
+        delays.append((attempt, response.status_code if response is not None else None, delay))
+        return delay
+    monkeypatch.setattr(apify, '_backoff', recording_backoff)
+    return delays
+
+
+def requests_served(fake):
+    return sum(fake.snapshot()['requests'].values())
+
+
+def test_5xx_is_retried_with_jittered_backoff(fake, backoffs):
+    fake.fail_next = MAX_RETRIES
+    items = apify.run_actor_sync(COMPS_ACTOR, COMP_INPUT, 'fake')
+
+    assert len(items) == 5
+    assert requests_served(fake) == MAX_RETRIES + 1
+    assert apify.apify_stats()['calls']['run_sync']['retries'] == MAX_RETRIES
+    assert [attempt for attempt, _, _ in backoffs] == list(range(MAX_RETRIES))
+    for attempt, status, delay in backoffs:
+        assert status in (500, 502, 503)
+        assert 0 <= delay <= min(BACKOFF_MAX, 0.01 * 2 ** attempt)
+    assert apify.breaker.stats()['consecutive_failures'] == 0
+
+
+def test_5xx_gives_up_after_max_retries(fake, backoffs):
+    fake.error_rate = 1.0
+    with pytest.raises(ApifyError):
+        apify.run_actor_sync(COMPS_ACTOR, COMP_INPUT, 'fake')
+
+    assert requests_served(fake) == MAX_RETRIES + 1
+    calls = apify.apify_stats()['calls']['run_sync']
+    assert (calls['retries'], calls['errors']) == (MAX_RETRIES, 1)
+    assert apify.breaker.stats()['consecutive_failures'] == 1
+
+
+def test_429_waits_for_retry_after(fake, backoffs, monkeypatch):
+    # One request per 50 ms: the second call is throttled once and its retry
+    # waits out the Retry-After (capped at APIFY_BACKOFF_MAX)
+    from fake_apify import TokenBucket
+    monkeypatch.setattr(fake, 'bucket', TokenBucket(rate=1 / BACKOFF_MAX, burst=1))
+    apify.run_actor_sync(COMPS_ACTOR, COMP_INPUT, 'fake')
+    apify.run_actor_sync(COMPS_ACTOR, COMP_INPUT, 'fake')
+
+    assert fake.snapshot()['throttled'] >= 1
+    assert backoffs and all(status == 429 and delay >= BACKOFF_MAX for _, status, delay in backoffs)
+    assert apify.apify_stats()['calls']['run_sync']['errors'] == 0
+
+
+def test_timeout_is_not_retried(fake, backoffs):
+    fake.latency = Latency('500')
+    with pytest.raises(ApifyError):
+        apify.run_actor_sync(COMPS_ACTOR, COMP_INPUT, 'fake', timeout=0.1)
+
+    assert requests_served(fake) == 1
+    assert backoffs == []
+    assert apify.breaker.stats()['consecutive_failures'] == 1
+
+
+def test_breaker_opens_fails_fast_and_recovers(fake, backoffs, monkeypatch):
+    monkeypatch.setattr(apify, 'breaker', CircuitBreaker(threshold=2, reset_timeout=0.2))
+    fake.error_rate = 1.0
+    for _ in range(2):
+        with pytest.raises(ApifyError):
+            apify.run_actor_sync(COMPS_ACTOR, COMP_INPUT, 'fake')
+    assert apify.breaker.state == 'open'
+    assert not apify.apify_available()
+
+    served = requests_served(fake)
+    with pytest.raises(ApifyUnavailable):
+        apify.run_actor_sync(COMPS_ACTOR, COMP_INPUT, 'fake')
+    assert requests_served(fake) == served
+
+    # After reset_timeout one probe goes through and closes the circuit
+    fake.error_rate = 0.0
+    time.sleep(0.25)
+    assert apify.breaker.state == 'half_open'
+    apify.run_actor_sync(COMPS_ACTOR, COMP_INPUT, 'fake')
+    assert apify.breaker.stats() | {'open_for_seconds': 0} == {
+        'state': 'closed', 'consecutive_failures': 0, 'times_opened': 1, 'open_for_seconds': 0
+    }
+
+
+def test_comps_fall_back_to_degraded_demo_comps(fake, backoffs, monkeypatch):
+    monkeypatch.setattr(index, 'APIFY_TOKEN', 'fake')
+    monkeypatch.setattr(apify, 'breaker', CircuitBreaker(threshold=1, reset_timeout=60))
+    fake.error_rate = 1.0
+
+    comps, source = index.fetch_comps('30399', 3, 2, 1500, 1995)
+    assert source == {'source': 'demo', 'degraded': True}
+    assert comps == index.get_demo_comps('30399', 1500)
+    assert requests_served(fake) == MAX_RETRIES + 1
+
+    # With the circuit open the next search is degraded without a request
+    comps, source = index.fetch_comps('30398', 3, 2, 1500, 1995)
+    assert source == {'source': 'demo', 'degraded': True}
+    assert requests_served(fake) == MAX_RETRIES + 1
+
+
+def test_comps_come_from_apify_when_healthy(fake, monkeypatch):
+    monkeypatch.setattr(index, 'APIFY_TOKEN', 'fake')
+    comps, source = index.fetch_comps('30397', 3, 2, 1500, 1995)
+    assert source == {'source': 'apify', 'cache_age_seconds': 0}
+    assert comps and all(comp['address']['zipcode'] == '30397' for comp in comps)
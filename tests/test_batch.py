@@ -0,0 +1,46 @@
+import json
+
+import index
+from batch import group_by_key, iter_group_results
+
+PROPERTY = {
+    'address': '123 Main St, Atlanta, GA 30344', 'zipcode': '30344', 'purchasePrice': 150000,
+    'currentSqft': 1500, 'beds': 3, 'baths': 2, 'yearBuilt': 1995
+}
+
+
+def test_a_failing_group_yields_error_rows_for_its_members():
+    groups = group_by_key(enumerate(['ok', 'bad', 'ok', 'bad']), lambda item: item)
+
+    def worker(key, members):
+        if key == 'bad':
+            raise RuntimeError('comp search failed')
+        return [{'index': index, 'status': 'ok'} for index, _ in members]
+
+    rows = sorted((row for group in iter_group_results(groups, worker) for row in group), key=lambda row: row['index'])
+    assert [row['status'] for row in rows] == ['ok', 'error', 'ok', 'error']
+    assert rows[1] == {'index': 1, 'status': 'error', 'error': 'comp search failed'}
+
+
+def test_batch_and_max_offer_keep_going_when_one_comp_search_fails(monkeypatch):
+    fetch_comps = index.fetch_comps
+
+    def flaky_fetch_comps(zipcode, *args, **kwargs):
+        if zipcode == '99999':
+            raise RuntimeError('comp search failed')
+        return fetch_comps(zipcode, *args, **kwargs)
+
+    monkeypatch.setattr(index, 'fetch_comps', flaky_fetch_comps)
+    properties = [PROPERTY, dict(PROPERTY, address='9 Elm St', zipcode='99999')]
+    client = index.app.test_client()
+
+    response = client.post('/api/analyze/batch', json=properties)
+    rows = sorted((json.loads(line) for line in response.get_data(as_text=True).splitlines()), key=lambda row: row['index'])
+    assert response.status_code == 200
+    assert [row['status'] for row in rows] == ['ok', 'error']
+    assert rows[1]['error'] == 'comp search failed'
+
+    response = client.post('/api/max-offer', json={'properties': properties})
+    results = response.get_json()['results']
+    assert response.status_code == 200
+    assert results[0]['offers'] and results[1] == {'index': 1, 'address': '9 Elm St', 'error': 'comp search failed'}
@@ -0,0 +1,35 @@
+import pytest
+
+from bulk_report import resolve_bulk_item
+from index import get_demo_comps, build_analysis
+
+PROPERTY = {
+    'address': '123 Main St, Atlanta, GA 30344', 'zipcode': '30344', 'purchasePrice': 150000,
+    'currentSqft': 1500, 'beds': 3, 'baths': 2, 'yearBuilt': 1995, 'zestimate': 0,
+    'latitude': None, 'longitude': None
+}
+
+
+def test_analyses_and_batch_rows_resolve():
+    analysis = build_analysis(PROPERTY, get_demo_comps('30344', 1500), {'source': 'demo'})
+    assert resolve_bulk_item(analysis) == (analysis, None)
+    assert resolve_bulk_item({'status': 'ok', 'analysis': analysis}) == (analysis, None)
+
+
+@pytest.mark.parametrize('item', [
+    {'bogus': 1},
+    {'analysis': {'address': '123 Main St'}},
+    {'address': '123 Main St', 'propertyData': {}, 'flip_scenarios': [], 'rental_scenarios': []},
+    {'address': '123 Main St', 'propertyData': PROPERTY, 'flip_scenarios': 'none', 'rental_scenarios': [{}]}
+])
+def test_items_without_analysis_fields_are_errors(item):
+    analysis, error = resolve_bulk_item(item)
+    assert analysis is None
+    assert error.startswith('Not an analysis: missing')
+
+
+@pytest.mark.parametrize('item', ['../analyses/x', 'abc', 'a.b/../../c', 'x' * 20 + '.' + 'y' * 24 + '?q=1'])
+def test_strings_that_are_not_job_ids_are_never_fetched(item, monkeypatch):
+    import bulk_report
+    monkeypatch.setattr(bulk_report, 'fetch_service_json', lambda *args: pytest.fail('fetched'))
+    assert resolve_bulk_item(item, 'http://analysis.internal') == (None, 'Expected an analysis or a job id')
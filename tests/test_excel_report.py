@@ -0,0 +1,27 @@
+import io
+
+from openpyxl import load_workbook
+
+from excel_report import write_workbook
+from index import build_analysis, get_demo_comps
+from responses import shape_analysis
+
+PROPERTY = {
+    'address': '123 Main St, Atlanta, GA 30344', 'zipcode': '30344', 'purchasePrice': 150000,
+    'currentSqft': 1500, 'beds': 3, 'baths': 2, 'yearBuilt': 1995, 'zestimate': 0,
+    'latitude': None, 'longitude': None
+}
+
+
+def comp_rows(analysis):
+    fp = io.BytesIO()
+    write_workbook([analysis], fp)
+    fp.seek(0)
+    return list(load_workbook(fp)['Comps'].iter_rows(min_row=2, values_only=True))
+
+
+def test_compact_analyses_export_the_same_comp_rows():
+    analysis = build_analysis(PROPERTY, get_demo_comps('30344', 1500), {'source': 'demo'})
+    rows = comp_rows(analysis)
+    assert rows[0][1] == '1000 Demo Street'
+    assert comp_rows(shape_analysis(analysis, compact=True)) == rows
@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import pytest
+
+from conftest import API_DIR, ROOT
+from import_budget import child_env, import_ms
+
+with open(os.path.join(ROOT, 'benchmarks', 'import_budget.json')) as fp:
+    BUDGETS = json.load(fp)
+
+# Test runners are slower and noisier than the machine the budgets were
+# measured on, so this only catches gross regressions; the tight check is
+# python benchmarks/import_budget.py
+CI_BUDGET_FACTOR = 3
+
+LOADED_SCRIPT = '''
+import json, sys
+import {module}
+print(json.dumps(sorted({{m.split('.')[0] for m in sys.modules}})))
+'''
+
+
+def modules_loaded_by(module):
+    # Top-level modules a fresh interpreter has loaded after importing module
+    env = dict(os.environ, APIFY_API_TOKEN='', CACHE_DIR=tempfile.mkdtemp(prefix='import-test-'))
+    env.pop('PYTHONPATH', None)
+    output = subprocess.run(
+        [sys.executable, '-c', LOADED_SCRIPT.format(module=module)],
+        cwd=API_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return set(json.loads(output.splitlines()[-1]))
+
+
+@pytest.mark.parametrize('entry', sorted(BUDGETS))
+def test_entry_point_does_not_import_heavy_modules(entry):
+    forbidden = set(BUDGETS[entry]['forbidden'])
+    assert not forbidden & modules_loaded_by(entry)
+
+
+def test_heavy_modules_are_detected():
+    # scenario_engine imports numpy at module level, so the check above can fail
+    assert 'numpy' in modules_loaded_by('scenario_engine')
+
+
+@pytest.mark.parametrize('entry', sorted(BUDGETS))
+def test_entry_point_imports_within_a_generous_budget(entry):
+    env = child_env()
+    best = min(import_ms(entry, env) for _ in range(3))
+    assert best <= BUDGETS[entry]['max_ms'] * CI_BUDGET_FACTOR, f'{entry} imported in {best:.1f} ms'
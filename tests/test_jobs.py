@@ -0,0 +1,38 @@
+import pytest
+
+import apify
+import jobs
+
+
+@pytest.fixture
+def signing_key(monkeypatch):
+    monkeypatch.setattr(jobs, 'JOB_SIGNING_KEY', b'test-key')
+
+
+def test_job_ids_round_trip(signing_key):
+    runs = {'comps': {'run_id': 'abc123', 'dataset_id': 'def456', 'status': 'READY'}}
+    job = jobs.create_job('analyze', {'search_key': ['30344', 2]}, runs=runs)
+    jobs.job_store.clear()
+
+    decoded = jobs.get_job(job['id'])
+    assert (decoded['kind'], decoded['payload'], decoded['status']) == ('analyze', {'search_key': ['30344', 2]}, 'running')
+    assert decoded['runs'] == {'comps': {'run_id': 'abc123', 'dataset_id': 'def456', 'status': 'READY'}}
+
+
+def test_forged_and_unsigned_job_ids_are_rejected(signing_key, monkeypatch):
+    job = jobs.create_job('lookup', {'address': '1 Main St'}, runs={'property': {'run_id': 'abc', 'dataset_id': None}})
+    jobs.job_store.clear()
+    body, _, signature = job['id'].partition('.')
+    assert jobs.get_job(f'{body}.{signature[::-1]}') is None
+
+    monkeypatch.setattr(jobs, 'JOB_SIGNING_KEY', b'other-key')
+    assert jobs.get_job(job['id']) is None
+    monkeypatch.setattr(jobs, 'JOB_SIGNING_KEY', b'')
+    assert not jobs.jobs_enabled()
+    assert jobs.get_job(job['id']) is None
+
+
+@pytest.mark.parametrize('run_id', ['../datasets/x', 'abc?token=1', '', None])
+def test_bad_run_ids_never_reach_the_url(run_id):
+    with pytest.raises(apify.ApifyError):
+        apify.get_actor_run(run_id, 'token')
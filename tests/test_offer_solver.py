@@ -0,0 +1,22 @@
+import numpy as np
+import pytest
+
+from offer_solver import DEFAULT_TARGETS, solve_max_offers
+
+COLUMNS = ([1500, 1200], [3, 2], [1500, 1300], [250000, 180000])
+
+
+def test_a_partial_target_keeps_the_default_metric():
+    solved = solve_max_offers(*COLUMNS, targets={'Section 8 Rental': {'target': 300}})
+    assert solved['Section 8 Rental']['metric'] == DEFAULT_TARGETS['Section 8 Rental']['metric']
+    assert solved['Section 8 Rental']['target'] == 300
+    baseline = solve_max_offers(*COLUMNS)
+    # A higher cash-flow target can only lower the maximum offer
+    assert np.all(solved['Section 8 Rental']['prices'] < baseline['Section 8 Rental']['prices'])
+    assert np.array_equal(solved['Open Market Rental']['prices'], baseline['Open Market Rental']['prices'])
+
+
+@pytest.mark.parametrize('targets', [{'Flip (Light)': {'target': 5}}, {'Section 8 Rental': 250}, ['Section 8 Rental']])
+def test_unknown_or_malformed_targets_are_rejected(targets):
+    with pytest.raises(ValueError):
+        solve_max_offers(*COLUMNS, targets=targets)
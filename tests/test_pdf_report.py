@@ -0,0 +1,15 @@
+from index import build_analysis, get_demo_comps
+from pdf_report import payload_hash, render_pdf, report_payload
+
+PROPERTY = {
+    'address': '123 Main St, Atlanta, GA 30344', 'zipcode': '30344', 'purchasePrice': 150000,
+    'currentSqft': 1500, 'beds': 3, 'baths': 2, 'yearBuilt': 1995, 'zestimate': 0,
+    'latitude': None, 'longitude': None
+}
+
+
+def test_the_cache_key_does_not_include_the_render_date():
+    payload = report_payload(build_analysis(PROPERTY, get_demo_comps('30344', 1500), {'source': 'demo'}))
+    assert 'date' not in payload
+    assert payload_hash(payload) == payload_hash(report_payload(dict(payload)))
+    assert render_pdf(payload, date='May 01, 2026') != render_pdf(payload, date='May 02, 2026')
@@ -0,0 +1,7 @@
+from responses import compact_comp
+
+
+def test_compact_comp_defaults_missing_street():
+    assert compact_comp({'address': {'streetAddress': None}, 'price': {'value': 1}})['streetAddress'] == 'N/A'
+    assert compact_comp({'price': 1})['streetAddress'] == 'N/A'
+    assert compact_comp({'streetAddress': '12 Oak St'})['streetAddress'] == '12 Oak St'
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from index import calculate_flip_scenarios, calculate_rental_scenarios, get_fmr
+from scenario_engine import compute_scenarios, scenario_dicts
+from fixtures.seeded import scalar_inputs, seeded_properties
+
+
+@pytest.mark.parametrize('seed', [7, 2024, 31337])
+def test_engine_matches_scalar_calculators(seed):
+    purchase, sqft, beds, zipcodes, arv = seeded_properties(500, seed)
+    fmr = [get_fmr(str(z), int(b)) for z, b in zip(zipcodes, beds)]
+    results = compute_scenarios(purchase, sqft, beds, fmr, arv)
+
+    for i in range(len(purchase)):
+        property_data = scalar_inputs(purchase, sqft, beds, zipcodes, i)
+        flips, rentals = scenario_dicts(results, i)
+        assert flips == calculate_flip_scenarios(property_data, float(arv[i])), property_data
+        assert rentals == calculate_rental_scenarios(property_data, float(arv[i])), property_data
+
+
+def test_engine_matches_scalar_calculators_at_the_edges():
+    # No ARV (losses everywhere), a zero price (ratios guarded) and the bed
+    # counts FMR tops out at
+    purchase = np.array([100000.0, 0.0, 250000.0, 75000.0])
+    sqft = np.array([1200.0, 900.0, 3000.0, 1000.0])
+    beds = np.array([3, 2, 8, 0])
+    arv = np.array([0.0, 120000.0, 400000.0, 75000.0])
+    fmr = [get_fmr('30344', int(b)) for b in beds]
+    results = compute_scenarios(purchase, sqft, beds, fmr, arv)
+
+    for i in range(len(purchase)):
+        property_data = {'purchasePrice': purchase[i].item(), 'currentSqft': sqft[i].item(), 'beds': int(beds[i]), 'baths': 1.0, 'zipcode': '30344'}
+        assert scenario_dicts(results, i) == (
+            calculate_flip_scenarios(property_data, arv[i].item()),
+            calculate_rental_scenarios(property_data, arv[i].item())
+        )
@@ -0,0 +1,14 @@
+import pytest
+
+import index
+
+PROPERTY = {
+    'address': '123 Main St, Atlanta, GA 30344', 'zipcode': '30344', 'purchasePrice': 150000,
+    'currentSqft': 1500, 'beds': 3, 'baths': 2, 'yearBuilt': 1995
+}
+
+
+@pytest.mark.parametrize('distributions', [[1], 'vacancy', 3, {'vacancy': [0.05]}, {'rent_growth': {'sd': 'high'}}])
+def test_malformed_distributions_are_rejected(distributions):
+    response = index.app.test_client().post('/api/simulate', json=dict(PROPERTY, paths=100, distributions=distributions))
+    assert response.status_code == 400
@@ -0,0 +1,54 @@
+import time
+
+from warehouse import CompWarehouse
+
+DAY = 24 * 3600
+
+
+def sold_comp(zpid, zipcode='30344'):
+    return {
+        'zpid': zpid, 'zipcode': zipcode, 'price': 180000, 'bedrooms': 3, 'bathrooms': 2,
+        'livingArea': 1500, 'yearBuilt': 1990, 'dateSold': '2024-11-01'
+    }
+
+
+def test_search_age_and_threshold_only_count_fresh_rows(tmp_path):
+    warehouse = CompWarehouse(str(tmp_path / 'warehouse.sqlite3'))
+    warehouse.ingest([sold_comp(zpid) for zpid in range(1, 6)])
+    # Four of the five rows were last refreshed a month ago
+    conn = warehouse._connection()
+    conn.execute('UPDATE sold_comps SET ingested_at = ? WHERE zpid != ?', (time.time() - 30 * DAY, '5'))
+    conn.commit()
+
+    items, age = warehouse.search({'location': '30344'})
+    assert len(items) == 5
+    assert age > 29 * DAY
+
+    items, age = warehouse.search({'location': '30344'}, max_age=7 * DAY)
+    assert [item['zpid'] for item in items] == [5]
+    assert age < DAY
+
+    assert warehouse.search({'location': '30310'}, max_age=7 * DAY) == ([], None)
+
+
+def test_nearby_returns_the_nearest_matches_within_the_radius(tmp_path):
+    warehouse = CompWarehouse(str(tmp_path / 'warehouse.sqlite3'))
+    subject = (33.75, -84.39)
+    # Each step is ~0.35 miles north; zpid 3 has too few beds to match
+    comps = [dict(sold_comp(zpid, zipcode=f'303{zpid:02d}'), latitude=subject[0] + zpid * 0.005, longitude=subject[1])
+             for zpid in range(1, 9)]
+    comps[2]['bedrooms'] = 1
+    warehouse.ingest(comps + [sold_comp(99)])
+
+    actor_input = {'location': '30344', 'minBeds': 2}
+    items, age = warehouse.nearby(actor_input, *subject, radius_miles=2.0, k=3)
+    assert [item['zpid'] for item in items] == [1, 2, 4]
+    assert age < DAY
+
+    items, _ = warehouse.nearby(actor_input, *subject, radius_miles=1.5, k=10)
+    assert [item['zpid'] for item in items] == [1, 2, 4]
+
+    # Rows added later are picked up by the index
+    warehouse.ingest([dict(sold_comp(100), latitude=subject[0], longitude=subject[1] + 0.001)])
+    items, _ = warehouse.nearby(actor_input, *subject, radius_miles=2.0, k=1)
+    assert [item['zpid'] for item in items] == [100]